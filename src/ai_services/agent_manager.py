@@ -2,12 +2,16 @@
 
 import asyncio
 import random
-from typing import Any, Optional, Callable, Awaitable
+import time
+from contextlib import aclosing, nullcontext
+from typing import Any, AsyncIterator, Optional, Callable, Awaitable
 
 from loguru import logger
 from pydantic_ai.exceptions import ModelHTTPError
 
+from . import llm_usage, rate_limiter
 from .model_factory import ModelFactory
+from .rate_limiter import AdaptiveRateLimiter
 from .config import AIModelProvider
 
 
@@ -21,6 +25,7 @@ class AgentManager:
     - Retry classification
     - Structured logging
     - Cancellation safety
+    - Per-model adaptive rate limiting (rate_limiter)
     """
 
     DEFAULT_RETRIES = 3
@@ -45,29 +50,186 @@ class AgentManager:
         - Exponential backoff
         - Jitter
         - Intelligent retry logic
+        - Provider token usage (incl. prompt-cache hits) recorded per run
+        """
+
+        limiter = cls._limiter(agent)
+        tokens = cls._estimate_tokens(args)
+        started = time.perf_counter()
+        result = await cls.retry_with_backoff(
+            lambda: agent.run(*args, **kwargs),
+            retries=retries,
+            base_delay=base_delay,
+            timeout=timeout,
+            correlation_id=correlation_id,
+            label="LLM",
+            limiter=limiter,
+            tokens=tokens,
+        )
+
+        cls._record_usage(result, started, correlation_id, limiter, tokens)
+        return result
+
+    @classmethod
+    async def stream_with_backoff(
+        cls,
+        agent,
+        *args,
+        retries: int = DEFAULT_RETRIES,
+        base_delay: float = BASE_DELAY,
+        correlation_id: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        """
+        Yields the partial outputs of agent.run_stream() as they arrive,
+        then the final output, validated in full, as the last item.
+
+        Failures before the first output are retried with the same backoff
+        as run_with_backoff(); after that they propagate, since the caller
+        has already passed output on. Closing the generator closes the
+        provider stream. Time to first output is recorded in llm_usage.
+        """
+
+        limiter = cls._limiter(agent)
+        tokens = cls._estimate_tokens(args)
+        started = time.perf_counter()
+
+        async def first_output():
+            stream = cls._stream(agent, args, kwargs, limiter, tokens, started, correlation_id)
+            try:
+                return await anext(stream), stream
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        # No timeout: wait_for would read the first output in another task,
+        # which the provider stream can't be resumed from
+        first, stream = await cls.retry_with_backoff(
+            first_output,
+            retries=retries,
+            base_delay=base_delay,
+            timeout=None,
+            correlation_id=correlation_id,
+            label="LLM stream",
+        )
+        async with aclosing(stream):
+            yield first
+            async for output in stream:
+                yield output
+
+    @classmethod
+    async def _stream(
+        cls,
+        agent,
+        args: tuple,
+        kwargs: dict,
+        limiter: Optional[AdaptiveRateLimiter],
+        tokens: int,
+        started: float,
+        correlation_id: Optional[str],
+    ) -> AsyncIterator[Any]:
+        """One agent.run_stream() attempt, holding a request slot throughout."""
+        streaming = closed = False
+        async with cls._slot(limiter, tokens) as permit, agent.run_stream(*args, **kwargs) as result:
+            async for output in result.stream_output(debounce_by=None):
+                if not streaming:
+                    streaming = True
+                    llm_usage.metrics.record_first_token(time.perf_counter() - started)
+                try:
+                    yield output
+                except GeneratorExit:
+                    # Consumer went away: leave the run normally, which
+                    # closes the provider stream (raising through it does not),
+                    # without counting it as a success for the limiter
+                    closed = True
+                    if permit is not None:
+                        permit.abandoned = True
+                    break
+            if not closed:
+                final = await result.get_output()
+
+        if closed:
+            logger.bind(correlation_id=correlation_id).info("LLM stream closed by consumer")
+            return
+        cls._record_usage(result, started, correlation_id, limiter, tokens)
+        # Outside the run, so closing here needs no special care
+        yield final
+
+    @staticmethod
+    def _record_usage(
+        result,
+        started: float,
+        correlation_id: Optional[str],
+        limiter: Optional[AdaptiveRateLimiter] = None,
+        tokens: int = 0,
+    ) -> None:
+        # A method in pydantic_ai 1.x, a property later
+        usage = result.usage() if callable(result.usage) else result.usage
+        llm_usage.metrics.record(usage, time.perf_counter() - started)
+        if limiter is not None:
+            limiter.settle_tokens(
+                tokens,
+                (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0),
+            )
+        logger.bind(
+            correlation_id=correlation_id
+        ).info(
+            "LLM usage | input={} cached={} output={}",
+            getattr(usage, "input_tokens", None),
+            getattr(usage, "cache_read_tokens", None),
+            getattr(usage, "output_tokens", None),
+        )
+
+    @classmethod
+    async def retry_with_backoff(
+        cls,
+        operation: Callable[[], Awaitable[Any]],
+        retries: int = DEFAULT_RETRIES,
+        base_delay: float = BASE_DELAY,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        correlation_id: Optional[str] = None,
+        label: str = "Model",
+        limiter: Optional[AdaptiveRateLimiter] = None,
+        tokens: int = 0,
+    ) -> Any:
+        """
+        Awaits a fresh operation() per attempt with the same timeout,
+        jittered exponential backoff and retry classification as agent runs.
+        Shared by LLM calls and embedding batches.
+
+        With a limiter, each attempt first waits for a request slot (and
+        `tokens` of budget); the timeout (None for none) only covers the
+        call itself.
+        A provider Retry-After hint stretches the backoff.
         """
 
         delay = base_delay
+        last_error: Optional[BaseException] = None
 
         for attempt in range(1, retries + 1):
+            delay_hint: Optional[float] = None
             try:
                 logger.bind(
                     correlation_id=correlation_id
                 ).debug(
-                    "LLM attempt {}/{}", attempt, retries
+                    "{} attempt {}/{}", label, attempt, retries
                 )
 
-                return await asyncio.wait_for(
-                    agent.run(*args, **kwargs),
-                    timeout=timeout,
-                )
+                async with cls._slot(limiter, tokens):
+                    return await asyncio.wait_for(
+                        operation(),
+                        timeout=timeout,
+                    )
 
-            except asyncio.TimeoutError:
+            except asyncio.TimeoutError as exc:
+                last_error = exc
                 logger.bind(
                     correlation_id=correlation_id
-                ).warning("LLM request timed out")
+                ).warning("{} request timed out", label)
 
             except ModelHTTPError as exc:
+                last_error = exc
+                delay_hint = rate_limiter.retry_after(exc)
                 logger.bind(
                     correlation_id=correlation_id
                 ).warning(
@@ -75,20 +237,22 @@ class AgentManager:
                 )
 
             except asyncio.CancelledError:
-                logger.warning("LLM task was cancelled")
+                logger.warning("{} task was cancelled", label)
                 raise
 
             except Exception as exc:
+                last_error = exc
                 logger.bind(
                     correlation_id=correlation_id
                 ).exception(
-                    "Unexpected error during LLM execution: {}",
+                    "Unexpected error during {} execution: {}",
+                    label,
                     str(exc),
                 )
 
-            sleep_time = cls._calculate_backoff(
-                attempt=attempt,
-                base_delay=delay,
+            sleep_time = max(
+                cls._calculate_backoff(attempt=attempt, base_delay=delay),
+                delay_hint or 0.0,
             )
 
             logger.bind(
@@ -103,8 +267,27 @@ class AgentManager:
             await asyncio.sleep(sleep_time)
 
         raise RuntimeError(
-            "Exceeded maximum retries for LLM request"
-        )
+            f"Exceeded maximum retries for {label} request"
+        ) from last_error
+
+    @staticmethod
+    def _slot(limiter: Optional[AdaptiveRateLimiter], tokens: int):
+        return limiter.slot(tokens) if limiter is not None else nullcontext()
+
+    @staticmethod
+    def _limiter(agent) -> Optional[AdaptiveRateLimiter]:
+        """Limiter shared by every agent on the same provider model."""
+        model = agent.model
+        if model is None or isinstance(model, str):
+            return rate_limiter.limiter_for(str(model))
+        return rate_limiter.limiter_for(f"{model.system}:{model.model_name}")
+
+    @staticmethod
+    def _estimate_tokens(args) -> int:
+        """Rough prompt size (4 characters per token) charged before the call."""
+        prompt = args[0] if args else None
+        texts = [prompt] if isinstance(prompt, str) else [p for p in prompt or () if isinstance(p, str)]
+        return sum(len(text) for text in texts) // 4
 
     @classmethod
     def _calculate_backoff(
@@ -133,7 +316,9 @@ class AgentManager:
     ):
         """
         Factory wrapper to centralize agent creation.
-        Keeps imports clean across codebase.
+        Keeps imports clean across codebase. Agents are cached by
+        ModelFactory, so per-question data belongs in the run() prompt,
+        not in system_prompt.
         """
 
         logger.debug(
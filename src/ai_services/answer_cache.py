@@ -0,0 +1,133 @@
+# src/ai_services/answer_cache.py
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers, looked up by query-embedding similarity.
+
+    Past query embeddings live in a small exact inner-product FAISS index,
+    so a paraphrase of an earlier question ("annual leave days?" vs "how
+    many days of annual leave") within `threshold` cosine similarity gets
+    the earlier answer. Entries are only reused for the same retrieval
+    options (`context`) and are all dropped as soon as the collection
+    version changes. The oldest entries are evicted beyond `max_size`.
+    """
+
+    # Neighbours examined per lookup, so entries for other retrieval options
+    # do not hide a match
+    SEARCH_K = 8
+
+    def __init__(self, max_size: int = 1024, threshold: float = 0.95):
+        self.max_size = max_size
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._entries: "OrderedDict[int, Tuple[Hashable, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._version: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(
+        self,
+        query_embedding: Sequence[float],
+        context: Hashable,
+        version: int,
+    ) -> Optional[Any]:
+        """Answer cached for a similar query under the same context and version."""
+        query = self._normalize(query_embedding)
+        with self._lock:
+            self._check_version(version)
+            if self._index is None or self._index.ntotal == 0 or query.shape[1] != self._index.d:
+                self.misses += 1
+                return None
+
+            scores, ids = self._index.search(query, min(self.SEARCH_K, self._index.ntotal))
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id == -1 or score < self.threshold:
+                    break
+                entry_context, answer = self._entries[int(entry_id)]
+                if entry_context == context:
+                    self.hits += 1
+                    return answer
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        query_embedding: Sequence[float],
+        context: Hashable,
+        version: int,
+        answer: Any,
+    ) -> None:
+        """
+        Store an answer generated from the collection at `version`. Answers
+        from a version older than the cache's current one are dropped.
+        """
+        if self.max_size <= 0:
+            return
+        query = self._normalize(query_embedding)
+        with self._lock:
+            if self._version is not None and version < self._version:
+                return
+            self._check_version(version)
+            if self._index is None or query.shape[1] != self._index.d:
+                self._reset(query.shape[1])
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(query, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (context, answer)
+
+            if len(self._entries) > self.max_size:
+                oldest, _ = self._entries.popitem(last=False)
+                self._index.remove_ids(np.array([oldest], dtype=np.int64))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = None
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "version": self._version,
+            }
+
+    def _check_version(self, version: int) -> None:
+        """Drop every entry when the collection changed. Caller holds the lock."""
+        if version == self._version:
+            return
+        if self._entries:
+            self.invalidations += 1
+        self._version = version
+        self._index = None
+        self._entries.clear()
+
+    def _reset(self, dimension: int) -> None:
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        self._entries.clear()
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        query = np.array(embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(query)
+        return query
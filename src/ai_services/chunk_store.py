@@ -0,0 +1,402 @@
+# src/ai_services/chunk_store.py
+
+import json
+import mmap
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+
+@dataclass
+class Document:
+    """Document class for chunk text and metadata (vectors live in the index)."""
+    text: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    id: str = field(default_factory=lambda: str(uuid4()))
+
+
+@dataclass
+class MetadataFilter:
+    """
+    Restricts a search to chunks whose metadata matches. Each non-empty
+    field must match one of its values; fields are combined with AND.
+    """
+    document_ids: Optional[List[int]] = None
+    filenames: Optional[List[str]] = None
+    document_types: Optional[List[str]] = None
+
+    def is_empty(self) -> bool:
+        return not (self.document_ids or self.filenames or self.document_types)
+
+
+class ChunkStore:
+    """
+    On-disk chunk text and metadata for a vector collection.
+
+    Layout (all keyed by the integer vector id assigned on append):
+    - <name>.text     UTF-8 text blob, append-only, memory-mapped for reads
+    - <name>.offsets  int64 (offset, length) pairs, one row per vector id
+    - <name>.meta.db  SQLite side table with chunk id, document columns and
+                      the JSON metadata, opened with mmap I/O; chunk id and
+                      the document columns are indexed for deletes and
+                      filtered searches
+    - <name>.vectors  exact float32 vectors, one row per vector id, kept only
+                      when the index stores compressed codes (all-zero rows
+                      are vectors that were never written)
+
+    Nothing is held in memory per chunk; rows are read only for search hits.
+
+    The text, offsets and vectors files are never rewritten: deleting a
+    chunk only drops its SQLite row, so the bytes of deleted chunks stay on
+    disk until the collection is cleared. `usage()` reports how much of the
+    text blob is dead.
+    """
+
+    MMAP_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, directory: str, collection_name: str, fsync: bool = True):
+        self.text_path = os.path.join(directory, f"{collection_name}.text")
+        self.offsets_path = os.path.join(directory, f"{collection_name}.offsets")
+        self.db_path = os.path.join(directory, f"{collection_name}.meta.db")
+        self.vectors_path = os.path.join(directory, f"{collection_name}.vectors")
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        self._text_map: Optional[mmap.mmap] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._vectors: Optional[np.ndarray] = None
+        # (inode, size) of each file when it was mapped: another process may
+        # have appended to it, or cleared and recreated it, since
+        self._mapped: Dict[str, Optional[Tuple[int, int]]] = {}
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size={self.MMAP_SIZE}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                vid INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE,
+                document_id INTEGER,
+                filename TEXT,
+                document_type TEXT,
+                metadata TEXT NOT NULL
+            )
+            """
+        )
+        self._add_document_type_column()
+        for column in ("document_id", "filename", "document_type"):
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS chunks_{column} ON chunks ({column})"
+            )
+        self._conn.commit()
+
+    def _add_document_type_column(self) -> None:
+        """Add the document_type column to older stores, derived from the filename."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        if "document_type" in columns:
+            return
+        self._conn.execute("ALTER TABLE chunks ADD COLUMN document_type TEXT")
+        rows = self._conn.execute(
+            "SELECT vid, filename FROM chunks WHERE filename LIKE '%.%'"
+        ).fetchall()
+        self._conn.executemany(
+            "UPDATE chunks SET document_type = ? WHERE vid = ?",
+            [(filename.rsplit(".", 1)[-1].lower(), vid) for vid, filename in rows],
+        )
+
+    @property
+    def next_vid(self) -> int:
+        """Vector id that the next appended chunk will receive."""
+        if not os.path.exists(self.offsets_path):
+            return 0
+        return os.path.getsize(self.offsets_path) // 16
+
+    def append(
+        self,
+        chunk_ids: Sequence[str],
+        texts: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+        vectors: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Persist chunks and return their newly assigned vector ids. Exact
+        `vectors`, if given, are stored under the same ids.
+        """
+        encoded = [text.encode("utf-8") for text in texts]
+        lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+
+        with self._lock:
+            start_vid = self.next_vid
+            vids = np.arange(start_vid, start_vid + len(encoded), dtype=np.int64)
+
+            with open(self.text_path, "ab") as f:
+                base_offset = f.tell()
+                f.write(b"".join(encoded))
+                self._sync(f)
+
+            offsets = np.empty((len(encoded), 2), dtype=np.int64)
+            offsets[:, 0] = base_offset + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            offsets[:, 1] = lengths
+            with open(self.offsets_path, "ab") as f:
+                f.write(offsets.tobytes())
+                self._sync(f)
+
+            if vectors is not None:
+                self.write_vectors(vids, vectors)
+
+            self._conn.executemany(
+                "INSERT INTO chunks (vid, chunk_id, document_id, filename, document_type, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        int(vid),
+                        chunk_id,
+                        metadata.get("document_id"),
+                        metadata.get("filename"),
+                        metadata.get("document_type"),
+                        json.dumps(metadata, default=str),
+                    )
+                    for vid, chunk_id, metadata in zip(vids, chunk_ids, metadatas)
+                ],
+            )
+            self._conn.commit()
+
+        return vids
+
+    def get(self, vids: Sequence[int]) -> List[Optional[Document]]:
+        """
+        Read chunks by vector id, preserving order. Missing rows yield None.
+        """
+        if len(vids) == 0:
+            return []
+
+        vid_list = [int(vid) for vid in vids]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT vid, chunk_id, metadata FROM chunks "
+                f"WHERE vid IN ({','.join('?' * len(vid_list))})",
+                vid_list,
+            ).fetchall()
+            by_vid = {vid: (chunk_id, metadata) for vid, chunk_id, metadata in rows}
+            texts = self._read_texts(list(by_vid))
+
+            documents: List[Optional[Document]] = []
+            for vid in vid_list:
+                row = by_vid.get(vid)
+                if row is None:
+                    documents.append(None)
+                    continue
+                chunk_id, metadata = row
+                documents.append(
+                    Document(id=chunk_id, text=texts[vid], metadata=json.loads(metadata))
+                )
+            return documents
+
+    def write_vectors(self, vids: np.ndarray, vectors: np.ndarray) -> None:
+        """Store exact vectors by vector id, growing the file as needed."""
+        if len(vids) == 0:
+            return
+        row_bytes = vectors.shape[1] * 4
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        with self._lock:
+            with open(self.vectors_path, "ab") as f:
+                appending = (
+                    f.tell() == int(vids[0]) * row_bytes
+                    and np.array_equal(vids, np.arange(vids[0], vids[0] + len(vids)))
+                )
+                if appending:
+                    f.write(vectors.tobytes())
+                    self._sync(f)
+                    return
+                # Rows skipped over are left as zeros (no exact vector)
+                f.truncate(max(f.tell(), (int(vids.max()) + 1) * row_bytes))
+
+            rows = np.memmap(self.vectors_path, dtype=np.float32, mode="r+").reshape(-1, vectors.shape[1])
+            rows[vids] = vectors
+            rows.flush()
+            del rows
+            self._vectors = None
+
+    def get_vectors(self, vids: np.ndarray, dimension: int) -> np.ndarray:
+        """
+        Read exact vectors by vector id. Ids without a stored vector get an
+        all-zero row.
+        """
+        result = np.zeros((len(vids), dimension), dtype=np.float32)
+        if len(vids) == 0 or not os.path.exists(self.vectors_path):
+            return result
+        with self._lock:
+            key = self._file_key(self.vectors_path)
+            if self._vectors is None or self._mapped.get(self.vectors_path) != key:
+                self._vectors = None
+                if key is None or key[1] == 0:
+                    return result
+                self._vectors = np.memmap(
+                    self.vectors_path, dtype=np.float32, mode="r"
+                ).reshape(-1, dimension)
+                self._mapped[self.vectors_path] = key
+            stored = vids < len(self._vectors)
+            result[stored] = self._vectors[vids[stored]]
+        return result
+
+    def vids_for_chunk_ids(self, chunk_ids: Sequence[str]) -> np.ndarray:
+        """Look up vector ids for string chunk ids."""
+        if not chunk_ids:
+            return np.empty(0, dtype=np.int64)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT vid FROM chunks WHERE chunk_id IN ({','.join('?' * len(chunk_ids))})",
+                list(chunk_ids),
+            ).fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def vids_by_chunk_id(self, chunk_ids: Sequence[str]) -> Dict[str, int]:
+        """Map string chunk ids to vector ids; unknown ids are left out."""
+        if not chunk_ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT chunk_id, vid FROM chunks WHERE chunk_id IN ({','.join('?' * len(chunk_ids))})",
+                list(chunk_ids),
+            ).fetchall()
+        return dict(rows)
+
+    def vids_for_document_id(self, document_id: int) -> np.ndarray:
+        """Look up the vector ids of every chunk of a source document."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT vid FROM chunks WHERE document_id = ?", (document_id,)
+            ).fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def vids_matching(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        """Look up the vector ids of chunks matching a filter, via the column indexes."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column, values in (
+            ("document_id", metadata_filter.document_ids),
+            ("filename", metadata_filter.filenames),
+            ("document_type", metadata_filter.document_types),
+        ):
+            if values:
+                clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        if not clauses:
+            raise ValueError("Metadata filter is empty")
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT vid FROM chunks WHERE {' AND '.join(clauses)}", params
+            ).fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def delete(self, vids: Sequence[int]) -> None:
+        """Remove metadata rows. Text bytes stay in the blob until it is rewritten."""
+        if len(vids) == 0:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE vid = ?", [(int(vid),) for vid in vids]
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def usage(self) -> Dict[str, int]:
+        """
+        On-disk bytes of the chunk files, and how many of them belong to
+        deleted chunks (reclaimed only by clearing the collection).
+        """
+        with self._lock:
+            vids = [row[0] for row in self._conn.execute("SELECT vid FROM chunks")]
+            text_bytes = self._file_size(self.text_path)
+            live_text = int(self._map_offsets()[vids, 1].sum()) if vids else 0
+            return {
+                "text_bytes": text_bytes,
+                "dead_text_bytes": max(0, text_bytes - live_text),
+                "offsets_bytes": self._file_size(self.offsets_path),
+                "vectors_bytes": self._file_size(self.vectors_path),
+                "dead_chunks": self.next_vid - len(vids),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self.close_maps()
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+            for path in (self.text_path, self.offsets_path, self.vectors_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def close(self) -> None:
+        with self._lock:
+            self.close_maps()
+            self._conn.close()
+
+    def close_maps(self) -> None:
+        """Drop the file mappings; they are re-opened on the next read."""
+        with self._lock:
+            if self._text_map is not None:
+                self._text_map.close()
+                self._text_map = None
+            self._offsets = None
+            self._vectors = None
+            self._mapped.clear()
+
+    def _read_texts(self, vids: List[int]) -> Dict[int, str]:
+        """Decode the text of each vector id from the blob. Caller holds the lock."""
+        if not vids:
+            return {}
+        offsets = self._map_offsets()[vids]
+        text_map = self._map_text() if offsets[:, 1].any() else None
+        return {
+            vid: text_map[offset:offset + length].decode("utf-8") if length else ""
+            for vid, (offset, length) in zip(vids, offsets.tolist())
+        }
+
+    def _map_offsets(self) -> np.ndarray:
+        # Checked once per read: appends change the size, clear() the inode
+        key = self._file_key(self.offsets_path)
+        if self._offsets is None or self._mapped.get(self.offsets_path) != key:
+            self._offsets = np.memmap(self.offsets_path, dtype=np.int64, mode="r").reshape(-1, 2)
+            self._mapped[self.offsets_path] = key
+        return self._offsets
+
+    def _map_text(self) -> mmap.mmap:
+        key = self._file_key(self.text_path)
+        if self._text_map is None or self._mapped.get(self.text_path) != key:
+            if self._text_map is not None:
+                self._text_map.close()
+            with open(self.text_path, "rb") as f:
+                self._text_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped[self.text_path] = key
+        return self._text_map
+
+    @classmethod
+    def _file_size(cls, path: str) -> int:
+        key = cls._file_key(path)
+        return key[1] if key is not None else 0
+
+    @staticmethod
+    def _file_key(path: str) -> Optional[Tuple[int, int]]:
+        """(inode, size) of a file, taken before mapping it; None if it is missing."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _sync(self, f) -> None:
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
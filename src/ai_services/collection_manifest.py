@@ -0,0 +1,81 @@
+# src/ai_services/collection_manifest.py
+
+import fcntl
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+# Snapshot version, collection version (little-endian uint64 each)
+_STAMP = struct.Struct("<QQ")
+
+
+class CollectionManifest:
+    """
+    Cross-process version stamp and lock for a persisted vector collection.
+
+    `<name>.manifest` holds two counters:
+    - snapshot version: bumped whenever compaction publishes a new base
+    - collection version: seq of the last write-ahead log record
+
+    Writers hold an exclusive `flock` on `<name>.lock` while they append to
+    the log or publish a snapshot. Readers poll the stamp without locking and
+    only take the lock when there is something new to load.
+    """
+
+    def __init__(self, directory: str, collection_name: str):
+        self.path = os.path.join(directory, f"{collection_name}.manifest")
+        self.lock_path = os.path.join(directory, f"{collection_name}.lock")
+        self.compaction_lock_path = os.path.join(directory, f"{collection_name}.compact.lock")
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._compaction_fd = os.open(self.compaction_lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        # flock is held per open file, so nested use within the process is
+        # counted here; callers serialize threads with their own lock
+        self._depth = 0
+        self._depth_lock = threading.Lock()
+
+    def read(self) -> Tuple[int, int]:
+        """Return (snapshot version, collection version); zeros if unset."""
+        data = os.pread(self._fd, _STAMP.size, 0)
+        if len(data) < _STAMP.size:
+            return 0, 0
+        return _STAMP.unpack(data)
+
+    def write(self, snapshot_version: int, version: int) -> None:
+        """Overwrite the stamp in place. Caller holds the lock."""
+        os.pwrite(self._fd, _STAMP.pack(snapshot_version, version), 0)
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Hold the exclusive collection lock (re-entrant within a process)."""
+        with self._depth_lock:
+            if self._depth == 0:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._depth += 1
+        try:
+            yield
+        finally:
+            with self._depth_lock:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def try_compaction_lock(self) -> Iterator[bool]:
+        """
+        Try to become the single compacting process. Yields False without
+        waiting if another process is already compacting this collection.
+        """
+        try:
+            fcntl.flock(self._compaction_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(self._compaction_fd, fcntl.LOCK_UN)
@@ -11,6 +11,7 @@ class AIModelProvider(str, Enum):
     OPENAI = "openai"
     GEMINI = "google-gla"
     HUGGINGFACE = "huggingface"
+    FAKE = "fake"  # offline stand-ins for benchmarks and load tests
     
     
 class AIModelType(str, Enum):
@@ -21,6 +22,37 @@ class AIModelType(str, Enum):
     LLM = 1
 
 
+class VectorIndexType(str, Enum):
+    """
+    Enum for FAISS index layouts.
+    AUTO starts flat and is promoted to IVF/HNSW as the collection grows.
+    """
+    AUTO = "auto"
+    FLAT = "flat"
+    IVF = "ivf"
+    HNSW = "hnsw"
+
+
+class VectorStorageType(str, Enum):
+    """
+    Enum for how vectors are encoded inside a FAISS index.
+    FLOAT32 stores them exactly; the others trade recall for memory.
+    """
+    FLOAT32 = "float32"
+    FP16 = "fp16"   # 2 bytes per dimension
+    SQ8 = "sq8"     # 1 byte per dimension
+    PQ = "pq"       # VECTOR_PQ_M bytes per vector (IVF / HNSW layouts)
+
+
+class LocalEmbeddingBackend(str, Enum):
+    """
+    Inference runtime for the local (huggingface) embedding provider.
+    """
+    TORCH = "torch"
+    ONNX = "onnx"
+    ONNX_INT8 = "onnx-int8"  # dynamically quantized ONNX export, fastest on CPU
+
+
 class AISettings:
     """
     Centralized AI configuration settings.
@@ -28,7 +60,96 @@ class AISettings:
     """
     # Path to vector store (e.g., Chroma, FAISS)
     VECTOR_STORE_PATH: str = os.getenv("CHROMA_PATH", "database/faiss_vector_db")
-    # Selected provider (openai | gemini | huggingface)
+    # FAISS index layout (auto | flat | ivf | hnsw)
+    VECTOR_INDEX_TYPE: VectorIndexType = VectorIndexType(os.getenv("VECTOR_INDEX_TYPE", "auto"))
+    # AUTO mode promotes flat → IVF → HNSW once ntotal crosses these (0 disables a tier)
+    VECTOR_IVF_THRESHOLD: int = int(os.getenv("VECTOR_IVF_THRESHOLD", 50000))
+    VECTOR_HNSW_THRESHOLD: int = int(os.getenv("VECTOR_HNSW_THRESHOLD", 0))
+    # IVF tuning (nlist 0 = derived from collection size)
+    VECTOR_IVF_NLIST: int = int(os.getenv("VECTOR_IVF_NLIST", 0))
+    VECTOR_IVF_NPROBE: int = int(os.getenv("VECTOR_IVF_NPROBE", 16))
+    # HNSW tuning
+    VECTOR_HNSW_M: int = int(os.getenv("VECTOR_HNSW_M", 32))
+    VECTOR_HNSW_EF_CONSTRUCTION: int = int(os.getenv("VECTOR_HNSW_EF_CONSTRUCTION", 200))
+    VECTOR_HNSW_EF_SEARCH: int = int(os.getenv("VECTOR_HNSW_EF_SEARCH", 64))
+    # Vector encoding inside the index (float32 | fp16 | sq8 | pq)
+    VECTOR_STORAGE_TYPE: VectorStorageType = VectorStorageType(os.getenv("VECTOR_STORAGE_TYPE", "float32"))
+    # Product quantization: sub-quantizers per vector (0 = derived from dimension) and bits each
+    VECTOR_PQ_M: int = int(os.getenv("VECTOR_PQ_M", 0))
+    VECTOR_PQ_NBITS: int = int(os.getenv("VECTOR_PQ_NBITS", 8))
+    # Compressed indexes fetch top_k * factor candidates and re-rank them on the
+    # exact vectors kept on disk (0 disables re-ranking)
+    VECTOR_RERANK_FACTOR: int = int(os.getenv("VECTOR_RERANK_FACTOR", 4))
+    # Write-ahead log: compact into the base snapshot once the log reaches this size
+    VECTOR_WAL_COMPACT_BYTES: int = int(os.getenv("VECTOR_WAL_COMPACT_BYTES", 64 * 1024 * 1024))
+    VECTOR_WAL_FSYNC: bool = os.getenv("VECTOR_WAL_FSYNC", "true").lower() == "true"
+    # Map the persisted index read-only (shared page cache across workers); new
+    # vectors are held in memory until the next compaction publishes a snapshot
+    VECTOR_STORE_MMAP: bool = os.getenv("VECTOR_STORE_MMAP", "false").lower() == "true"
+    # Deleted vectors are tombstoned; purge them once they exceed this share of the index
+    VECTOR_TOMBSTONE_COMPACT_RATIO: float = float(os.getenv("VECTOR_TOMBSTONE_COMPACT_RATIO", 0.2))
+    # Reuse document embeddings by content hash (embedding_cache.db under VECTOR_STORE_PATH)
+    EMBEDDING_CACHE: bool = os.getenv("EMBEDDING_CACHE", "true").lower() == "true"
+    # Document embedding requests: texts per batch (also capped by characters),
+    # batches in flight at once, and attempts per batch
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+    EMBEDDING_BATCH_MAX_CHARS: int = int(os.getenv("EMBEDDING_BATCH_MAX_CHARS", 100000))
+    EMBEDDING_CONCURRENCY: int = int(os.getenv("EMBEDDING_CONCURRENCY", 4))
+    EMBEDDING_RETRIES: int = int(os.getenv("EMBEDDING_RETRIES", 3))
+    # In-memory LRU of query embeddings per worker (0 disables), entries expire after TTL seconds
+    QUERY_EMBEDDING_CACHE_SIZE: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+    QUERY_EMBEDDING_CACHE_TTL: float = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", 3600))
+    # Coalesce concurrent query embeddings arriving within MAX_WAIT_MS into one call
+    # of at most MAX_SIZE queries (MAX_SIZE <= 1 disables)
+    QUERY_BATCH_MAX_SIZE: int = int(os.getenv("QUERY_BATCH_MAX_SIZE", 32))
+    QUERY_BATCH_MAX_WAIT_MS: float = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", 5))
+    # Hybrid retrieval: fuse BM25 keyword hits with vector hits by reciprocal rank
+    RAG_HYBRID_SEARCH: bool = os.getenv("RAG_HYBRID_SEARCH", "true").lower() == "true"
+    RAG_RRF_K: int = int(os.getenv("RAG_RRF_K", 60))
+    # Candidates taken from each retriever before fusion (at least top_k)
+    RAG_HYBRID_CANDIDATES: int = int(os.getenv("RAG_HYBRID_CANDIDATES", 20))
+    # Maximal marginal relevance: pick a diverse top_k out of fetch_k candidates;
+    # lambda trades relevance (1.0) against novelty (0.0)
+    RAG_MMR: bool = os.getenv("RAG_MMR", "false").lower() == "true"
+    RAG_MMR_FETCH_K: int = int(os.getenv("RAG_MMR_FETCH_K", 20))
+    RAG_MMR_LAMBDA: float = float(os.getenv("RAG_MMR_LAMBDA", 0.5))
+    # Semantic answer cache: reuse the answer of an earlier question whose embedding is
+    # at least this similar (0 entries disables); cleared whenever the collection changes
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", 1024))
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+    # Local sentence-transformers embeddings (AI_PROVIDER=huggingface)
+    LOCAL_EMBEDDING_BACKEND: LocalEmbeddingBackend = LocalEmbeddingBackend(
+        os.getenv("LOCAL_EMBEDDING_BACKEND", "torch")
+    )
+    # Quantized ONNX file inside the model repository, used by the onnx-int8 backend
+    LOCAL_EMBEDDING_ONNX_INT8_FILE: str = os.getenv("LOCAL_EMBEDDING_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+    LOCAL_EMBEDDING_DEVICE: Optional[str] = os.getenv("LOCAL_EMBEDDING_DEVICE") or None
+    LOCAL_EMBEDDING_BATCH_SIZE: int = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", 32))
+    LOCAL_EMBEDDING_THREADS: int = int(os.getenv("LOCAL_EMBEDDING_THREADS", 1))
+    # Offline stand-in providers (AI_PROVIDER=fake): hashing embeddings and an LLM with
+    # log-normal time to first token, a fixed token rate and injected 429/503 errors
+    FAKE_SEED: int = int(os.getenv("FAKE_SEED", 0))
+    FAKE_EMBEDDING_DIMENSION: int = int(os.getenv("FAKE_EMBEDDING_DIMENSION", 384))
+    FAKE_EMBEDDING_LATENCY_MS: float = float(os.getenv("FAKE_EMBEDDING_LATENCY_MS", 50))
+    FAKE_LLM_LATENCY_MS: float = float(os.getenv("FAKE_LLM_LATENCY_MS", 800))
+    FAKE_LLM_LATENCY_SIGMA: float = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", 0.4))
+    FAKE_LLM_TOKENS_PER_SEC: float = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", 60))
+    FAKE_LLM_OUTPUT_TOKENS: int = int(os.getenv("FAKE_LLM_OUTPUT_TOKENS", 150))
+    FAKE_LLM_ERROR_RATE: float = float(os.getenv("FAKE_LLM_ERROR_RATE", 0.0))
+    # Pooled keep-alive HTTP client shared by the cached LLM agents (seconds / counts)
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", 600))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+    # Proactive per-model LLM rate limiting: requests / tokens per minute (0 = unlimited)
+    # and the range the AIMD concurrency limit moves in on throttling responses
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_RPM: float = float(os.getenv("RATE_LIMIT_RPM", 0))
+    RATE_LIMIT_TPM: float = float(os.getenv("RATE_LIMIT_TPM", 0))
+    RATE_LIMIT_MAX_CONCURRENCY: int = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", 16))
+    RATE_LIMIT_MIN_CONCURRENCY: int = int(os.getenv("RATE_LIMIT_MIN_CONCURRENCY", 1))
+    # Selected provider (openai | gemini | huggingface | fake)
     PROVIDER: AIModelProvider = AIModelProvider(os.getenv("AI_PROVIDER", "google-gla"))
     
     # Mapping of provider → model types (embedding & LLM)
@@ -45,6 +166,10 @@ class AISettings:
             AIModelType.EMBEDDING : os.getenv("HF_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
             AIModelType.LLM: None,  # Typically HF models are used for embeddings only
         },
+        AIModelProvider.FAKE: {
+            AIModelType.EMBEDDING: "hashing",
+            AIModelType.LLM: "fake",
+        },
     }
 
     @classmethod
@@ -0,0 +1,210 @@
+# src/ai_services/embedding_cache.py
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Disk-backed cache of document embeddings, shared by every collection.
+
+    Rows are keyed by (provider, model, sha256 of the text) and hold the
+    vector as raw float32 bytes, so re-processing a document only sends
+    chunks whose text changed to the provider. Lives in
+    `<directory>/embedding_cache.db` (SQLite, WAL mode, safe across
+    worker processes).
+    """
+
+    FILENAME = "embedding_cache.db"
+    # Keeps each lookup under SQLite's bound-parameter limit
+    BATCH_SIZE = 500
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, self.FILENAME)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (provider, model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, provider: str, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for the texts, in order; None for misses."""
+        hashes = [self.text_hash(text) for text in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(hashes), self.BATCH_SIZE):
+                batch = list(set(hashes[start:start + self.BATCH_SIZE]))
+                rows = self._conn.execute(
+                    "SELECT text_hash, vector FROM embeddings "
+                    f"WHERE provider = ? AND model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [provider, model, *batch],
+                ).fetchall()
+                found.update(
+                    (text_hash, np.frombuffer(vector, dtype=np.float32)) for text_hash, vector in rows
+                )
+
+            vectors = [found.get(text_hash) for text_hash in hashes]
+            hits = sum(vector is not None for vector in vectors)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(
+        self,
+        provider: str,
+        model: str,
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+    ) -> None:
+        """Store vectors for the texts, replacing existing entries."""
+        rows = [
+            (provider, model, self.text_hash(text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (provider, model, text_hash, vector) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit / miss counters of this process and the number of stored vectors."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded in-memory cache of query embeddings with LRU eviction and a TTL.
+
+    Users ask the same questions over and over, so their embeddings are
+    kept per worker process. Concurrent misses for the same key are
+    single-flighted: the first caller embeds, the others await its result.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, ...], Tuple[float, List[float]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, ...], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Case- and whitespace-insensitive form of a question."""
+        return " ".join(text.casefold().split())
+
+    def get(self, key: Tuple[str, ...]) -> Optional[List[float]]:
+        """Cached embedding for a key, counting the hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key: Tuple[str, ...], embedding: Sequence[float]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, list(embedding))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def get_or_embed(
+        self,
+        key: Tuple[str, ...],
+        embed: Callable[[], Awaitable[List[float]]],
+    ) -> List[float]:
+        """Return the cached embedding, or embed once for all concurrent callers."""
+        embedding = self.get(key)
+        if embedding is not None:
+            return embedding
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            # Shielded so a cancelled waiter does not cancel the shared request
+            return list(await asyncio.shield(inflight))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            embedding = await embed()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; mark it retrieved in case there are none
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        self.put(key, embedding)
+        future.set_result(embedding)
+        return embedding
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
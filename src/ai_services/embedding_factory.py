@@ -1,40 +1,311 @@
 # src/ai/embedding_factory.py
 
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from .agent_manager import AgentManager
 from .model_factory import ModelFactory
-from .config import AIModelProvider
+from .config import AIModelProvider, AISettings, LocalEmbeddingBackend
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from .fake_providers import fake_embedding_model
+from .micro_batcher import MicroBatcher
 from pydantic_ai import Embedder
 
 
+class LocalEmbeddingModel:
+    """
+    sentence-transformers model running on this machine's CPU/GPU.
+
+    Loaded once per process (see `get`) and driven from a dedicated thread
+    pool so encoding never blocks the event loop; concurrent callers queue
+    on the pool while `encode` batches their texts internally. The ONNX
+    backends use onnxruntime instead of torch, optionally with the
+    int8-quantized export of the model, which is several times faster on CPU.
+    """
+
+    _instances: Dict[Tuple[str, LocalEmbeddingBackend], "LocalEmbeddingModel"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, model_name: str, backend: LocalEmbeddingBackend = LocalEmbeddingBackend.TORCH):
+        # Optional dependency: only needed for the local provider
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.backend = backend
+        started = time.perf_counter()
+        if backend == LocalEmbeddingBackend.TORCH:
+            self.model = SentenceTransformer(model_name, device=AISettings.LOCAL_EMBEDDING_DEVICE)
+        else:
+            model_kwargs = {}
+            if backend == LocalEmbeddingBackend.ONNX_INT8:
+                model_kwargs["file_name"] = AISettings.LOCAL_EMBEDDING_ONNX_INT8_FILE
+            self.model = SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+        logger.info(
+            "Loaded local embedding model {} ({}) in {:.1f}s",
+            model_name,
+            backend.value,
+            time.perf_counter() - started,
+        )
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, AISettings.LOCAL_EMBEDDING_THREADS),
+            thread_name_prefix="local-embedding",
+        )
+        self._stats_lock = threading.Lock()
+        self.texts = 0
+        self.seconds = 0.0
+
+    @classmethod
+    def get(cls, model_name: str, backend: LocalEmbeddingBackend) -> "LocalEmbeddingModel":
+        """Process-wide instance per (model, backend)."""
+        with cls._instances_lock:
+            instance = cls._instances.get((model_name, backend))
+            if instance is None:
+                instance = cls(model_name, backend)
+                cls._instances[(model_name, backend)] = instance
+            return instance
+
+    async def embed(self, texts: List[str], input_type: str) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._encode, texts, input_type)
+
+    def _encode(self, texts: List[str], input_type: str) -> list[list[float]]:
+        started = time.perf_counter()
+        # Models with query / document prompts apply them in encode_query / encode_document
+        encode = self.model.encode_query if input_type == "query" else self.model.encode_document
+        vectors = encode(
+            texts,
+            batch_size=AISettings.LOCAL_EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        elapsed = time.perf_counter() - started
+
+        with self._stats_lock:
+            self.texts += len(texts)
+            self.seconds += elapsed
+        logger.debug(
+            "Encoded {} texts in {:.3f}s ({:.0f} docs/sec)",
+            len(texts),
+            elapsed,
+            len(texts) / elapsed if elapsed else 0.0,
+        )
+        return vectors.tolist()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "model": self.model_name,
+                "backend": self.backend.value,
+                "texts": self.texts,
+                "seconds": self.seconds,
+                "docs_per_sec": self.texts / self.seconds if self.seconds else None,
+            }
+
+
 class EmbeddingFactory:
     """
     Uses pydantic_ai to initialize and dispatch to the correct embedding backend.
     This abstracts away provider-specific dependencies.
     """
 
-    def __init__(self, provider: Optional[AIModelProvider] = None) -> None:
+    def __init__(
+        self,
+        provider: Optional[AIModelProvider] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ) -> None:
         provider, model_name = ModelFactory.get_model_name(provider=provider, is_embedding=True)
-        self.model = Embedder(model=f"{provider.value}:{model_name}")
         self.provider = provider
+        self.model_name = model_name
+        self.model: Optional[Embedder] = None
+        self.local_model: Optional[LocalEmbeddingModel] = None
+        if provider == AIModelProvider.HUGGINGFACE:
+            backend = AISettings.LOCAL_EMBEDDING_BACKEND
+            self.local_model = LocalEmbeddingModel.get(model_name, backend)
+            if backend != LocalEmbeddingBackend.TORCH:
+                # Quantized vectors differ slightly; keep them apart in the caches
+                self.model_name = f"{model_name}@{backend.value}"
+        elif provider == AIModelProvider.FAKE:
+            self.model = Embedder(model=fake_embedding_model())
+        else:
+            self.model = Embedder(model=f"{provider.value}:{model_name}")
+        # Shared cache is injected by RAGServiceRegistry
+        if cache is None and AISettings.EMBEDDING_CACHE:
+            cache = EmbeddingCache(AISettings.VECTOR_STORE_PATH)
+        self.cache = cache
+        # Per-process LRU of query embeddings (repeated questions skip the provider)
+        self.query_cache = (
+            QueryEmbeddingCache(AISettings.QUERY_EMBEDDING_CACHE_SIZE, AISettings.QUERY_EMBEDDING_CACHE_TTL)
+            if AISettings.QUERY_EMBEDDING_CACHE_SIZE > 0
+            else None
+        )
+        # Concurrent query requests share one embed call
+        self.query_batcher = (
+            MicroBatcher(
+                self._embed_query_batch,
+                max_batch_size=AISettings.QUERY_BATCH_MAX_SIZE,
+                max_wait=AISettings.QUERY_BATCH_MAX_WAIT_MS / 1000,
+            )
+            if AISettings.QUERY_BATCH_MAX_SIZE > 1
+            else None
+        )
 
     async def embed_documents(self, texts: List[str]) -> list[list[float]]:
         logger.info("Embedding start: {} documents using provider '{}'", len(texts), self.provider)
         if not texts:
             raise ValueError("Text list for embedding cannot be empty.")
 
+        if self.cache is None:
+            embedded = await self._embed_batches(list(dict.fromkeys(texts)))
+            return [list(embedded[text]) for text in texts]
+
+        # Only texts not embedded before with this provider/model are sent
+        cached = self.cache.get_many(self.provider.value, self.model_name, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        hits = sum(vector is not None for vector in cached)
+        logger.info("Embedding cache: {} hits, {} texts to embed", hits, len(missing))
+
+        embedded = await self._embed_batches(missing) if missing else {}
+        return [
+            vector.tolist() if vector is not None else list(embedded[text])
+            for text, vector in zip(texts, cached)
+        ]
+
+    async def _embed_batches(self, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        Embed unique texts in provider-sized batches, a bounded number at a
+        time, each retried with backoff. With the embedding cache enabled
+        every finished batch is written to it straight away, so when a
+        batch finally fails the document's retry resumes from the batches
+        that were not embedded yet.
+        """
+        batches = self._batches(texts)
+        semaphore = asyncio.Semaphore(max(1, AISettings.EMBEDDING_CONCURRENCY))
+        embedded: Dict[str, List[float]] = {}
+
+        async def run(batch: List[str]) -> None:
+            async with semaphore:
+                vectors = await AgentManager.retry_with_backoff(
+                    lambda: self._embed_batch(batch),
+                    retries=AISettings.EMBEDDING_RETRIES,
+                    label="Embedding",
+                )
+            if self.cache is not None:
+                self.cache.put_many(self.provider.value, self.model_name, batch, vectors)
+            embedded.update(zip(batch, vectors))
+
+        results = await asyncio.gather(*(run(batch) for batch in batches), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if failures:
+            logger.error(
+                "{} of {} embedding batches failed ({} of {} texts embedded)",
+                len(failures),
+                len(batches),
+                len(embedded),
+                len(texts),
+            )
+            raise failures[0]
+
+        logger.info("Embedded {} texts in {} batches", len(texts), len(batches))
+        return embedded
+
+    async def _embed(self, texts: List[str], input_type: str) -> list[list[float]]:
+        """One embedding call to the local model or the provider."""
+        if self.local_model is not None:
+            return await self.local_model.embed(texts, input_type)
         # pydantic_ai `AIModel.embed` returns shape [[float]]
-        response = await self.model.embed(texts, input_type='document')
+        response = await self.model.embed(texts, input_type=input_type)
         return response.embeddings
 
+    async def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        embeddings = await self._embed(batch, 'document')
+        if len(embeddings) != len(batch):
+            raise ValueError(
+                f"Provider returned {len(embeddings)} embeddings for {len(batch)} texts"
+            )
+        return embeddings
+
+    @staticmethod
+    def _batches(texts: List[str]) -> List[List[str]]:
+        """Split texts into batches within both the count and the character budget."""
+        max_size = max(1, AISettings.EMBEDDING_BATCH_SIZE)
+        max_chars = AISettings.EMBEDDING_BATCH_MAX_CHARS
+
+        batches: List[List[str]] = []
+        batch: List[str] = []
+        chars = 0
+        for text in texts:
+            if batch and (len(batch) >= max_size or chars + len(text) > max_chars):
+                batches.append(batch)
+                batch, chars = [], 0
+            batch.append(text)
+            chars += len(text)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Counters of the document (on-disk) and query (in-memory) embedding
+        caches, plus the local model's throughput when one is used.
+        """
+        stats = {
+            "documents": {"enabled": True, **self.cache.stats()} if self.cache else {"enabled": False},
+            "queries": (
+                {"enabled": True, **self.query_cache.stats()} if self.query_cache else {"enabled": False}
+            ),
+        }
+        if self.local_model is not None:
+            stats["local_model"] = self.local_model.stats()
+        return stats
+
+    def _query_key(self, query: str) -> tuple:
+        return (self.provider.value, self.model_name, QueryEmbeddingCache.normalize(query))
+
     async def embed_query(self, query: str) -> list[float]:
-        logger.info("Embedding start : query using provider '{}'", self.provider)
         if not query:
             raise ValueError("Query text cannot be empty.")
-        
-        if self.provider == AIModelProvider.HUGGINGFACE.value:
-            return self.model.encode([query])[0].tolist()
 
-        response = await self.model.embed([query], input_type='query')
-        return response.embeddings[0]
\ No newline at end of file
+        if self.query_cache is None:
+            return await self._embed_query(query)
+        return await self.query_cache.get_or_embed(self._query_key(query), lambda: self._embed_query(query))
+
+    async def _embed_query(self, query: str) -> list[float]:
+        logger.info("Embedding start : query using provider '{}'", self.provider)
+
+        if self.query_batcher is not None:
+            return await self.query_batcher.submit(query)
+
+        return (await self._embed([query], 'query'))[0]
+
+    async def _embed_query_batch(self, queries: List[str]) -> list[list[float]]:
+        """Handler of the query micro-batcher: one embed call for coalesced queries."""
+        logger.info("Embedding start: micro-batch of {} queries using provider '{}'", len(queries), self.provider)
+        return await self._embed(queries, 'query')
+
+    async def embed_queries(self, queries: List[str]) -> list[list[float]]:
+        logger.info("Embedding start: {} queries using provider '{}'", len(queries), self.provider)
+        if not queries or not all(queries):
+            raise ValueError("Query texts for embedding cannot be empty.")
+
+        if self.query_cache is None:
+            # One request for the whole batch, in input order
+            return await self._embed(queries, 'query')
+
+        keys = [self._query_key(query) for query in queries]
+        cached = [self.query_cache.get(key) for key in keys]
+        missing = {key: query for key, query, embedding in zip(keys, queries, cached) if embedding is None}
+        embedded = {}
+        if missing:
+            # One request for all uncached queries
+            embedded = dict(zip(missing, await self._embed(list(missing.values()), 'query')))
+            for key, embedding in embedded.items():
+                self.query_cache.put(key, embedding)
+        return [
+            embedding if embedding is not None else list(embedded[key])
+            for key, embedding in zip(keys, cached)
+        ]
@@ -0,0 +1,252 @@
+# src/ai_services/fake_providers.py
+
+"""
+Offline stand-ins for the embedding and LLM providers (AI_PROVIDER=fake).
+
+They keep the whole query path, including AgentManager.run_with_backoff,
+running under realistic timings with no network access, for benchmarks
+and load tests:
+- HashingEmbeddingModel: deterministic feature-hashing embeddings, so
+  questions sharing words land near each other
+- fake_chat_model(): a pydantic_ai FunctionModel answering (or streaming
+  token by token) after a log-normal time-to-first-token plus output tokens at a fixed rate,
+  failing a configurable share of requests with HTTP 429 / 503, and
+  reporting a repeated system prompt as cache-read input tokens the way
+  providers' automatic prefix caching does
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Set, Union
+
+import numpy as np
+from pydantic_ai.embeddings import EmbeddingModel, EmbeddingSettings
+from pydantic_ai.embeddings.result import EmbeddingResult, EmbedInputType
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, DeltaToolCalls, FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+from .config import AISettings
+from .lexical_index import tokenize
+
+FAKE_MODEL_NAME = "fake"
+
+
+@dataclass(init=False)
+class HashingEmbeddingModel(EmbeddingModel):
+    """
+    Embeds text by hashing its terms (and adjacent term pairs) into a
+    fixed number of signed buckets, then L2-normalizing. Deterministic
+    across processes and runs.
+    """
+
+    _dimensions: int
+    _latency: float
+
+    def __init__(
+        self,
+        dimensions: int = 384,
+        latency_ms: float = 0.0,
+        settings: EmbeddingSettings | None = None,
+    ):
+        self._dimensions = dimensions
+        self._latency = latency_ms / 1000
+        super().__init__(settings=settings)
+
+    @property
+    def model_name(self) -> str:
+        return f"hashing-{self._dimensions}"
+
+    @property
+    def system(self) -> str:
+        return FAKE_MODEL_NAME
+
+    async def embed(
+        self,
+        inputs: str | Sequence[str],
+        *,
+        input_type: EmbedInputType,
+        settings: EmbeddingSettings | None = None,
+    ) -> EmbeddingResult:
+        inputs, settings = self.prepare_embed(inputs, settings)
+        if self._latency:
+            await asyncio.sleep(self._latency)
+
+        return EmbeddingResult(
+            embeddings=[self._vector(text) for text in inputs],
+            inputs=inputs,
+            input_type=input_type,
+            usage=RequestUsage(input_tokens=sum(len(text.split()) for text in inputs)),
+            model_name=self.model_name,
+            provider_name=self.system,
+            provider_response_id=str(uuid.uuid4()),
+        )
+
+    async def max_input_tokens(self) -> int | None:
+        return None
+
+    async def count_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def _vector(self, text: str) -> List[float]:
+        terms = tokenize(text)
+        features = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+
+        vector = np.zeros(self._dimensions, dtype=np.float32)
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self._dimensions] += 1.0 if value >> 63 else -1.0
+
+        norm = float(np.linalg.norm(vector))
+        if norm == 0:
+            # Texts without terms still get a valid (constant) direction
+            vector[0], norm = 1.0, 1.0
+        return (vector / norm).tolist()
+
+
+class _FakeTimings:
+    """Latency / failure draws shared by every fake agent in the process."""
+
+    def __init__(self, seed: int):
+        self._random = random.Random(seed)
+
+    def time_to_first_token(self) -> float:
+        median = AISettings.FAKE_LLM_LATENCY_MS / 1000
+        if median <= 0:
+            return 0.0
+        return self._random.lognormvariate(math.log(median), AISettings.FAKE_LLM_LATENCY_SIGMA)
+
+    def fails(self) -> bool:
+        return self._random.random() < AISettings.FAKE_LLM_ERROR_RATE
+
+    def error_status(self) -> int:
+        return self._random.choice((429, 503))
+
+
+_timings = _FakeTimings(AISettings.FAKE_SEED)
+
+# Hashes of system prompts already sent, standing in for the provider's prefix cache
+_cached_prefixes: Set[bytes] = set()
+
+
+def _question(messages: List[ModelMessage]) -> str:
+    """The last text of the latest user prompt (the question follows any context)."""
+    for message in reversed(messages):
+        if isinstance(message, ModelRequest):
+            for part in message.parts:
+                if not isinstance(part, UserPromptPart):
+                    continue
+                if isinstance(part.content, str):
+                    return part.content
+                texts = [item for item in part.content if isinstance(item, str)]
+                if texts:
+                    return texts[-1]
+    return ""
+
+
+def _usage(messages: List[ModelMessage], output_tokens: int) -> RequestUsage:
+    """Whitespace token counts, with a previously seen system prompt as cache reads."""
+    prefix, total = [], 0
+    for message in messages:
+        if isinstance(message, ModelRequest):
+            for part in message.parts:
+                if isinstance(part, SystemPromptPart):
+                    prefix.append(part.content)
+                if isinstance(part, (SystemPromptPart, UserPromptPart)):
+                    content = part.content if isinstance(part.content, list) else [part.content]
+                    total += sum(len(item.split()) for item in content if isinstance(item, str))
+
+    prefix_text = "\n".join(prefix)
+    digest = hashlib.blake2b(prefix_text.encode("utf-8"), digest_size=16).digest()
+    cached = len(prefix_text.split()) if digest in _cached_prefixes else 0
+    _cached_prefixes.add(digest)
+    return RequestUsage(input_tokens=total, cache_read_tokens=cached, output_tokens=output_tokens)
+
+
+def _answer_text(question: str, tokens: int) -> str:
+    """Deterministic answer of roughly `tokens` words."""
+    prefix = f"Stand-in answer to: {question.strip()}"
+    filler = tokenize(question) or ["answer"]
+    missing = max(0, tokens - len(prefix.split()))
+    return " ".join([prefix, *(filler[i % len(filler)] for i in range(missing))])
+
+
+async def _respond(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+    delay = _timings.time_to_first_token()
+    if _timings.fails():
+        await asyncio.sleep(delay)
+        raise ModelHTTPError(
+            status_code=_timings.error_status(),
+            model_name=FAKE_MODEL_NAME,
+            body={"error": "injected failure"},
+        )
+
+    tokens = AISettings.FAKE_LLM_OUTPUT_TOKENS
+    if AISettings.FAKE_LLM_TOKENS_PER_SEC > 0:
+        delay += tokens / AISettings.FAKE_LLM_TOKENS_PER_SEC
+    await asyncio.sleep(delay)
+
+    text = _answer_text(_question(messages), tokens)
+    usage = _usage(messages, tokens)
+    if info.output_tools:
+        # Structured output (e.g. AnswerOutput) is returned through the output tool
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"answer": text})], usage=usage)
+    return ModelResponse(parts=[TextPart(text)], usage=usage)
+
+
+async def _stream(messages: List[ModelMessage], info: AgentInfo) -> AsyncIterator[Union[str, DeltaToolCalls]]:
+    """Streamed variant of _respond: the first token after the TTFT, then one per token interval."""
+    await asyncio.sleep(_timings.time_to_first_token())
+    if _timings.fails():
+        raise ModelHTTPError(
+            status_code=_timings.error_status(),
+            model_name=FAKE_MODEL_NAME,
+            body={"error": "injected failure"},
+        )
+
+    tokens = AISettings.FAKE_LLM_OUTPUT_TOKENS
+    interval = 1 / AISettings.FAKE_LLM_TOKENS_PER_SEC if AISettings.FAKE_LLM_TOKENS_PER_SEC > 0 else 0.0
+    words = _answer_text(_question(messages), tokens).split(" ")
+    tool_name = info.output_tools[0].name if info.output_tools else None
+
+    if tool_name:
+        yield {0: DeltaToolCall(name=tool_name, json_args='{"answer": "')}
+    for i, word in enumerate(words):
+        if i:
+            await asyncio.sleep(interval)
+        piece = word if i == 0 else f" {word}"
+        if tool_name:
+            # Escaped string contents, without the surrounding quotes
+            yield {0: DeltaToolCall(json_args=json.dumps(piece)[1:-1])}
+        else:
+            yield piece
+    if tool_name:
+        yield {0: DeltaToolCall(json_args='"}')}
+
+
+def fake_chat_model() -> FunctionModel:
+    """LLM stand-in with the configured latency, token rate and error rate."""
+    return FunctionModel(_respond, stream_function=_stream, model_name=FAKE_MODEL_NAME)
+
+
+def fake_embedding_model() -> HashingEmbeddingModel:
+    return HashingEmbeddingModel(
+        dimensions=AISettings.FAKE_EMBEDDING_DIMENSION,
+        latency_ms=AISettings.FAKE_EMBEDDING_LATENCY_MS,
+    )
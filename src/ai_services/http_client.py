@@ -0,0 +1,99 @@
+# src/ai_services/http_client.py
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict
+
+import httpx
+
+from .config import AISettings
+
+
+class HTTPClientMetrics:
+    """
+    Request and connection counters for the shared provider HTTP clients.
+
+    New TCP connections and TLS handshakes are counted from httpcore trace
+    events, so `connection_reuse` is the share of requests that went out
+    on an already open (keep-alive) connection.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.clients = 0
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self._count("requests")
+        inner = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                self._count("connections")
+            elif event_name == "connection.start_tls.complete":
+                self._count("tls_handshakes")
+            if inner is not None:
+                await inner(event_name, info)
+
+        request.extensions["trace"] = trace
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": self.clients,
+                "requests": self.requests,
+                "connections": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "connection_reuse": (
+                    1 - self.connections / self.requests if self.requests else None
+                ),
+            }
+
+
+metrics = HTTPClientMetrics()
+
+# Connections belong to the event loop that opened them, so there is one
+# client per running loop (in the API server: exactly one)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+
+def shared_http_client() -> httpx.AsyncClient:
+    """
+    Pooled keep-alive client shared by every provider model on the current
+    event loop, so requests reuse open connections instead of paying a
+    new TCP and TLS handshake.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(AISettings.HTTP_TIMEOUT, connect=AISettings.HTTP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=AISettings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=AISettings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=AISettings.HTTP_KEEPALIVE_EXPIRY,
+                ),
+                event_hooks={"request": [metrics.on_request]},
+            )
+            _clients[loop] = client
+            metrics._count("clients")
+        return client
+
+
+async def close_shared_http_client() -> None:
+    """Close the current loop's client. Called on application shutdown."""
+    with _clients_lock:
+        client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
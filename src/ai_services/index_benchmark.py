@@ -0,0 +1,157 @@
+# src/ai_services/index_benchmark.py
+
+"""
+Memory vs. recall report for the vector encodings of a collection.
+
+Held-out chunks of the collection are used as queries against indexes
+built from the remaining chunks with each encoding; recall@k is measured
+against exact search, with and without the re-ranking pass, and memory
+against the float32 index of the same layout.
+
+    python -m src.ai_services.index_benchmark --collection documents --k 10
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from .config import AISettings, VectorIndexType, VectorStorageType
+from .index_factory import IndexFactory
+from .vector_store import FAISSVectorStore
+
+
+def _recall(labels: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(expected)) for row, expected in zip(labels, truth))
+    return hits / truth.size
+
+
+def _rerank(
+    queries: np.ndarray,
+    labels: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+) -> np.ndarray:
+    """Re-score candidates on exact vectors (labels are row positions)."""
+    scores = np.einsum("qd,qcd->qc", queries, vectors[np.maximum(labels, 0)])
+    scores[labels == -1] = -np.inf
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(labels, order, axis=1)
+
+
+def run_report(
+    collection_name: str,
+    k: int = 10,
+    num_queries: int = 200,
+    index_type: Optional[VectorIndexType] = None,
+    storage_types: Optional[List[VectorStorageType]] = None,
+    rerank_factor: Optional[int] = None,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Build the collection's vectors with each encoding and measure memory
+    and recall@k. Returns one row per encoding, float32 first.
+    """
+    store = FAISSVectorStore(collection_name)
+    vectors, _ = store.get_vectors()
+    store.close()
+
+    if len(vectors) <= num_queries + k:
+        raise ValueError(
+            f"Collection {collection_name} has {len(vectors)} vectors; "
+            f"need more than {num_queries + k} to hold out {num_queries} queries"
+        )
+
+    rerank_factor = AISettings.VECTOR_RERANK_FACTOR if rerank_factor is None else rerank_factor
+    # float32 is always measured: it is the memory baseline
+    storage_types = [VectorStorageType.FLOAT32] + [
+        storage_type
+        for storage_type in storage_types or list(VectorStorageType)
+        if storage_type != VectorStorageType.FLOAT32
+    ]
+
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    queries = np.ascontiguousarray(vectors[order[:num_queries]])
+    corpus = np.ascontiguousarray(vectors[order[num_queries:]])
+    positions = np.arange(len(corpus), dtype=np.int64)
+
+    exact = faiss.IndexFlatIP(corpus.shape[1])
+    exact.add(corpus)
+    _, truth = exact.search(queries, k)
+
+    index_type = IndexFactory.resolve_type(len(corpus), index_type)
+    rows = []
+    for requested in storage_types:
+        storage_type = IndexFactory.resolve_storage(len(corpus), requested, index_type)
+        index = IndexFactory.build(corpus, positions, index_type, storage_type)
+
+        started = time.perf_counter()
+        _, labels = index.search(queries, k)
+        elapsed = time.perf_counter() - started
+
+        row = {
+            "index_type": index_type.value,
+            "requested_storage_type": requested.value,
+            "storage_type": storage_type.value,
+            "index_bytes": IndexFactory.estimate_memory(index),
+            "recall": _recall(labels, truth),
+            "reranked_recall": None,
+            "ms_per_query": 1000 * elapsed / num_queries,
+        }
+        baseline_bytes = rows[0]["index_bytes"] if rows else row["index_bytes"]
+        row["memory_saved"] = 1 - row["index_bytes"] / baseline_bytes
+
+        if storage_type != VectorStorageType.FLOAT32 and rerank_factor > 1:
+            _, candidates = index.search(queries, k * rerank_factor)
+            row["reranked_recall"] = _recall(_rerank(queries, candidates, corpus, k), truth)
+
+        rows.append(row)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--collection", default="documents")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--index-type", type=VectorIndexType, default=None)
+    parser.add_argument(
+        "--storage",
+        type=VectorStorageType,
+        nargs="+",
+        default=None,
+        help="encodings to compare (default: all)",
+    )
+    parser.add_argument("--rerank-factor", type=int, default=None)
+    args = parser.parse_args()
+
+    rows = run_report(
+        args.collection,
+        k=args.k,
+        num_queries=args.queries,
+        index_type=args.index_type,
+        storage_types=args.storage,
+        rerank_factor=args.rerank_factor,
+    )
+
+    print(
+        f"{'index':<6} {'storage':<10} {'MiB':>9} {'saved':>7} "
+        f"{'recall@' + str(args.k):>10} {'reranked':>9} {'ms/query':>9}"
+    )
+    for row in rows:
+        reranked = "-" if row["reranked_recall"] is None else f"{row['reranked_recall']:.3f}"
+        storage = row["storage_type"]
+        if row["requested_storage_type"] != storage:
+            # e.g. PQ on a flat or small collection falls back to SQ8
+            storage = f"{storage}({row['requested_storage_type']})"
+        print(
+            f"{row['index_type']:<6} {storage:<10} "
+            f"{row['index_bytes'] / 2**20:>9.2f} {row['memory_saved']:>6.1%} "
+            f"{row['recall']:>10.3f} {reranked:>9} {row['ms_per_query']:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# src/ai_services/index_factory.py
+
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+from loguru import logger
+
+from .config import AISettings, VectorIndexType, VectorStorageType
+
+
+class IndexFactory:
+    """
+    Builds and tunes FAISS indexes for the vector store.
+
+    All indexes use inner product over L2-normalized vectors (cosine similarity)
+    and are wrapped in an `IndexIDMap2`, so search labels are the store's
+    int64 vector ids and vectors can be reconstructed by id.
+
+    The layout (flat / IVF / HNSW) and the vector encoding (float32, fp16,
+    SQ8 or PQ codes) are chosen independently.
+    """
+
+    # FAISS warns when IVF is trained on fewer than ~39 points per list
+    MIN_POINTS_PER_LIST = 39
+
+    _SQ_TYPES = {
+        VectorStorageType.FP16: faiss.ScalarQuantizer.QT_fp16,
+        VectorStorageType.SQ8: faiss.ScalarQuantizer.QT_8bit,
+    }
+
+    @classmethod
+    def resolve_type(
+        cls,
+        ntotal: int,
+        index_type: Optional[VectorIndexType] = None,
+    ) -> VectorIndexType:
+        """
+        Returns the concrete index type for a collection of `ntotal` vectors.
+        Explicit modes are returned as-is; AUTO applies the promotion thresholds.
+        """
+        index_type = index_type or AISettings.VECTOR_INDEX_TYPE
+        if index_type != VectorIndexType.AUTO:
+            return index_type
+
+        hnsw_threshold = AISettings.VECTOR_HNSW_THRESHOLD
+        ivf_threshold = AISettings.VECTOR_IVF_THRESHOLD
+
+        if hnsw_threshold and ntotal >= hnsw_threshold:
+            return VectorIndexType.HNSW
+        if ivf_threshold and ntotal >= ivf_threshold:
+            return VectorIndexType.IVF
+        return VectorIndexType.FLAT
+
+    @classmethod
+    def resolve_storage(
+        cls,
+        ntotal: int,
+        storage_type: Optional[VectorStorageType] = None,
+        index_type: Optional[VectorIndexType] = None,
+    ) -> VectorStorageType:
+        """
+        Returns the vector encoding for a collection of `ntotal` vectors in
+        an index of `index_type`. PQ needs enough points per centroid to
+        train its codebooks, and a flat PQ index can't filter by id, so small
+        or flat collections use SQ8 instead.
+        """
+        storage_type = storage_type or AISettings.VECTOR_STORAGE_TYPE
+        if storage_type == VectorStorageType.PQ and (
+            index_type == VectorIndexType.FLAT
+            or ntotal < cls.MIN_POINTS_PER_LIST * 2 ** AISettings.VECTOR_PQ_NBITS
+        ):
+            return VectorStorageType.SQ8
+        return storage_type
+
+    @classmethod
+    def needs_rebuild(
+        cls,
+        index: faiss.Index,
+        index_type: Optional[VectorIndexType] = None,
+        ntotal: Optional[int] = None,
+        storage_type: Optional[VectorStorageType] = None,
+    ) -> bool:
+        """
+        True when the index should be retrained for its current size (or
+        `ntotal`, if given): either the promotion policy now selects another
+        type or encoding, or an IVF index has outgrown the number of lists
+        it was trained with.
+        """
+        ntotal = index.ntotal if ntotal is None else ntotal
+        target = cls.resolve_type(ntotal, index_type)
+        if cls.kind_of(index) != target:
+            return True
+        if cls.storage_of(index) != cls.resolve_storage(ntotal, storage_type, target):
+            return True
+        if target == VectorIndexType.IVF:
+            return cls._ivf_nlist(ntotal) >= 2 * cls.unwrap(index).nlist
+        return False
+
+    @staticmethod
+    def unwrap(index: faiss.Index) -> faiss.Index:
+        """
+        Returns the underlying index of an id-mapped index (or the index itself).
+        """
+        if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+            return faiss.downcast_index(index.index)
+        return index
+
+    @classmethod
+    def kind_of(cls, index: Optional[faiss.Index]) -> Optional[VectorIndexType]:
+        """
+        Returns the index type of an existing FAISS index.
+        """
+        if index is None:
+            return None
+        index = cls.unwrap(index)
+        if isinstance(index, faiss.IndexHNSW):
+            return VectorIndexType.HNSW
+        if isinstance(index, faiss.IndexIVF):
+            return VectorIndexType.IVF
+        return VectorIndexType.FLAT
+
+    @classmethod
+    def storage_of(cls, index: Optional[faiss.Index]) -> Optional[VectorStorageType]:
+        """
+        Returns the vector encoding of an existing FAISS index.
+        """
+        if index is None:
+            return None
+        index = cls.unwrap(index)
+        if isinstance(index, faiss.IndexHNSW):
+            index = faiss.downcast_index(index.storage)
+        if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+            return VectorStorageType.PQ
+        if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+            if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16:
+                return VectorStorageType.FP16
+            return VectorStorageType.SQ8
+        return VectorStorageType.FLOAT32
+
+    @classmethod
+    def create(
+        cls,
+        dimension: int,
+        index_type: VectorIndexType,
+        training_vectors: Optional[np.ndarray] = None,
+        storage_type: Optional[VectorStorageType] = None,
+    ) -> faiss.Index:
+        """
+        Creates an empty (but trained, where required) id-mapped index.
+        """
+        ntrain = 0 if training_vectors is None else len(training_vectors)
+        storage_type = cls.resolve_storage(ntrain, storage_type, index_type)
+
+        if index_type == VectorIndexType.HNSW:
+            index = cls._hnsw(dimension, storage_type)
+        elif index_type == VectorIndexType.IVF:
+            if ntrain == 0:
+                raise ValueError("IVF index requires training vectors")
+            nlist = cls._ivf_nlist(ntrain)
+            index = cls._ivf(dimension, nlist, storage_type)
+            logger.info("Training IVF index | nlist={} vectors={}", nlist, ntrain)
+        else:
+            index = cls._flat(dimension, storage_type)
+
+        if not index.is_trained:
+            if ntrain == 0:
+                raise ValueError(f"{storage_type.value} encoding requires training vectors")
+            index.train(training_vectors)
+
+        cls.configure_search(index)
+        return faiss.IndexIDMap2(index)
+
+    @classmethod
+    def _hnsw(cls, dimension: int, storage_type: VectorStorageType) -> faiss.Index:
+        """HNSW graph over vectors in the given encoding."""
+        M, metric = AISettings.VECTOR_HNSW_M, faiss.METRIC_INNER_PRODUCT
+        if storage_type == VectorStorageType.PQ:
+            index = faiss.IndexHNSWPQ(
+                dimension, cls._pq_m(dimension), M, AISettings.VECTOR_PQ_NBITS, metric
+            )
+        elif storage_type in cls._SQ_TYPES:
+            index = faiss.IndexHNSWSQ(dimension, cls._SQ_TYPES[storage_type], M, metric)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, M, metric)
+        index.hnsw.efConstruction = AISettings.VECTOR_HNSW_EF_CONSTRUCTION
+        return index
+
+    @classmethod
+    def _ivf(cls, dimension: int, nlist: int, storage_type: VectorStorageType) -> faiss.Index:
+        """Untrained IVF index with `nlist` lists of vectors in the given encoding."""
+        metric = faiss.METRIC_INNER_PRODUCT
+        quantizer = faiss.IndexFlatIP(dimension)
+        if storage_type == VectorStorageType.PQ:
+            index = faiss.IndexIVFPQ(
+                quantizer, dimension, nlist,
+                cls._pq_m(dimension), AISettings.VECTOR_PQ_NBITS, metric,
+            )
+        elif storage_type in cls._SQ_TYPES:
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, dimension, nlist, cls._SQ_TYPES[storage_type], metric
+            )
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+        # Keep a position → list map so vectors can be reconstructed. The
+        # id map hands the IVF sequential ids, so an array is enough.
+        index.set_direct_map_type(faiss.DirectMap.Array)
+        return index
+
+    @classmethod
+    def _flat(cls, dimension: int, storage_type: VectorStorageType) -> faiss.Index:
+        """Exhaustive index over vectors in the given encoding."""
+        if storage_type in cls._SQ_TYPES:
+            return faiss.IndexScalarQuantizer(
+                dimension, cls._SQ_TYPES[storage_type], faiss.METRIC_INNER_PRODUCT
+            )
+        return faiss.IndexFlatIP(dimension)
+
+    @classmethod
+    def empty_like(
+        cls,
+        index: faiss.Index,
+        training_vectors: Optional[np.ndarray] = None,
+    ) -> faiss.Index:
+        """
+        Creates an empty index of the same type and encoding. IVF indexes
+        reuse the trained coarse quantizer and codec, so purging deleted
+        vectors does not rerun k-means; other encodings are retrained on
+        `training_vectors`.
+        """
+        inner = cls.unwrap(index)
+        if not isinstance(inner, faiss.IndexIVF):
+            return cls.create(
+                inner.d, cls.kind_of(inner), training_vectors, cls.storage_of(inner)
+            )
+
+        # Copies are taken field by field: the source may be a read-only
+        # mapping, which FAISS cannot clone and then reset
+        quantizer = faiss.clone_index(faiss.downcast_index(inner.quantizer))
+        if isinstance(inner, faiss.IndexIVFPQ):
+            empty = faiss.IndexIVFPQ(
+                quantizer, inner.d, inner.nlist, inner.pq.M, inner.pq.nbits, inner.metric_type
+            )
+            empty.pq = inner.pq
+            empty.by_residual = inner.by_residual
+        elif isinstance(inner, faiss.IndexIVFScalarQuantizer):
+            empty = faiss.IndexIVFScalarQuantizer(
+                quantizer, inner.d, inner.nlist, inner.sq.qtype, inner.metric_type
+            )
+            empty.sq = inner.sq
+            empty.by_residual = inner.by_residual
+        else:
+            empty = faiss.IndexIVFFlat(quantizer, inner.d, inner.nlist, faiss.METRIC_INNER_PRODUCT)
+        empty.set_direct_map_type(faiss.DirectMap.Array)
+        empty.is_trained = True
+        cls.configure_search(empty)
+        return faiss.IndexIDMap2(empty)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        ids: np.ndarray,
+        index_type: VectorIndexType,
+        storage_type: Optional[VectorStorageType] = None,
+    ) -> faiss.Index:
+        """
+        Creates an index of the given type and encoding and adds (already
+        normalized) vectors under their vector ids.
+        """
+        index = cls.create(
+            vectors.shape[1], index_type, training_vectors=vectors, storage_type=storage_type
+        )
+        index.add_with_ids(vectors, ids)
+        return index
+
+    @classmethod
+    def search_parameters(
+        cls,
+        index: faiss.Index,
+        selector: faiss.IDSelector,
+    ) -> faiss.SearchParameters:
+        """
+        Returns per-query search parameters restricting results to `selector`,
+        typed for the underlying index so nprobe / efSearch still apply.
+        """
+        inner = cls.unwrap(index)
+        if isinstance(inner, faiss.IndexIVF):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+        if isinstance(inner, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+        return faiss.SearchParameters(sel=selector)
+
+    @classmethod
+    def configure_search(cls, index: faiss.Index) -> None:
+        """
+        Applies query-time parameters (nprobe / efSearch) to a built or loaded index.
+        """
+        index = cls.unwrap(index)
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = min(AISettings.VECTOR_IVF_NPROBE, index.nlist)
+        elif isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = AISettings.VECTOR_HNSW_EF_SEARCH
+
+    @classmethod
+    def estimate_memory(cls, index: Optional[faiss.Index]) -> int:
+        """
+        Approximate resident bytes of an index: stored codes (full vectors
+        or compressed) plus the per-vector overhead of its structure (IVF
+        ids, HNSW links).
+        """
+        if index is None or index.ntotal == 0:
+            return 0
+
+        index = cls.unwrap(index)
+        if isinstance(index, faiss.IndexHNSW):
+            # Flat storage plus level-0 links (2*M int32 neighbours per vector)
+            code_bytes = index.ntotal * index.storage.sa_code_size()
+            return code_bytes + index.ntotal * index.hnsw.nb_neighbors(0) * 4
+        if isinstance(index, faiss.IndexIVF):
+            # Codes plus an int64 id per vector, plus the coarse centroids
+            code_bytes = index.ntotal * index.code_size
+            return code_bytes + index.ntotal * 8 + index.nlist * index.d * 4
+        return index.ntotal * index.sa_code_size()
+
+    @staticmethod
+    def _pq_m(dimension: int) -> int:
+        """Sub-quantizer count: configured, or the largest divisor of d up to d/4."""
+        if AISettings.VECTOR_PQ_M:
+            return AISettings.VECTOR_PQ_M
+        return next(m for m in range(max(1, dimension // 4), 0, -1) if dimension % m == 0)
+
+    @classmethod
+    def _ivf_nlist(cls, ntrain: int) -> int:
+        nlist = AISettings.VECTOR_IVF_NLIST or int(4 * math.sqrt(ntrain))
+        # Never ask for more lists than the training set can populate
+        return max(1, min(nlist, ntrain // cls.MIN_POINTS_PER_LIST))
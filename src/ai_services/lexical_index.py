@@ -0,0 +1,213 @@
+# src/ai_services/lexical_index.py
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Words plus dotted / dashed identifiers such as clause numbers ("4.2.1")
+# and form ids ("w-2", "i-9"), which are kept whole and also split
+_TOKEN = re.compile(r"[a-z0-9]+(?:[./-][a-z0-9]+)*")
+_SEPARATOR = re.compile(r"[./-]")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its "
+    "of on or such that the their then there these they this to was were "
+    "will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms of a text, without stopwords."""
+    tokens: List[str] = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in _SEPARATOR.split(token) if part not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over chunk texts, keyed by vector id.
+
+    Posting lists are compact arrays in CSR layout (`indptr` into parallel
+    `vids` / term-frequency arrays), so scoring a query term is a handful
+    of vectorized numpy operations. Chunks added since the last
+    consolidation sit in small per-term buffers that are merged in once
+    they grow. Removed chunks get a zero length and are skipped when
+    scoring; consolidation drops their postings.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._terms: Dict[str, int] = {}
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._vids = np.empty(0, dtype=np.int64)
+        self._tfs = np.empty(0, dtype=np.float32)
+        self._pending: Dict[int, Tuple[List[int], List[int]]] = {}
+        self._pending_count = 0
+
+        # Document length by vector id; zero means absent or removed
+        self._doc_len = np.zeros(0, dtype=np.float32)
+        self._num_docs = 0
+        self._total_len = 0.0
+
+    @property
+    def num_docs(self) -> int:
+        return self._num_docs
+
+    def add(self, vids: Sequence[int], texts: Sequence[str]) -> None:
+        """Index chunk texts under their vector ids. Known ids are skipped."""
+        for vid, text in zip(vids, texts):
+            vid = int(vid)
+            self._grow(vid)
+            if self._doc_len[vid] > 0:
+                continue
+
+            counts = Counter(tokenize(text))
+            length = sum(counts.values())
+            if not length:
+                continue
+
+            self._doc_len[vid] = length
+            self._num_docs += 1
+            self._total_len += length
+            for term, tf in counts.items():
+                term_id = self._terms.setdefault(term, len(self._terms))
+                term_vids, term_tfs = self._pending.setdefault(term_id, ([], []))
+                term_vids.append(vid)
+                term_tfs.append(tf)
+            self._pending_count += len(counts)
+
+        if self._pending_count > max(1 << 16, len(self._vids) // 4):
+            self._consolidate()
+
+    def remove(self, vids: Sequence[int]) -> None:
+        """Drop chunks from scoring and from the collection statistics."""
+        vids = np.asarray(vids, dtype=np.int64)
+        vids = vids[vids < len(self._doc_len)]
+        lengths = self._doc_len[vids]
+        self._num_docs -= int(np.count_nonzero(lengths))
+        self._total_len -= float(lengths.sum())
+        self._doc_len[vids] = 0
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the (scores, vids) of the top-k chunks for a query, best
+        first. `allowed`, if given, is a mask over every indexed vid that
+        restricts results; term statistics still cover the whole collection.
+        """
+        term_ids = {self._terms[term] for term in tokenize(query) if term in self._terms}
+        if not term_ids or self._num_docs == 0 or k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        avg_len = self._total_len / self._num_docs
+        matched_vids, matched_scores = [], []
+        for term_id in term_ids:
+            vids, tfs = self._postings(term_id)
+            lengths = self._doc_len[vids]
+            live = lengths > 0
+            df = int(np.count_nonzero(live))
+            if df == 0:
+                continue
+            if allowed is not None:
+                live &= allowed[vids]
+            vids, tfs, lengths = vids[live], tfs[live], lengths[live]
+
+            idf = math.log(1 + (self._num_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths / avg_len)
+            matched_vids.append(vids)
+            matched_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        if not matched_vids:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        vids, inverse = np.unique(np.concatenate(matched_vids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+        if len(vids) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(vids))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top].astype(np.float32), vids[top]
+
+    def state(self) -> Dict[str, Any]:
+        """Consolidated arrays for persisting; removed chunks are dropped."""
+        self._consolidate()
+        return {
+            "terms": sorted(self._terms, key=self._terms.__getitem__),
+            "indptr": self._indptr,
+            "vids": self._vids,
+            "tfs": self._tfs,
+            "doc_len": self._doc_len.copy(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "BM25Index":
+        index = cls()
+        index._terms = {term: term_id for term_id, term in enumerate(state["terms"])}
+        index._indptr = state["indptr"]
+        index._vids = state["vids"]
+        index._tfs = state["tfs"]
+        index._doc_len = state["doc_len"]
+        index._num_docs = int(np.count_nonzero(index._doc_len))
+        index._total_len = float(index._doc_len.sum())
+        return index
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        if term_id + 1 < len(self._indptr):
+            start, end = self._indptr[term_id], self._indptr[term_id + 1]
+            vids, tfs = self._vids[start:end], self._tfs[start:end]
+        else:
+            vids, tfs = self._vids[:0], self._tfs[:0]
+        pending = self._pending.get(term_id)
+        if pending is None:
+            return vids, tfs
+        return (
+            np.concatenate([vids, np.asarray(pending[0], dtype=np.int64)]),
+            np.concatenate([tfs, np.asarray(pending[1], dtype=np.float32)]),
+        )
+
+    def _consolidate(self) -> None:
+        """Merge the append buffers into the CSR arrays, dropping removed chunks."""
+        base_terms = np.repeat(np.arange(len(self._indptr) - 1), np.diff(self._indptr))
+        pending_terms = [
+            np.full(len(term_vids), term_id, dtype=np.int64)
+            for term_id, (term_vids, _) in self._pending.items()
+        ]
+        terms = np.concatenate([base_terms, *pending_terms])
+        vids = np.concatenate(
+            [self._vids, *(np.asarray(v, dtype=np.int64) for v, _ in self._pending.values())]
+        )
+        tfs = np.concatenate(
+            [self._tfs, *(np.asarray(t, dtype=np.float32) for _, t in self._pending.values())]
+        )
+
+        keep = self._doc_len[vids] > 0
+        terms, vids, tfs = terms[keep], vids[keep], tfs[keep]
+        order = np.argsort(terms, kind="stable")
+
+        self._indptr = np.zeros(len(self._terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self._terms)), out=self._indptr[1:])
+        self._vids = vids[order]
+        self._tfs = tfs[order]
+        self._pending = {}
+        self._pending_count = 0
+
+    def _grow(self, vid: int) -> None:
+        if vid >= len(self._doc_len):
+            # Geometric growth keeps appends amortized O(1)
+            grown = np.zeros(max(vid + 1, 2 * len(self._doc_len)), dtype=np.float32)
+            grown[:len(self._doc_len)] = self._doc_len
+            self._doc_len = grown
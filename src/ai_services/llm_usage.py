@@ -0,0 +1,78 @@
+# src/ai_services/llm_usage.py
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+
+import numpy as np
+
+
+class LLMUsageMetrics:
+    """
+    Token usage reported by the LLM provider, accumulated per agent run.
+
+    `cache_read_tokens` are input tokens the provider served from its
+    prompt (prefix) cache; runs with and without a cache hit are timed
+    separately so the latency saving is visible next to the token saving.
+    Streamed runs also record their time to first token, summarized over
+    the most recent `TTFT_WINDOW` streams.
+    """
+
+    TTFT_WINDOW = 1000
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.cached_runs = 0
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.output_tokens = 0
+        self._latency = {True: 0.0, False: 0.0}
+        self.streams = 0
+        self._ttft: Deque[float] = deque(maxlen=self.TTFT_WINDOW)
+
+    def record(self, usage: Any, latency: float) -> None:
+        # Older pydantic_ai usage objects have no cache fields
+        cache_read = getattr(usage, "cache_read_tokens", 0) or 0
+        with self._lock:
+            self.runs += 1
+            self.cached_runs += bool(cache_read)
+            self.input_tokens += getattr(usage, "input_tokens", 0) or 0
+            self.cache_read_tokens += cache_read
+            self.cache_write_tokens += getattr(usage, "cache_write_tokens", 0) or 0
+            self.output_tokens += getattr(usage, "output_tokens", 0) or 0
+            self._latency[bool(cache_read)] += latency
+
+    def record_first_token(self, latency: float) -> None:
+        with self._lock:
+            self.streams += 1
+            self._ttft.append(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            uncached_runs = self.runs - self.cached_runs
+            ttft = np.array(self._ttft) if self._ttft else None
+            return {
+                "runs": self.runs,
+                "cached_runs": self.cached_runs,
+                "input_tokens": self.input_tokens,
+                "cache_read_tokens": self.cache_read_tokens,
+                "cache_write_tokens": self.cache_write_tokens,
+                "output_tokens": self.output_tokens,
+                "cached_token_ratio": (
+                    self.cache_read_tokens / self.input_tokens if self.input_tokens else None
+                ),
+                "avg_latency_cached": (
+                    self._latency[True] / self.cached_runs if self.cached_runs else None
+                ),
+                "avg_latency_uncached": (
+                    self._latency[False] / uncached_runs if uncached_runs else None
+                ),
+                "streams": self.streams,
+                "time_to_first_token_p50": float(np.percentile(ttft, 50)) if ttft is not None else None,
+                "time_to_first_token_p95": float(np.percentile(ttft, 95)) if ttft is not None else None,
+            }
+
+
+metrics = LLMUsageMetrics()
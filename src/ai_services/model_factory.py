@@ -1,16 +1,36 @@
 # src/ai/model_factory.py
 
-from typing import Optional
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
 from pydantic_ai import Agent
+from pydantic_ai.models import Model, infer_model
+from pydantic_ai.providers import Provider, infer_provider, infer_provider_class
+
 from .config import AISettings, AIModelProvider
+from .fake_providers import fake_chat_model
+from .http_client import shared_http_client
 
 
 class ModelFactory:
     """
     Industrial-grade model factory.
     Handles LLM model instantiation across providers.
+
+    Agents are built once per (provider, model, output type, system prompt,
+    settings) and event loop, on provider clients that share one pooled
+    HTTP client, so a question costs a request on a warm connection
+    rather than a new client and TLS handshake.
     """
 
+    _agents: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, Agent]]" = (
+        weakref.WeakKeyDictionary()
+    )
+    _agents_lock = threading.Lock()
+
     @classmethod
     def get_model_name(cls, provider: AIModelProvider = None, is_embedding: bool = False) -> str:
         if not provider:
@@ -35,12 +55,47 @@ class ModelFactory:
         max_tokens: int = 2048,
     ) -> Agent:
         """
-        Creates a fully configured Agent instance.
+        Returns a fully configured Agent instance, reused across calls with
+        the same configuration on the running event loop.
         """
         provider, model_name = cls.get_model_name(provider=provider, is_embedding=is_embedding)
 
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Outside the event loop there is no client to share
+            return cls._build_agent(provider, model_name, system_prompt, output_type, temperature, max_tokens)
+
+        key = (provider, model_name, output_type, system_prompt, temperature, max_tokens)
+        with cls._agents_lock:
+            agents = cls._agents.setdefault(loop, {})
+            agent = agents.get(key)
+            if agent is None:
+                logger.info("Creating agent for {}:{}", provider.value, model_name)
+                agent = cls._build_agent(
+                    provider, model_name, system_prompt, output_type, temperature, max_tokens, shared_client=True
+                )
+                agents[key] = agent
+            return agent
+
+    @classmethod
+    def cached_agent_count(cls) -> int:
+        with cls._agents_lock:
+            return sum(len(agents) for agents in cls._agents.values())
+
+    @classmethod
+    def _build_agent(
+        cls,
+        provider: AIModelProvider,
+        model_name: str,
+        system_prompt: str,
+        output_type,
+        temperature: float,
+        max_tokens: int,
+        shared_client: bool = False,
+    ) -> Agent:
         return Agent(
-            model=model_name,  # ← pass string directly
+            model=cls._model(provider, model_name, shared_client),
             system_prompt=system_prompt,
             output_type=output_type,
             retries=3,
@@ -48,4 +103,22 @@ class ModelFactory:
                 "temperature": temperature,
                 "max_output_tokens": max_tokens,
             },
-        )
\ No newline at end of file
+        )
+
+    @classmethod
+    def _model(cls, provider: AIModelProvider, model_name: str, shared_client: bool) -> Model | str:
+        if provider == AIModelProvider.FAKE:
+            # Offline stand-in, no HTTP involved
+            return fake_chat_model()
+        if not shared_client:
+            return model_name  # ← pass string directly
+        return infer_model(f"{provider.value}:{model_name}", provider_factory=cls._provider)
+
+    @staticmethod
+    def _provider(provider_name: str) -> Provider[Any]:
+        """Provider client on the shared HTTP client of the running loop."""
+        try:
+            return infer_provider_class(provider_name)(http_client=shared_http_client())
+        except TypeError:
+            logger.warning("Provider {} cannot use the shared HTTP client", provider_name)
+            return infer_provider(provider_name)
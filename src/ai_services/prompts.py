@@ -37,7 +37,12 @@ When possible, reference supporting statements using:
 (Source: Document Section)
 
 If document metadata is available, use it.
+"""
 
+# Retrieved chunks, sent in the user turn ahead of the question. Everything
+# before them (system prompt, output tool) is identical for every question,
+# so providers' automatic prefix caching can reuse it
+CONTEXT_PROMPT = """
 ========================
 CONTEXT START
 ========================
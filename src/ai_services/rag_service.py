@@ -1,13 +1,19 @@
 # src/ai/rag_service.py
 
-from typing import List, Optional, Dict, Any
-from .config import AIModelProvider
+import asyncio
+import time
+from contextlib import aclosing
+import numpy as np
+from typing import List, Optional, Dict, Any, AsyncIterator, Hashable, Tuple
+from .config import AIModelProvider, AISettings
 from loguru import logger
 from pydantic import BaseModel, Field
 from .embedding_factory import EmbeddingFactory
+from .answer_cache import SemanticAnswerCache
 from .vector_store import FAISSVectorStore
+from .chunk_store import MetadataFilter
 from .agent_manager import AgentManager
-from .prompts import SYSTEM_PROMPT_ANSWER
+from .prompts import CONTEXT_PROMPT, SYSTEM_PROMPT_ANSWER
 
 
 # class ReferenceDocument(BaseModel):
@@ -30,17 +36,28 @@ class AnswerOutput(BaseModel):
 class RAGService:
     """
     Retrieval-Augmented Generation (RAG) service.
-    Handles document indexing, vector search, and LLM-based question answering.
+    Handles document indexing, hybrid (vector + keyword) search, and
+    LLM-based question answering.
     """
 
     def __init__(
         self,
         collection_name: str = "documents",
         provider: Optional[AIModelProvider] = None,
+        embedding_service: Optional[EmbeddingFactory] = None,
+        vector_store: Optional[FAISSVectorStore] = None,
     ):
         self.provider = provider
-        self.embedding_service = EmbeddingFactory(provider)
-        self.vector_store = FAISSVectorStore(collection_name)
+        # Warm instances are injected by RAGServiceRegistry; standalone
+        # construction (scripts, tests) still builds its own.
+        self.embedding_service = embedding_service or EmbeddingFactory(provider)
+        self.vector_store = vector_store or FAISSVectorStore(collection_name)
+        # Answers to earlier (paraphrased) questions, valid until the collection changes
+        self.answer_cache = (
+            SemanticAnswerCache(AISettings.ANSWER_CACHE_SIZE, AISettings.ANSWER_CACHE_THRESHOLD)
+            if AISettings.ANSWER_CACHE_SIZE > 0
+            else None
+        )
 
     async def index_documents(
         self,
@@ -63,14 +80,68 @@ class RAGService:
             embeddings=embeddings,
             metadatas=metadatas,
         )
+
+    def delete_document(self, document_id: int) -> int:
+        """
+        Remove every indexed chunk of a source document from the vector store.
+
+        Returns:
+            Number of chunks removed
+        """
+        removed = self.vector_store.delete_by_document_id(document_id)
+        logger.info(
+            "Removed {} chunks of document {} from {}",
+            removed,
+            document_id,
+            self.vector_store.collection_name,
+        )
+        return removed
+
+    async def reindex_document(
+        self,
+        document_id: int,
+        documents: List[str],
+        metadatas: Optional[List[dict]] = None,
+    ) -> int:
+        """
+        Replace the indexed chunks of a source document. The new chunks are
+        indexed first and the old ones dropped only once that succeeded, so
+        a failed run leaves the previous version searchable.
+
+        Returns:
+            Number of old chunks removed
+        """
+        previous = self.vector_store.document_vids(document_id)
+        await self.index_documents(documents=documents, metadatas=metadatas)
+        self.vector_store.delete_vids(previous)
+        logger.info(
+            "Replaced {} chunks of document {} in {}",
+            len(previous),
+            document_id,
+            self.vector_store.collection_name,
+        )
+        return len(previous)
     
-    async def query(self, question: str, top_k: int = 5) -> AnswerOutput:
+    async def query(
+        self,
+        question: str,
+        top_k: int = 5,
+        metadata_filter: Optional[MetadataFilter] = None,
+        mmr: Optional[bool] = None,
+        fetch_k: Optional[int] = None,
+        mmr_lambda: Optional[float] = None,
+    ) -> AnswerOutput:
         """
         Query the RAG system with a question and get an LLM-generated answer.
         
         Args:
             question: The user's question
             top_k: Number of relevant documents to retrieve
+            metadata_filter: Only retrieve chunks matching these metadata values
+            mmr: Diversify the retrieved chunks with maximal marginal relevance
+                (defaults to AISettings.RAG_MMR)
+            fetch_k: Candidate pool MMR selects from (defaults to AISettings.RAG_MMR_FETCH_K)
+            mmr_lambda: Relevance vs. novelty weight in [0, 1] (defaults to AISettings.RAG_MMR_LAMBDA)
             
         Returns:
             AnswerOutput with the generated answer
@@ -81,37 +152,456 @@ class RAGService:
         logger.info("Generating embedding for query: {}", question)
         query_embedding = await self.embedding_service.embed_query(question)
 
-        logger.info("Searching vector store: {} (top_k={})", self.vector_store.collection_name, top_k)
+        # Read before searching: an answer is cached under the version it was built from
+        version = self.vector_store.version
+        context = self._answer_context(top_k, metadata_filter, mmr, fetch_k, mmr_lambda)
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(query_embedding, context, version)
+            if cached is not None:
+                logger.info("Answer cache hit for query: {}", question)
+                return cached
+
+        search_results = self._retrieve(
+            question, query_embedding, top_k, metadata_filter, mmr, fetch_k, mmr_lambda
+        )
         
-        # FIX: Get search results with scores
+        answer = await self._answer(question, search_results)
+        if self.answer_cache is not None:
+            self.answer_cache.put(query_embedding, context, version, answer)
+        return answer
+
+    async def query_stream(
+        self,
+        question: str,
+        top_k: int = 5,
+        metadata_filter: Optional[MetadataFilter] = None,
+        mmr: Optional[bool] = None,
+        fetch_k: Optional[int] = None,
+        mmr_lambda: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of query(). Yields events as dicts with "event"
+        and "data" keys:
+        - "retrieval": the chunks the answer is based on, as soon as they are known
+        - "token": the next piece of answer text
+        - "done": the full answer and the time to first token (seconds)
+
+        Closing the generator (e.g. when the client disconnects) cancels the
+        LLM request.
+        """
+        if not question.strip():
+            raise ValueError("Question cannot be empty.")
+
+        started = time.perf_counter()
+        query_embedding = await self.embedding_service.embed_query(question)
+
+        version = self.vector_store.version
+        context = self._answer_context(top_k, metadata_filter, mmr, fetch_k, mmr_lambda)
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(query_embedding, context, version)
+            if cached is not None:
+                logger.info("Answer cache hit for query: {}", question)
+                yield {"event": "retrieval", "data": {"cached": True, "sources": []}}
+                yield {"event": "token", "data": {"text": cached.answer}}
+                yield {
+                    "event": "done",
+                    "data": {"answer": cached.answer, "time_to_first_token": time.perf_counter() - started},
+                }
+                return
+
+        search_results = self._retrieve(
+            question, query_embedding, top_k, metadata_filter, mmr, fetch_k, mmr_lambda
+        )
+        yield {
+            "event": "retrieval",
+            "data": {"cached": False, "sources": [self._source(result) for result in search_results]},
+        }
+
+        agent, context_prompt = self._answer_agent(search_results)
+        text = ""
+        first_token: Optional[float] = None
+        final: Optional[AnswerOutput] = None
+        async with aclosing(AgentManager.stream_with_backoff(agent, [context_prompt, question])) as outputs:
+            async for output in outputs:
+                # Partial outputs carry the answer generated so far; the last
+                # one is the validated answer
+                final = output
+                partial = output.answer or ""
+                if len(partial) <= len(text) or not partial.startswith(text):
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                yield {"event": "token", "data": {"text": partial[len(text):]}}
+                text = partial
+
+        # Reached only when the stream ran to completion
+        answer = final.answer if final is not None else ""
+        if self.answer_cache is not None and answer:
+            self.answer_cache.put(query_embedding, context, version, final)
+        yield {"event": "done", "data": {"answer": answer, "time_to_first_token": first_token}}
+
+    async def retrieve_batch(
+        self,
+        questions: List[str],
+        top_k: int = 5,
+        metadata_filter: Optional[MetadataFilter] = None,
+        mmr: Optional[bool] = None,
+        fetch_k: Optional[int] = None,
+        mmr_lambda: Optional[float] = None,
+        query_embeddings: Optional[List[List[float]]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve context for several questions with one embedding request
+        and one vector search.
+
+        Args:
+            questions: The questions to retrieve context for
+            top_k: Number of relevant documents to retrieve per question
+            metadata_filter: Only retrieve chunks matching these metadata values
+            mmr: Diversify the retrieved chunks with maximal marginal relevance
+            fetch_k: Candidate pool MMR selects from
+            mmr_lambda: Relevance vs. novelty weight in [0, 1]
+            query_embeddings: Embeddings of the questions, if already computed
+
+        Returns:
+            One list of search results per question, in question order
+        """
+        if not questions:
+            return []
+        if any(not question.strip() for question in questions):
+            raise ValueError("Question cannot be empty.")
+
+        if query_embeddings is None:
+            logger.info("Generating embeddings for {} queries.", len(questions))
+            query_embeddings = await self.embedding_service.embed_queries(questions)
+
+        logger.info(
+            "Searching vector store: {} (queries={}, top_k={})",
+            self.vector_store.collection_name,
+            len(questions),
+            top_k,
+        )
+        pool = self._pool_size(top_k, mmr, fetch_k)
+        batch_results = self.vector_store.search_batch(
+            query_embeddings=query_embeddings,
+            top_k=self._candidate_count(pool),
+            metadata_filter=metadata_filter,
+        )
+        return [
+            self._rank(
+                question, query_embedding, search_results, top_k, pool, metadata_filter, mmr_lambda
+            )
+            for question, query_embedding, search_results in zip(
+                questions, query_embeddings, batch_results
+            )
+        ]
+
+    async def query_batch(
+        self,
+        questions: List[str],
+        top_k: int = 5,
+        metadata_filter: Optional[MetadataFilter] = None,
+        mmr: Optional[bool] = None,
+        fetch_k: Optional[int] = None,
+        mmr_lambda: Optional[float] = None,
+    ) -> List[AnswerOutput]:
+        """
+        Answer several questions. Retrieval is batched; the LLM calls run
+        concurrently. Questions with a cached answer skip both.
+
+        Args:
+            questions: The user's questions
+            top_k: Number of relevant documents to retrieve per question
+            metadata_filter: Only retrieve chunks matching these metadata values
+            mmr: Diversify the retrieved chunks with maximal marginal relevance
+            fetch_k: Candidate pool MMR selects from
+            mmr_lambda: Relevance vs. novelty weight in [0, 1]
+
+        Returns:
+            One AnswerOutput per question, in question order
+        """
+        if not questions:
+            return []
+        if any(not question.strip() for question in questions):
+            raise ValueError("Question cannot be empty.")
+
+        logger.info("Generating embeddings for {} queries.", len(questions))
+        query_embeddings = await self.embedding_service.embed_queries(questions)
+
+        version = self.vector_store.version
+        context = self._answer_context(top_k, metadata_filter, mmr, fetch_k, mmr_lambda)
+        answers: List[Optional[AnswerOutput]] = [None] * len(questions)
+        if self.answer_cache is not None:
+            answers = [
+                self.answer_cache.get(query_embedding, context, version)
+                for query_embedding in query_embeddings
+            ]
+        pending = [i for i, answer in enumerate(answers) if answer is None]
+        logger.info("Answer cache: {} of {} questions cached", len(questions) - len(pending), len(questions))
+        if not pending:
+            return answers
+
+        batch_results = await self.retrieve_batch(
+            [questions[i] for i in pending],
+            top_k,
+            metadata_filter,
+            mmr,
+            fetch_k,
+            mmr_lambda,
+            query_embeddings=[query_embeddings[i] for i in pending],
+        )
+        generated = await asyncio.gather(
+            *(
+                self._answer(questions[i], search_results)
+                for i, search_results in zip(pending, batch_results)
+            )
+        )
+        for i, answer in zip(pending, generated):
+            answers[i] = answer
+            if self.answer_cache is not None:
+                self.answer_cache.put(query_embeddings[i], context, version, answer)
+        return answers
+
+    def _retrieve(
+        self,
+        question: str,
+        query_embedding: List[float],
+        top_k: int,
+        metadata_filter: Optional[MetadataFilter],
+        mmr: Optional[bool],
+        fetch_k: Optional[int],
+        mmr_lambda: Optional[float],
+    ) -> List[Dict[str, Any]]:
+        logger.info("Searching vector store: {} (top_k={})", self.vector_store.collection_name, top_k)
+
+        pool = self._pool_size(top_k, mmr, fetch_k)
+        # Vector candidates; _rank fuses them with keyword hits and applies MMR
         search_results = self.vector_store.search(
             query_embedding=query_embedding,
-            top_k=top_k
+            top_k=self._candidate_count(pool),
+            metadata_filter=metadata_filter,
         )
-        
-        # Extract just the document texts for context
-        context_docs = [result["document"] for result in search_results]
-        
+        return self._rank(
+            question, query_embedding, search_results, top_k, pool, metadata_filter, mmr_lambda
+        )
+
+    @staticmethod
+    def _answer_context(
+        top_k: int,
+        metadata_filter: Optional[MetadataFilter],
+        mmr: Optional[bool],
+        fetch_k: Optional[int],
+        mmr_lambda: Optional[float],
+    ) -> Hashable:
+        """Retrieval options an answer depends on; cached answers only match the same options."""
+        mmr = AISettings.RAG_MMR if mmr is None else mmr
+        filter_key = None
+        if metadata_filter is not None and not metadata_filter.is_empty():
+            filter_key = tuple(
+                tuple(sorted(values or ()))
+                for values in (
+                    metadata_filter.document_ids,
+                    metadata_filter.filenames,
+                    metadata_filter.document_types,
+                )
+            )
+        return (
+            top_k,
+            filter_key,
+            mmr and RAGService._pool_size(top_k, mmr, fetch_k),
+            mmr and (AISettings.RAG_MMR_LAMBDA if mmr_lambda is None else mmr_lambda),
+        )
+
+    @staticmethod
+    def _pool_size(top_k: int, mmr: Optional[bool], fetch_k: Optional[int]) -> int:
+        """Number of ranked candidates to collect; above top_k only for MMR."""
+        if not (AISettings.RAG_MMR if mmr is None else mmr):
+            return top_k
+        return max(top_k, AISettings.RAG_MMR_FETCH_K if fetch_k is None else fetch_k)
+
+    @staticmethod
+    def _candidate_count(top_k: int) -> int:
+        """Results to take from each retriever before fusion."""
+        if not AISettings.RAG_HYBRID_SEARCH:
+            return top_k
+        return max(top_k, AISettings.RAG_HYBRID_CANDIDATES)
+
+    def _rank(
+        self,
+        question: str,
+        query_embedding: List[float],
+        vector_results: List[Dict[str, Any]],
+        top_k: int,
+        pool: int,
+        metadata_filter: Optional[MetadataFilter] = None,
+        mmr_lambda: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fuse the retrievers into a pool of candidates, then narrow it to
+        top_k with MMR when the pool is larger.
+        """
+        results = self._hybrid(question, vector_results, pool, metadata_filter)
+        if pool <= top_k or len(results) <= top_k:
+            return results[:top_k]
+
+        embeddings = self.vector_store.get_embeddings([result["id"] for result in results])
+        query = np.array(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        selected = self.maximal_marginal_relevance(
+            query,
+            embeddings,
+            top_k,
+            AISettings.RAG_MMR_LAMBDA if mmr_lambda is None else mmr_lambda,
+        )
+        logger.debug("MMR kept candidates {} of {}", selected, len(results))
+        return [results[i] for i in selected]
+
+    def _hybrid(
+        self,
+        question: str,
+        vector_results: List[Dict[str, Any]],
+        top_k: int,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fuse vector results with BM25 keyword results for the same question.
+        Returns the vector results unchanged when hybrid search is disabled.
+        """
+        if not AISettings.RAG_HYBRID_SEARCH:
+            return vector_results[:top_k]
+
+        lexical_results = self.vector_store.search_lexical(
+            query=question,
+            top_k=self._candidate_count(top_k),
+            metadata_filter=metadata_filter,
+        )
+        return self.reciprocal_rank_fusion(vector_results, lexical_results, top_k)
+
+    @staticmethod
+    def reciprocal_rank_fusion(
+        vector_results: List[Dict[str, Any]],
+        lexical_results: List[Dict[str, Any]],
+        top_k: int,
+        rrf_k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Merge two ranked result lists by reciprocal rank fusion: each chunk
+        scores sum(1 / (rrf_k + rank)) over the lists it appears in. Ranks
+        are used instead of raw scores, which are not comparable between
+        cosine similarity and BM25.
+
+        Fused results carry the RRF score as "score" and the original scores
+        as "vector_score" / "lexical_score" (None where a list missed the chunk).
+        """
+        rrf_k = AISettings.RAG_RRF_K if rrf_k is None else rrf_k
+
+        fused: Dict[str, Dict[str, Any]] = {}
+        for score_key, results in (("vector_score", vector_results), ("lexical_score", lexical_results)):
+            for rank, result in enumerate(results, start=1):
+                entry = fused.get(result["id"])
+                if entry is None:
+                    entry = fused[result["id"]] = {
+                        **result,
+                        "score": 0.0,
+                        "vector_score": None,
+                        "lexical_score": None,
+                    }
+                entry["score"] += 1.0 / (rrf_k + rank)
+                entry[score_key] = result["score"]
+
+        # sorted() is stable, so ties keep the vector ranking first
+        return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)[:top_k]
+
+    @staticmethod
+    def maximal_marginal_relevance(
+        query: np.ndarray,
+        embeddings: np.ndarray,
+        k: int,
+        lambda_mult: float = 0.5,
+    ) -> List[int]:
+        """
+        Greedily pick k diverse candidates by maximal marginal relevance:
+        each step takes the candidate maximizing
+        lambda * sim(query, c) - (1 - lambda) * max sim(c, selected).
+        Overlapping neighbour chunks are near-duplicates, so after the first
+        one is picked the others fall behind chunks that add information.
+
+        Args:
+            query: Normalized query vector
+            embeddings: Normalized candidate vectors, one row per candidate
+            k: Number of candidates to select
+            lambda_mult: 1.0 ranks by relevance only, 0.0 by novelty only
+
+        Returns:
+            Positions of the selected candidates, in selection order
+        """
+        count = len(embeddings)
+        if count == 0 or k <= 0:
+            return []
+
+        relevance = embeddings @ query
+        # Pairwise cosine similarity between all candidates (count x count)
+        similarity = embeddings @ embeddings.T
+
+        selected: List[int] = []
+        redundancy = np.full(count, -np.inf, dtype=np.float32)
+        available = np.ones(count, dtype=bool)
+        for _ in range(min(k, count)):
+            if selected:
+                scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+            else:
+                scores = relevance.copy()
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            available[best] = False
+            np.maximum(redundancy, similarity[best], out=redundancy)
+        return selected
+
+    async def _answer(self, question: str, search_results: List[Dict[str, Any]]) -> AnswerOutput:
+        """
+        Generate an answer from retrieved search results.
+        """
+        agent, context_prompt = self._answer_agent(search_results)
+
+        logger.info("Running agent with backoff.")
+        response = await AgentManager.run_with_backoff(agent, [context_prompt, question])
+
+        return response.output
+
+    def _answer_agent(self, search_results: List[Dict[str, Any]]) -> Tuple[Any, str]:
+        """The (cached) answering agent and the context prompt for these results."""
         # Optional: Log scores for debugging
         if search_results:
             scores = [result["score"] for result in search_results]
             logger.debug("Retrieved documents with scores: {}", scores)
 
-        # Create context from retrieved documents
+        # Document order rather than score order, so the same chunks always
+        # produce the same context text
+        context_docs = [result["document"] for result in sorted(search_results, key=self._context_order)]
         context = "\n\n---\n\n".join(context_docs)
-        
-        # Format system prompt with context
-        system_prompt = SYSTEM_PROMPT_ANSWER.format(context=context)
 
-        logger.info("Creating agent for question answering.")
+        # The system prompt is fixed, so the agent is cached and the prompt
+        # prefix repeats across questions; context and question come last
+        logger.info("Getting agent for question answering.")
         agent = AgentManager.create_agent(
-            system_prompt=system_prompt,
+            system_prompt=SYSTEM_PROMPT_ANSWER,
             output_type=AnswerOutput,
             provider=self.provider,
             is_embedding=False
         )
+        return agent, CONTEXT_PROMPT.format(context=context)
 
-        logger.info("Running agent with backoff.")
-        response = await AgentManager.run_with_backoff(agent, question)
+    @staticmethod
+    def _source(result: Dict[str, Any]) -> Dict[str, Any]:
+        """A retrieved chunk as reported to clients, without its text."""
+        return {"id": result.get("id"), "score": result.get("score"), "metadata": result.get("metadata") or {}}
 
-        return response.output
\ No newline at end of file
+    @staticmethod
+    def _context_order(result: Dict[str, Any]) -> Tuple[str, int, str]:
+        metadata = result.get("metadata") or {}
+        return (
+            str(metadata.get("document_id", "")),
+            int(metadata.get("chunk_index") or 0),
+            str(result.get("id", "")),
+        )
\ No newline at end of file
@@ -0,0 +1,316 @@
+# src/ai_services/rate_limiter.py
+
+import asyncio
+import email.utils
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import numpy as np
+from loguru import logger
+from pydantic_ai.exceptions import ModelHTTPError
+
+from .config import AISettings
+
+# Responses that mean "slow down" rather than "this request is broken"
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class TokenBucket:
+    """
+    Refills at `rate` units per second up to `capacity`. Reservations are
+    taken immediately and may overdraw the bucket; the caller waits until
+    the debt is paid back, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` and return the seconds until it is covered."""
+        self._refill()
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """Take (positive) or give back (negative) units after the fact."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class _Permit:
+    __slots__ = ("started", "abandoned")
+
+    def __init__(self, started: float):
+        self.started = started
+        # Set by the caller when it gave up on the call (e.g. a closed stream)
+        self.abandoned = False
+
+
+class AdaptiveRateLimiter:
+    """
+    Proactive limiter for one provider model.
+
+    Requests wait for a concurrency slot, then for the request and token
+    buckets (requests / tokens per minute, 0 = unlimited), before they are
+    sent, instead of all hitting the provider and sleeping on 429s.
+
+    The concurrency limit adapts AIMD-style: +1/limit per success, halved
+    on a throttling response (at most once per round of requests sent
+    after the previous cut), between `min_concurrency` and
+    `max_concurrency`. A Retry-After hint holds back every new request
+    until it has passed.
+    """
+
+    # Bucket capacity: seconds' worth of the per-minute budget allowed as a burst
+    BURST_SECONDS = 10
+    WAIT_WINDOW = 1000
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+    ):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+
+        self._requests = self._bucket(requests_per_minute)
+        self._tokens = self._bucket(tokens_per_minute)
+
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+
+        self.queued = 0
+        self.requests = 0
+        self.throttles = 0
+        self._waits: Deque[float] = deque(maxlen=self.WAIT_WINDOW)
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0) -> AsyncIterator[_Permit]:
+        """
+        Hold a request slot for one provider call, reporting its outcome.
+        A call marked abandoned only releases its slot: it proves nothing
+        about the provider's capacity.
+        """
+        permit = await self._acquire(tokens)
+        try:
+            yield permit
+        except ModelHTTPError as exc:
+            if exc.status_code in THROTTLE_STATUS_CODES:
+                self._throttled(permit, retry_after(exc))
+            raise
+        else:
+            if not permit.abandoned:
+                self._succeeded()
+        finally:
+            self._release()
+
+    def settle_tokens(self, estimated: int, actual: int) -> None:
+        """Correct the token bucket once the provider reported the real usage."""
+        if self._tokens is not None and actual:
+            self._tokens.adjust(actual - estimated)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = np.array(self._waits) if self._waits else None
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "active": self._active,
+            "queue_depth": self.queued,
+            "requests": self.requests,
+            "throttles": self.throttles,
+            "blocked_for": max(0.0, self._blocked_until - time.monotonic()),
+            "wait_avg": float(waits.mean()) if waits is not None else None,
+            "wait_p95": float(np.percentile(waits, 95)) if waits is not None else None,
+            "requests_available": self._requests.level if self._requests is not None else None,
+            "tokens_available": self._tokens.level if self._tokens is not None else None,
+        }
+
+    async def _acquire(self, tokens: int) -> _Permit:
+        queued_at = time.monotonic()
+        self.queued += 1
+        try:
+            await self._acquire_concurrency()
+            try:
+                delay = max(0.0, self._blocked_until - time.monotonic())
+                if self._requests is not None:
+                    delay = max(delay, self._requests.reserve(1))
+                if self._tokens is not None and tokens:
+                    delay = max(delay, self._tokens.reserve(tokens))
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # A Retry-After may have arrived while we slept
+                while self._blocked_until > time.monotonic():
+                    await asyncio.sleep(self._blocked_until - time.monotonic())
+            except BaseException:
+                # Cancelled while paced: give back the budget it never used
+                self._refund(tokens)
+                self._release()
+                raise
+        finally:
+            self.queued -= 1
+
+        started = time.monotonic()
+        self.requests += 1
+        self._waits.append(started - queued_at)
+        return _Permit(started)
+
+    async def _acquire_concurrency(self) -> None:
+        if not self._waiters and self._active < self._slots():
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: pass the slot on
+                self._release()
+            else:
+                self._waiters.remove(future)
+            raise
+
+    def _refund(self, tokens: int) -> None:
+        if self._requests is not None:
+            self._requests.adjust(-1)
+        if self._tokens is not None and tokens:
+            self._tokens.adjust(-tokens)
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._active < self._slots():
+            future = self._waiters.popleft()
+            if not future.done():
+                self._active += 1
+                future.set_result(None)
+
+    def _slots(self) -> int:
+        return max(self.min_concurrency, int(self.limit))
+
+    def _succeeded(self) -> None:
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self._wake()
+
+    def _throttled(self, permit: _Permit, delay: Optional[float]) -> None:
+        self.throttles += 1
+        now = time.monotonic()
+        if delay:
+            self._blocked_until = max(self._blocked_until, now + delay)
+        # Requests sent before the last cut were sized for the old limit
+        if permit.started >= self._last_decrease:
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            self._last_decrease = now
+            logger.warning(
+                "Provider {} throttled: concurrency limit {:.1f}, retry after {}",
+                self.name,
+                self.limit,
+                delay,
+            )
+
+    @classmethod
+    def _bucket(cls, per_minute: float) -> Optional[TokenBucket]:
+        if per_minute <= 0:
+            return None
+        rate = per_minute / 60
+        return TokenBucket(rate, max(1.0, rate * cls.BURST_SECONDS))
+
+
+def retry_after(exc: ModelHTTPError) -> Optional[float]:
+    """
+    Seconds the provider asked us to wait, from Retry-After(-Ms) headers or
+    a Gemini RetryInfo `retryDelay` in the error body.
+    """
+    headers = getattr(exc, "headers", None)
+    if headers is None:
+        # pydantic_ai 1.x keeps the headers on the SDK error it wraps
+        response = getattr(exc.__cause__, "response", None)
+        headers = getattr(response, "headers", None)
+
+    delay = _header_delay(headers) if headers else None
+    return delay if delay is not None else _body_delay(exc.body)
+
+
+def _header_delay(headers: Any) -> Optional[float]:
+    """Retry-After-Ms, or Retry-After as seconds or an HTTP date."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+        return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _body_delay(body: Any) -> Optional[float]:
+    """A Gemini RetryInfo delay ("23s") from the error details."""
+    error = body.get("error") if isinstance(body, dict) else None
+    details = error.get("details") if isinstance(error, dict) else None
+    for detail in details or ():
+        delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+        if isinstance(delay, str) and delay.endswith("s"):
+            try:
+                return float(delay[:-1])
+            except ValueError:
+                pass
+    return None
+
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(name: str) -> Optional[AdaptiveRateLimiter]:
+    """The process-wide limiter of a provider model, or None when disabled."""
+    if not AISettings.RATE_LIMIT_ENABLED:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(
+                name,
+                requests_per_minute=AISettings.RATE_LIMIT_RPM,
+                tokens_per_minute=AISettings.RATE_LIMIT_TPM,
+                max_concurrency=AISettings.RATE_LIMIT_MAX_CONCURRENCY,
+                min_concurrency=AISettings.RATE_LIMIT_MIN_CONCURRENCY,
+            )
+            _limiters[name] = limiter
+        return limiter
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
@@ -0,0 +1,81 @@
+# src/ai_services/service_registry.py
+
+import threading
+from typing import Dict, Optional
+
+from loguru import logger
+
+from .config import AIModelProvider, AISettings
+from .embedding_cache import EmbeddingCache
+from .embedding_factory import EmbeddingFactory
+from .rag_service import RAGService
+from .vector_store import FAISSVectorStore
+
+
+class RAGServiceRegistry:
+    """
+    Process-wide registry of warm RAG services.
+
+    Keeps one embedder per provider and one vector store per collection so
+    that request handlers only pay for embedding and search, never for
+    re-reading the persisted index from disk. All embedders share one
+    on-disk embedding cache.
+    """
+
+    def __init__(self, provider: Optional[AIModelProvider] = None) -> None:
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._embedders: Dict[AIModelProvider, EmbeddingFactory] = {}
+        self._services: Dict[str, RAGService] = {}
+        self._embedding_cache: Optional[EmbeddingCache] = None
+
+    def get_embedding_service(self) -> EmbeddingFactory:
+        """
+        Returns the shared embedder for the configured provider.
+        """
+        provider = self.provider or AISettings.PROVIDER
+        with self._lock:
+            embedder = self._embedders.get(provider)
+            if embedder is None:
+                logger.info("Creating shared embedder for provider '{}'", provider)
+                if self._embedding_cache is None and AISettings.EMBEDDING_CACHE:
+                    self._embedding_cache = EmbeddingCache(AISettings.VECTOR_STORE_PATH)
+                embedder = EmbeddingFactory(provider, cache=self._embedding_cache)
+                self._embedders[provider] = embedder
+            return embedder
+
+    def get(self, collection_name: str = "documents") -> RAGService:
+        """
+        Returns the warm RAG service for a collection, creating it on first use.
+        """
+        service = self._services.get(collection_name)
+        if service is not None:
+            return service
+
+        embedding_service = self.get_embedding_service()
+        with self._lock:
+            service = self._services.get(collection_name)
+            if service is None:
+                logger.info("Warming RAG service for collection '{}'", collection_name)
+                service = RAGService(
+                    collection_name=collection_name,
+                    provider=self.provider,
+                    embedding_service=embedding_service,
+                    vector_store=FAISSVectorStore(collection_name),
+                )
+                self._services[collection_name] = service
+            return service
+
+    def close(self) -> None:
+        """
+        Drops all warm services. Called once on application shutdown.
+        """
+        with self._lock:
+            logger.info("Releasing {} warm RAG service(s)", len(self._services))
+            for service in self._services.values():
+                service.vector_store.close()
+            self._services.clear()
+            self._embedders.clear()
+            if self._embedding_cache is not None:
+                self._embedding_cache.close()
+                self._embedding_cache = None
@@ -1,23 +1,19 @@
 # src/ai_services/vector_store.py
 
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Sequence, Set, Tuple
 from uuid import uuid4
 import os
 import pickle
+import threading
 import numpy as np
 import faiss
 from loguru import logger
-from dataclasses import dataclass, field
-from .config import AISettings
-
-
-@dataclass
-class Document:
-    """Document class for storing text, metadata, and embedding."""
-    text: str
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    embedding: Optional[List[float]] = None
-    id: str = field(default_factory=lambda: str(uuid4()))
+from .chunk_store import ChunkStore, Document, MetadataFilter
+from .collection_manifest import CollectionManifest
+from .config import AISettings, VectorIndexType, VectorStorageType
+from .index_factory import IndexFactory
+from .lexical_index import BM25Index
+from .write_ahead_log import WriteAheadLog
 
 
 class FAISSVectorStore:
@@ -25,7 +21,16 @@ class FAISSVectorStore:
     Production-grade FAISS vector store wrapper.
     
     Features:
-    - Persistent storage
+    - Persistent storage (base snapshot + append-only write-ahead log)
+    - Background compaction of the log into the snapshot
+    - Chunk text/metadata kept on disk and read lazily for search hits
+    - O(k) deletes: tombstoned ids are filtered out of searches and purged
+      from the index in the background
+    - Optional memory-mapped, read-only base index shared across worker
+      processes, with new vectors kept in a small in-memory delta
+    - Optional compressed vector encodings (fp16, SQ8, PQ) with an exact
+      re-ranking pass over the top candidates
+    - BM25 keyword search over the chunk texts, persisted with the snapshot
     - Safe document insertion
     - Unique ID generation
     - Structured search results with scores
@@ -33,11 +38,24 @@ class FAISSVectorStore:
     - Cosine similarity search
     """
 
-    def __init__(self, collection_name: str = "default"):
+    def __init__(
+        self,
+        collection_name: str = "default",
+        index_type: Optional[VectorIndexType] = None,
+        storage_type: Optional[VectorStorageType] = None,
+        rerank_factor: Optional[int] = None,
+    ):
         self.collection_name = collection_name
+        # Per-collection index layout and vector encoding (settings by default)
+        self.index_type = index_type or AISettings.VECTOR_INDEX_TYPE
+        self.storage_type = storage_type or AISettings.VECTOR_STORAGE_TYPE
+        self.rerank_factor = (
+            AISettings.VECTOR_RERANK_FACTOR if rerank_factor is None else rerank_factor
+        )
         self.persist_directory = AISettings.VECTOR_STORE_PATH
         self.index_path = os.path.join(self.persist_directory, f"{collection_name}.faiss")
         self.metadata_path = os.path.join(self.persist_directory, f"{collection_name}.pkl")
+        self.wal_path = os.path.join(self.persist_directory, f"{collection_name}.wal")
 
         try:
             logger.info("Initializing FAISS vector store at {}", self.persist_directory)
@@ -45,13 +63,52 @@ class FAISSVectorStore:
             # Create directory if it doesn't exist
             os.makedirs(self.persist_directory, exist_ok=True)
 
-            # Initialize index and documents
+            # Initialize index and documents. The index is keyed by int64 vector
+            # ids; text and metadata live in the chunk store (which also maps
+            # chunk ids to vector ids) and the vectors themselves only in the index.
             self.index: Optional[faiss.Index] = None
-            self.documents: List[Document] = []
             self.dimension: Optional[int] = None
+            # With VECTOR_STORE_MMAP the base index is mapped read-only from
+            # the snapshot file and adds go to `_delta` until the next compaction.
+            self._mmap = AISettings.VECTOR_STORE_MMAP
+            self._base_readonly = False
+            self._delta: Optional[faiss.Index] = None
+            # Other processes may write to the same collection: the manifest
+            # carries the published snapshot version and the last WAL seq, and
+            # `_wal_cursor` is how far this process has read the log.
+            self._manifest = CollectionManifest(self.persist_directory, collection_name)
+            self._snapshot_version = 0
+            self._wal_cursor: Optional[Tuple[int, int]] = None
+            self._chunks = ChunkStore(
+                self.persist_directory, collection_name, fsync=AISettings.VECTOR_WAL_FSYNC
+            )
+            # A compressed index can't give back exact vectors, so the chunk
+            # store keeps them on disk for re-ranking and retraining
+            self._keep_exact = self.storage_type != VectorStorageType.FLOAT32
+
+            # Mutations are logged before being applied; `_seq` is the last
+            # record reflected in memory. Compaction runs on its own thread.
+            self._wal = WriteAheadLog(self.wal_path, fsync=AISettings.VECTOR_WAL_FSYNC)
+            self._seq = 0
+            self._lock = threading.RLock()
+            self._compaction_lock = threading.Lock()
+            self._compaction_thread: Optional[threading.Thread] = None
+
+            # Deleted ids stay in the index as tombstones until the next purge.
+            # `_live` is a bitmap over vector ids used as the search filter;
+            # `_generation` changes whenever the index object is replaced.
+            self._live = np.zeros(0, dtype=bool)
+            self._tombstones: Set[int] = set()
+            self._selector: Optional[Tuple[np.ndarray, faiss.IDSelector]] = None
+            self._generation = 0
+
+            # Keyword index over the same vector ids, maintained alongside
+            # the vectors and saved in the snapshot metadata
+            self._lexical = BM25Index()
 
             # Load existing index if available
-            self._load()
+            with self._manifest.lock():
+                self._load()
 
             logger.success("FAISS vector store ready: {}", collection_name)
 
@@ -60,50 +117,786 @@ class FAISSVectorStore:
             raise
 
     def _load(self) -> None:
-        """Load existing index and documents from disk."""
+        """
+        Load the base snapshot from disk and replay the write-ahead log.
+        Caller holds the manifest lock.
+        """
         try:
-            if os.path.exists(self.index_path) and os.path.exists(self.metadata_path):
-                # Load FAISS index
-                self.index = faiss.read_index(self.index_path)
-                
-                # Load documents metadata
-                with open(self.metadata_path, 'rb') as f:
-                    self.documents = pickle.load(f)
-                
-                if self.documents:
-                    self.dimension = self.index.d
-                
-                logger.info("Loaded existing index with {} documents", len(self.documents))
-            else:
-                logger.info("No existing index found, starting fresh")
+            self._recover_if_idle()
+            self._snapshot_version, version = self._manifest.read()
+            records, self._wal_cursor = self._wal.tail()
+            index, snapshot = self._read_snapshot()
+            self._seq = snapshot.get("seq", 0)
+
+            migrating, positional_vids = self._migrate_documents(snapshot, records)
+            relabeling = positional_vids is not None
+            if relabeling:
+                index = self._relabel(index, positional_vids)
+
+            self.index = index
+            self._base_readonly = self._mmap and index is not None and not relabeling
+            if self.index is not None:
+                IndexFactory.configure_search(self.index)
+            self._reset_live(snapshot.get("tombstones"))
+            self._restore_lexical(None if relabeling else snapshot.get("lexical"))
+
+            if self.index is not None:
+                logger.info(
+                    "Loaded existing index with {} documents ({})",
+                    self.get_document_count(),
+                    self._format_memory(),
+                )
+
+            self._replay_wal(records)
+            # A deleted collection keeps counting from its last version
+            self._seq = max(self._seq, version)
+
+            if migrating or relabeling:
+                logger.info("Migrating {} to the chunk store layout", self.collection_name)
+                self._write_snapshot(self._snapshot_state())
+                self._wal.clear()
                 
         except Exception as e:
             logger.error("Failed to load existing index: {}", e)
             # Start fresh if load fails
             self.index = None
-            self.documents = []
+            self._delta = None
+            self._base_readonly = False
+            self._reset_live()
+            self._lexical = BM25Index()
 
-    def _save(self) -> None:
-        """Save index and documents to disk."""
+    def _recover_if_idle(self) -> None:
+        """Clean up after an interrupted snapshot, unless one is being written right now."""
+        # Temp files are only leftovers if nobody is compacting right now
+        if not self._compaction_lock.acquire(blocking=False):
+            return
         try:
-            if self.index is not None:
-                # Save FAISS index
-                faiss.write_index(self.index, self.index_path)
-                
-                # Save documents metadata
-                with open(self.metadata_path, 'wb') as f:
-                    pickle.dump(self.documents, f)
-                
-                logger.debug("Saved index with {} documents", len(self.documents))
-        except Exception as e:
-            logger.error("Failed to save index: {}", e)
-            raise
+            with self._manifest.try_compaction_lock() as idle:
+                if idle:
+                    self._recover_snapshot()
+        finally:
+            self._compaction_lock.release()
+
+    def _read_snapshot(self) -> Tuple[Optional[faiss.Index], Dict[str, Any]]:
+        """
+        Read the base index and its metadata ("seq", "tombstones",
+        "lexical"), or (None, {}) without a snapshot. Older snapshots carry
+        "documents" to migrate or positional "vids" to re-key by instead.
+        """
+        if not (os.path.exists(self.index_path) and os.path.exists(self.metadata_path)):
+            logger.info("No existing index found, starting fresh")
+            return None, {}
+
+        index = self._read_index()
+        self.dimension = index.d
+        with open(self.metadata_path, 'rb') as f:
+            snapshot = pickle.load(f)
+        # Older snapshots hold the whole pickled Document list
+        if isinstance(snapshot, list):
+            snapshot = {"documents": snapshot}
+        return index, snapshot
+
+    def _migrate_documents(
+        self,
+        snapshot: Dict[str, Any],
+        records: List[Dict[str, Any]],
+    ) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Move the Document lists of a legacy snapshot into the chunk store
+        (legacy WAL records are handled by the replay). Returns whether the
+        collection is being migrated, and the vector ids of a positional
+        (pre id-map) index in index order, if it has to be re-keyed.
+        """
+        documents = snapshot.get("documents")
+        if documents is None and not any("documents" in record for record in records):
+            return False, snapshot.get("vids")
+
+        # Rows from an interrupted migration are rebuilt from scratch
+        self._chunks.clear()
+        if documents:
+            return True, self._append_chunks(documents)
+        return True, snapshot.get("vids")
+
+    def _restore_lexical(self, state: Optional[Dict[str, Any]]) -> None:
+        """Load the saved keyword index, or rebuild it from the chunk texts."""
+        if state is not None:
+            self._lexical = BM25Index.from_state(state)
+        else:
+            self._rebuild_lexical()
+
+    def _read_index(self) -> faiss.Index:
+        """Read the base index, memory-mapped and read-only in mmap mode."""
+        if not self._mmap:
+            return faiss.read_index(self.index_path)
+        # Codes stay in the page cache, shared by every process mapping the file
+        return faiss.read_index(
+            self.index_path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+        )
+
+    def refresh(self) -> bool:
+        """
+        Pick up changes made to the collection by other processes.
+
+        Only the 16-byte manifest is read when nothing changed. New WAL
+        records are applied incrementally from this process's cursor; a
+        newly published snapshot is reloaded (re-mapped in mmap mode).
+        Returns True if anything was loaded.
+        """
+        snapshot_version, version = self._manifest.read()
+        if snapshot_version == self._snapshot_version and version <= self._seq:
+            return False
+
+        with self._lock, self._manifest.lock():
+            return self._catch_up()
+
+    @property
+    def version(self) -> int:
+        """
+        Collection version (last WAL seq) of the state searches see, after
+        picking up changes from other processes. Grows on every write, even
+        across delete_collection, and is left alone by compaction, so
+        anything derived from search results can be keyed on it.
+        """
+        self.refresh()
+        with self._lock:
+            return self._seq
+
+    def _catch_up(self) -> bool:
+        """Apply what other processes have published. Caller holds both locks."""
+        snapshot_version, version = self._manifest.read()
+        if snapshot_version != self._snapshot_version:
+            logger.info(
+                "Snapshot {} of {} published elsewhere, reloading",
+                snapshot_version,
+                self.collection_name,
+            )
+            self._reload()
+            return True
+        if version <= self._seq:
+            return False
+
+        records, self._wal_cursor = self._wal.tail(self._wal_cursor)
+        records = [record for record in records if record["seq"] > self._seq]
+        if not records or records[0]["seq"] != self._seq + 1:
+            # The cursor lost its place (e.g. a reused inode); start over
+            logger.warning("Lost position in the WAL of {}, reloading", self.collection_name)
+            self._reload()
+            return True
+
+        self._replay_wal(records)
+        return True
+
+    def _reload(self) -> None:
+        """Drop in-memory state and load the collection from disk again."""
+        self.index = None
+        self._delta = None
+        self._base_readonly = False
+        self._generation += 1
+        self._seq = 0
+        # The chunk files may have been cleared and recreated
+        self._chunks.close_maps()
+        self._load()
+
+    def _replay_wal(self, records: List[Dict[str, Any]]) -> None:
+        """Apply WAL records newer than the base snapshot."""
+        replayed = 0
+
+        for record in records:
+            if record["seq"] <= self._seq:
+                continue
+            if record["op"] == "add":
+                if "documents" in record:
+                    vids = self._append_chunks(record["documents"])
+                else:
+                    vids = record["vids"]
+                if self._keep_exact:
+                    self._backfill_exact(vids, record["vectors"])
+                self._apply_add(vids, record["vectors"])
+                self._index_texts(vids)
+            elif record["op"] == "delete":
+                if "ids" in record:
+                    vids = self._chunks.vids_for_chunk_ids(record["ids"])
+                    self._chunks.delete(vids)
+                else:
+                    vids = record["vids"]
+                self._apply_delete(vids)
+            self._seq = record["seq"]
+            replayed += 1
+
+        if (
+            self.index is not None
+            and not self._base_readonly
+            and self._needs_rebuild(self.index)
+        ):
+            self._rebuild_index()
+
+        if replayed:
+            logger.info("Replayed {} WAL records for {}", replayed, self.collection_name)
+
+    def _relabel(self, index: faiss.Index, vids: np.ndarray) -> Optional[faiss.Index]:
+        """Rebuild a positional index as an id-mapped one keyed by `vids`."""
+        if index.ntotal == 0:
+            return None
+        logger.info("Re-keying {} index by vector id", self.collection_name)
+        vectors = index.reconstruct_n(0, index.ntotal)
+        return IndexFactory.build(
+            vectors, vids, IndexFactory.kind_of(index), IndexFactory.storage_of(index)
+        )
+
+    def _index_texts(self, vids: np.ndarray) -> None:
+        """Add the texts of the given vector ids to the keyword index."""
+        vids = np.asarray(vids, dtype=np.int64)
+        for start in range(0, len(vids), 10000):
+            batch = vids[start:start + 10000]
+            docs = self._chunks.get(batch)
+            self._lexical.add(
+                [vid for vid, doc in zip(batch, docs) if doc is not None],
+                [doc.text for doc in docs if doc is not None],
+            )
+
+    def _rebuild_lexical(self) -> None:
+        """Index every live chunk from scratch (snapshots from before the keyword index)."""
+        self._lexical = BM25Index()
+        vids = np.flatnonzero(self._live)
+        if len(vids):
+            logger.info("Building keyword index for {} chunks of {}", len(vids), self.collection_name)
+            self._index_texts(vids)
+
+    def _reset_live(self, tombstones: Optional[np.ndarray] = None) -> None:
+        """Recompute the live bitmap from the index ids and the tombstone list."""
+        if tombstones is None:
+            tombstones = np.empty(0, dtype=np.int64)
+        ids = np.concatenate(
+            [np.empty(0, dtype=np.int64)]
+            + [faiss.vector_to_array(index.id_map) for index in self._segments()]
+        )
+        size = max(self._chunks.next_vid, int(ids.max()) + 1 if len(ids) else 0)
+        self._live = np.zeros(size, dtype=bool)
+        self._live[ids] = True
+        self._live[tombstones] = False
+        self._tombstones = {int(vid) for vid in tombstones}
+        self._selector = None
+
+    def _append_chunks(self, documents: List[Document]) -> np.ndarray:
+        """Persist chunk text/metadata and return their vector ids."""
+        return self._chunks.append(
+            [doc.id for doc in documents],
+            [doc.text for doc in documents],
+            [doc.metadata for doc in documents],
+        )
+
+    def _append_wal(self, record: Dict[str, Any]) -> None:
+        """Durably log a mutation before it is applied in memory."""
+        record["seq"] = self._seq + 1
+        self._wal_cursor = self._wal.append(record)
+        self._seq = record["seq"]
+        self._manifest.write(self._snapshot_version, self._seq)
+
+    def _write_durable(self, path: str, data: bytes) -> None:
+        with open(path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _recover_snapshot(self) -> None:
+        """
+        Finish or roll back a snapshot interrupted by a crash. Renaming the
+        id file is the commit point; the index file is renamed right after.
+        """
+        index_tmp, metadata_tmp = f"{self.index_path}.tmp", f"{self.metadata_path}.tmp"
+        if os.path.exists(metadata_tmp):
+            for path in (index_tmp, metadata_tmp):
+                if os.path.exists(path):
+                    os.remove(path)
+        elif os.path.exists(index_tmp):
+            logger.warning("Completing interrupted snapshot for {}", self.collection_name)
+            os.replace(index_tmp, self.index_path)
+
+    def _snapshot_state(self) -> Dict[str, Any]:
+        """
+        Capture the in-memory state to persist. Caller holds the lock and
+        there is no delta or tombstone to fold in.
+        """
+        return {
+            "seq": self._seq,
+            "index": faiss.serialize_index(self.index) if self.index is not None else None,
+            "lexical": self._lexical.state(),
+        }
+
+    def _write_snapshot(self, state: Dict[str, Any]) -> None:
+        """
+        Write the base snapshot and publish it. The files are written
+        aside first; only the renames and the version bump take the locks.
+        """
+        index_tmp, metadata_tmp = f"{self.index_path}.tmp", f"{self.metadata_path}.tmp"
+        if state["index"] is not None:
+            self._write_durable(index_tmp, state["index"].tobytes())
+            self._write_durable(
+                metadata_tmp, pickle.dumps({"seq": state["seq"], "lexical": state["lexical"]})
+            )
+
+        with self._lock, self._manifest.lock():
+            if state["index"] is None:
+                for path in (self.index_path, self.metadata_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            else:
+                os.replace(metadata_tmp, self.metadata_path)
+                os.replace(index_tmp, self.index_path)
+            self._publish_snapshot()
+
+    def _publish_snapshot(self) -> None:
+        """
+        Bump the snapshot version so other processes reload. This process
+        already has the state in memory. Caller holds both locks.
+        """
+        snapshot_version, version = self._manifest.read()
+        self._snapshot_version = max(self._snapshot_version, snapshot_version) + 1
+        self._manifest.write(self._snapshot_version, max(version, self._seq))
+        # The segment our cursor points into may be discarded next; records
+        # are filtered by seq, so re-reading the live log from the start is safe
+        self._wal_cursor = None
+
+    def compact(self) -> None:
+        """
+        Fold the write-ahead log, the in-memory delta and any tombstones into
+        a new base snapshot.
+
+        The live log is rotated and the live vectors copied under the store
+        lock; the merged index is built and written outside it so writers
+        keep appending. Vectors added in the meantime are carried over when
+        the new base is swapped in. Only one process compacts at a time.
+        """
+        if not self._compaction_lock.acquire(blocking=False):
+            return
+
+        try:
+            with self._manifest.try_compaction_lock() as acquired:
+                if acquired:
+                    self._compact()
+
+        except Exception:
+            logger.exception("Failed to compact {}", self.collection_name)
+        finally:
+            self._compaction_lock.release()
+
+    def _compact(self) -> None:
+        with self._lock, self._manifest.lock():
+            # Fold in whatever other processes logged before rotating
+            self._catch_up()
+            rotated = self._wal.rotate()
+            merging = bool(self._tombstones) or self._delta is not None
+            if not rotated and not merging:
+                return
+
+            seq, generation = self._seq, self._generation
+            writable = self._writable_index()
+            mark = writable.ntotal if writable is not None else 0
+            dead = np.fromiter(self._tombstones, dtype=np.int64, count=len(self._tombstones))
+            if merging:
+                base = self.index
+                vectors, ids = self._live_vectors(dead)
+                lexical = self._lexical.state()
+            else:
+                state = self._snapshot_state()
+
+        if merging:
+            merged = self._build_merged(base, vectors, ids)
+            state = {
+                "seq": seq,
+                "index": faiss.serialize_index(merged) if merged is not None else None,
+                "lexical": lexical,
+            }
+
+        self._write_snapshot(state)
+        if rotated:
+            self._wal.discard_rotated()
+
+        with self._lock:
+            # An in-memory base is re-mapped too, so this process shares
+            # its pages with the other workers
+            remap = self._mmap and not self._base_readonly
+            if writable is None:
+                # A delta created since the capture holds only newer vectors
+                writable = self._writable_index()
+            if self._generation == generation and (merging or remap):
+                self._install_base(merged if merging else self.index, writable, mark, dead)
+            document_count = self.get_document_count()
+
+        logger.info(
+            "Compacted {} at seq {} ({} documents)",
+            self.collection_name,
+            seq,
+            document_count,
+        )
+
+    def _build_merged(
+        self,
+        base: Optional[faiss.Index],
+        vectors: np.ndarray,
+        ids: np.ndarray,
+    ) -> Optional[faiss.Index]:
+        """
+        Build a single index from live vectors, choosing its type for the
+        resulting size. A trained IVF base is reused when it still fits.
+        """
+        if len(ids) == 0:
+            return None
+
+        if base is not None and not self._needs_rebuild(base, ntotal=len(ids)):
+            merged = IndexFactory.empty_like(base, training_vectors=vectors)
+        else:
+            merged = IndexFactory.create(
+                vectors.shape[1],
+                IndexFactory.resolve_type(len(ids), self.index_type),
+                training_vectors=vectors,
+                storage_type=self.storage_type,
+            )
+        merged.add_with_ids(vectors, ids)
+        return merged
+
+    def _install_base(
+        self,
+        merged: Optional[faiss.Index],
+        writable: Optional[faiss.Index],
+        mark: int,
+        dead: np.ndarray,
+    ) -> None:
+        """
+        Swap in the freshly written base. Vectors added to `writable` past
+        `mark` while it was being built are re-added on top. Caller holds
+        the lock.
+        """
+        added_vectors = added_ids = None
+        if writable is not None and writable.ntotal > mark:
+            added = writable.ntotal - mark
+            added_vectors = IndexFactory.unwrap(writable).reconstruct_n(mark, added)
+            added_ids = faiss.vector_to_array(writable.id_map)[mark:]
+
+        if self._mmap and merged is not None:
+            merged = self._read_index()
+            IndexFactory.configure_search(merged)
+        self._replace_index(merged)
+        self._base_readonly = self._mmap and merged is not None
+        self._delta = None
+        self._tombstones.difference_update(dead.tolist())
+
+        if added_ids is not None:
+            # Their live bits are already current (some may be tombstoned)
+            self._add_to_segments(added_ids, added_vectors)
+
+        if len(dead):
+            logger.info("Purged {} deleted vectors from {}", len(dead), self.collection_name)
+
+    def _maybe_compact(self) -> None:
+        """Start a background compaction once the log or the tombstones pile up."""
+        tombstone_limit = AISettings.VECTOR_TOMBSTONE_COMPACT_RATIO * self._ntotal()
+        if (
+            self._wal.size() < AISettings.VECTOR_WAL_COMPACT_BYTES
+            and (not self._tombstones or len(self._tombstones) < tombstone_limit)
+        ):
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(
+            target=self.compact,
+            name=f"faiss-compact-{self.collection_name}",
+            daemon=True,
+        )
+        self._compaction_thread.start()
+
+    def close(self) -> None:
+        """Wait for any in-flight compaction to finish."""
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
 
     def _normalize_vectors(self, vectors: np.ndarray) -> np.ndarray:
         """L2 normalize vectors for cosine similarity."""
         faiss.normalize_L2(vectors)
         return vectors
 
+    def _segments(self) -> List[faiss.Index]:
+        """The base index and, in mmap mode, the delta holding newer vectors."""
+        return [index for index in (self.index, self._delta) if index is not None]
+
+    def _writable_index(self) -> Optional[faiss.Index]:
+        """The index new vectors are added to."""
+        return self._delta if self._base_readonly else self.index
+
+    def _ntotal(self) -> int:
+        """Vectors held across segments, tombstoned ones included."""
+        return sum(index.ntotal for index in self._segments())
+
+    def _live_vectors(self, dead: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the (vectors, ids) of every segment, excluding the ids in
+        `dead`. Compressed segments are replaced by the exact vectors from
+        the chunk store where it has them, so rebuilds don't compound the
+        encoding loss; exact segments fill in the ones it lacks.
+        """
+        vectors = [np.empty((0, self.dimension or 0), dtype=np.float32)]
+        ids = [np.empty(0, dtype=np.int64)]
+        for index in self._segments():
+            segment_vectors = IndexFactory.unwrap(index).reconstruct_n(0, index.ntotal)
+            segment_ids = faiss.vector_to_array(index.id_map)
+            if self._keep_exact:
+                if IndexFactory.storage_of(index) == VectorStorageType.FLOAT32:
+                    self._backfill_exact(segment_ids, segment_vectors)
+                else:
+                    exact = self._chunks.get_vectors(segment_ids, index.d)
+                    stored = exact.any(axis=1)
+                    segment_vectors[stored] = exact[stored]
+            vectors.append(segment_vectors)
+            ids.append(segment_ids)
+        vectors, ids = np.concatenate(vectors), np.concatenate(ids)
+        keep = ~np.isin(ids, dead)
+        return np.ascontiguousarray(vectors[keep]), ids[keep]
+
+    def _backfill_exact(self, vids: np.ndarray, vectors: np.ndarray) -> None:
+        """Store exact vectors the chunk store doesn't have yet (e.g. after switching encoding)."""
+        stored = self._chunks.get_vectors(vids, vectors.shape[1]).any(axis=1)
+        if not stored.all():
+            self._chunks.write_vectors(vids[~stored], vectors[~stored])
+
+    def _needs_rebuild(self, index: faiss.Index, ntotal: Optional[int] = None) -> bool:
+        """Whether `index` no longer matches this collection's layout and encoding."""
+        return IndexFactory.needs_rebuild(index, self.index_type, ntotal, self.storage_type)
+
+    def get_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the normalized (vectors, vector ids) of every live chunk,
+        exact where the chunk store keeps them.
+        """
+        with self._lock:
+            dead = np.fromiter(self._tombstones, dtype=np.int64, count=len(self._tombstones))
+            return self._live_vectors(dead)
+
+    def get_embeddings(self, chunk_ids: Sequence[str]) -> np.ndarray:
+        """
+        Return the normalized stored vectors of chunks by chunk id, one row
+        per id in the given order, exact where the chunk store keeps them.
+        Unknown or deleted chunks get an all-zero row.
+        """
+        vid_by_chunk_id = self._chunks.vids_by_chunk_id(chunk_ids)
+        with self._lock:
+            if self.index is None:
+                return np.zeros((len(chunk_ids), self.dimension or 0), dtype=np.float32)
+
+            result = np.zeros((len(chunk_ids), self.dimension), dtype=np.float32)
+            rows, vids = [], []
+            for row, chunk_id in enumerate(chunk_ids):
+                vid = vid_by_chunk_id.get(chunk_id)
+                if vid is not None and vid < len(self._live) and self._live[vid]:
+                    rows.append(row)
+                    vids.append(vid)
+            vids = np.array(vids, dtype=np.int64)
+
+            if self._keep_exact:
+                result[rows] = self._chunks.get_vectors(vids, self.dimension)
+            for row, vid in zip(rows, vids):
+                if not result[row].any():
+                    result[row] = self._reconstruct(int(vid))
+        return result
+
+    def _replace_index(self, index: Optional[faiss.Index]) -> None:
+        """Swap in a rebuilt index. Caller holds the lock."""
+        self.index = index
+        self._generation += 1
+        self._selector = None
+
+    def _rebuild_index(self) -> None:
+        """
+        Rebuild the index from its own live vectors, choosing the index type
+        for the resulting collection size (flat, IVF or HNSW). Tombstoned
+        vectors are dropped along the way.
+        """
+        dead = np.fromiter(self._tombstones, dtype=np.int64, count=len(self._tombstones))
+        vectors, ids = self._live_vectors(dead)
+        self._tombstones.clear()
+
+        if len(ids) == 0:
+            self._replace_index(None)
+            return
+
+        memory_before = self._format_memory()
+        index_type = IndexFactory.resolve_type(len(ids), self.index_type)
+        storage_type = IndexFactory.resolve_storage(len(ids), self.storage_type, index_type)
+        logger.info(
+            "Building {} ({}) index for {} vectors in {}",
+            index_type.value,
+            storage_type.value,
+            len(ids),
+            self.collection_name,
+        )
+        self._replace_index(IndexFactory.build(vectors, ids, index_type, storage_type))
+        logger.debug("Index memory {} -> {}", memory_before, self._format_memory())
+
+    def _apply_add(self, vids: np.ndarray, vectors: np.ndarray) -> None:
+        """Add normalized vectors for the given vector ids to the in-memory index."""
+        self._add_to_segments(vids, vectors)
+
+        if len(vids) and int(vids.max()) >= len(self._live):
+            # Grow the bitmap geometrically so appends stay amortized O(1)
+            grown = np.zeros(max(int(vids.max()) + 1, 2 * len(self._live)), dtype=bool)
+            grown[:len(self._live)] = self._live
+            self._live = grown
+        self._live[vids] = True
+        self._selector = None
+
+    def _add_to_segments(self, vids: np.ndarray, vectors: np.ndarray) -> None:
+        """Add vectors to the writable index, creating it when needed."""
+        if self._base_readonly and self._delta is None:
+            # The mapped base can't grow; new vectors are searched exhaustively
+            self._delta = IndexFactory.create(
+                vectors.shape[1], VectorIndexType.FLAT, storage_type=VectorStorageType.FLOAT32
+            )
+        if self.index is None:
+            self.dimension = vectors.shape[1]
+            index_type = IndexFactory.resolve_type(len(vids), self.index_type)
+            self._replace_index(
+                IndexFactory.create(
+                    self.dimension,
+                    index_type,
+                    training_vectors=vectors,
+                    storage_type=self.storage_type,
+                )
+            )
+            logger.info(
+                "Created new {} FAISS index with dimension {}",
+                index_type.value,
+                self.dimension,
+            )
+
+        self._writable_index().add_with_ids(vectors, vids)
+
+    def _apply_delete(self, vids: np.ndarray) -> bool:
+        """
+        Tombstone vector ids: they stay in the index but are filtered out of
+        searches until the next purge. Returns False if nothing matched.
+        """
+        vids = np.asarray(vids, dtype=np.int64)
+        vids = vids[vids < len(self._live)]
+        vids = vids[self._live[vids]]
+        if len(vids) == 0:
+            return False
+
+        self._live[vids] = False
+        self._tombstones.update(vids.tolist())
+        self._selector = None
+        self._lexical.remove(vids)
+
+        if len(self._tombstones) == self._ntotal():
+            # Nothing left to search; drop the index outright
+            self._tombstones.clear()
+            self._replace_index(None)
+            self._delta = None
+            self._base_readonly = False
+        return True
+
+    @staticmethod
+    def _bitmap_selector(mask: np.ndarray) -> Tuple[np.ndarray, faiss.IDSelector]:
+        """Pack a per-vid mask into an IDSelectorBitmap."""
+        bitmap = np.packbits(mask, bitorder="little")
+        # The selector only points at the bitmap, so keep both alive together
+        return bitmap, faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+
+    def _filter_selector(
+        self, metadata_filter: MetadataFilter
+    ) -> Tuple[int, Tuple[np.ndarray, faiss.IDSelector]]:
+        """
+        Selector admitting only live vids that match the filter, and how many
+        there are. Caller holds the lock.
+        """
+        mask = self._filter_mask(metadata_filter)
+        return int(mask.sum()), self._bitmap_selector(mask)
+
+    def _filter_mask(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        """Per-vid mask of live chunks matching the filter. Caller holds the lock."""
+        vids = self._chunks.vids_matching(metadata_filter)
+        mask = np.zeros_like(self._live)
+        mask[vids[vids < len(mask)]] = True
+        mask &= self._live
+        return mask
+
+    def _search_parameters(
+        self,
+        index: faiss.Index,
+        selector: Optional[faiss.IDSelector] = None,
+    ) -> Optional[faiss.SearchParameters]:
+        """
+        Search parameters that skip tombstoned ids, or only admit `selector`
+        (which already excludes them). Caller holds the lock.
+        """
+        if selector is not None:
+            return IndexFactory.search_parameters(index, selector)
+        if not self._tombstones:
+            return None
+        if self._selector is None:
+            self._selector = self._bitmap_selector(self._live)
+        return IndexFactory.search_parameters(index, self._selector[1])
+
+    def _search_segments(
+        self,
+        queries: np.ndarray,
+        k: int,
+        selector: Optional[faiss.IDSelector] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search the base and the delta and merge their top-k by score.
+        Caller holds the lock.
+        """
+        results = [
+            index.search(queries, min(k, index.ntotal), params=self._search_parameters(index, selector))
+            for index in self._segments()
+            if index.ntotal
+        ]
+        if not results:
+            return np.empty((len(queries), 0), dtype=np.float32), np.empty((len(queries), 0), dtype=np.int64)
+        if len(results) == 1:
+            return results[0]
+
+        scores = np.concatenate([scores for scores, _ in results], axis=1)
+        labels = np.concatenate([labels for _, labels in results], axis=1)
+        # Missing hits (-1) carry -inf-like scores from FAISS and sort last
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(labels, order, axis=1)
+
+    def _rerank(
+        self,
+        queries: np.ndarray,
+        scores: np.ndarray,
+        labels: np.ndarray,
+        k: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-score candidates on the exact vectors from the chunk store and
+        keep the top k. Candidates without a stored vector keep their
+        approximate score.
+        """
+        vids = np.unique(labels[labels != -1])
+        if len(vids) == 0:
+            return scores[:, :k], labels[:, :k]
+        exact = self._chunks.get_vectors(vids, queries.shape[1])
+        stored = exact.any(axis=1)
+
+        rows = np.searchsorted(vids, labels)
+        rows[labels == -1] = 0
+        exact_scores = np.einsum("qd,qcd->qc", queries, exact[rows])
+        use_exact = stored[rows] & (labels != -1)
+        scores = np.where(use_exact, exact_scores, scores).astype(np.float32)
+
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(labels, order, axis=1)
+
+    def _reconstruct(self, vid: int) -> np.ndarray:
+        """Read a stored vector back from whichever segment holds it."""
+        if self._delta is not None:
+            try:
+                return self._delta.reconstruct(vid)
+            except RuntimeError:
+                pass
+        return self.index.reconstruct(vid)
+
     def add_documents(
         self,
         documents: List[str],
@@ -135,21 +928,14 @@ class FAISSVectorStore:
             # Generate IDs for new documents
             ids = [str(uuid4()) for _ in documents]
             
-            # Convert embeddings to numpy array
-            embeddings_array = np.array(embeddings).astype('float32')
+            # Convert embeddings straight to a contiguous float32 array
+            embeddings_array = np.asarray(embeddings, dtype=np.float32)
             current_dim = embeddings_array.shape[1]
 
             logger.debug("Adding {} documents to FAISS (dim={})", len(documents), current_dim)
 
-            # Initialize index if needed
-            if self.index is None:
-                self.dimension = current_dim
-                # Using IndexFlatIP for inner product (cosine similarity after normalization)
-                self.index = faiss.IndexFlatIP(self.dimension)
-                logger.info("Created new FAISS index with dimension {}", self.dimension)
-
             # Verify dimension consistency
-            if current_dim != self.dimension:
+            if self.dimension is not None and current_dim != self.dimension:
                 raise ValueError(
                     f"Embedding dimension mismatch: expected {self.dimension}, got {current_dim}"
                 )
@@ -157,22 +943,27 @@ class FAISSVectorStore:
             # Normalize vectors for cosine similarity
             normalized_vectors = self._normalize_vectors(embeddings_array)
 
-            # Add to index
-            self.index.add(normalized_vectors)
-
-            # Create and store document objects
-            for i, (text, embedding) in enumerate(zip(documents, embeddings)):
-                metadata = metadatas[i] if metadatas else {}
-                doc = Document(
-                    id=ids[i],
-                    text=text,
-                    metadata=metadata,
-                    embedding=embedding  # Store original embedding
+            with self._lock, self._manifest.lock():
+                # Other processes may have appended since our last look
+                self._catch_up()
+
+                # Chunk rows first, then the WAL record that makes them searchable
+                vids = self._chunks.append(
+                    ids,
+                    documents,
+                    metadatas or [{} for _ in documents],
+                    vectors=normalized_vectors if self._keep_exact else None,
                 )
-                self.documents.append(doc)
+                self._append_wal({"op": "add", "vids": vids, "vectors": normalized_vectors})
+                self._apply_add(vids, normalized_vectors)
+                self._lexical.add(vids, documents)
 
-            # Save to disk
-            self._save()
+                # Promote flat → IVF/HNSW (or retrain IVF) once the collection outgrows
+                # it; a mapped base is promoted by the next compaction instead
+                if not self._base_readonly and self._needs_rebuild(self.index):
+                    self._rebuild_index()
+
+            self._maybe_compact()
 
             logger.success("Inserted {} documents into {}", len(documents), self.collection_name)
             
@@ -187,6 +978,7 @@ class FAISSVectorStore:
         query_embedding: List[float],
         top_k: int = 5,
         include_embeddings: bool = False,
+        metadata_filter: Optional[MetadataFilter] = None,
     ) -> List[Dict[str, Any]]:
         """
         Search for similar documents.
@@ -194,7 +986,8 @@ class FAISSVectorStore:
         Args:
             query_embedding: Query embedding vector
             top_k: Number of results to return
-            include_embeddings: Whether to include embeddings in results
+            include_embeddings: Whether to include the (normalized) stored vectors
+            metadata_filter: Only search chunks matching these metadata values
             
         Returns:
             List of result dictionaries with document, metadata, and score
@@ -202,52 +995,210 @@ class FAISSVectorStore:
         if not query_embedding:
             raise ValueError("Query embedding is empty")
 
+        return self.search_batch(
+            [query_embedding], top_k, include_embeddings, metadata_filter
+        )[0]
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        include_embeddings: bool = False,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries at once.
+
+        All queries are normalized together and answered by a single FAISS
+        search over an (n, d) matrix, which is much cheaper than n one-row
+        searches. Chunks hit by more than one query are read once.
+
+        A metadata filter is resolved to vector ids through the chunk store's
+        column indexes and applied inside FAISS as an id bitmap, so exactly
+        the top-k matching chunks are returned without over-fetching.
+
+        Args:
+            query_embeddings: Query embedding vectors
+            top_k: Number of results to return per query
+            include_embeddings: Whether to include the (normalized) stored vectors
+            metadata_filter: Only search chunks matching these metadata values
+
+        Returns:
+            One list of result dictionaries per query, in query order
+        """
+        if not query_embeddings:
+            return []
+        if any(not embedding for embedding in query_embeddings):
+            raise ValueError("Query embedding is empty")
+
+        # Cheap when nothing changed: one read of the manifest stamp
+        self.refresh()
+
         if self.index is None or self.index.ntotal == 0:
             logger.warning("No documents in index to search")
-            return []
+            return [[] for _ in query_embeddings]
 
         try:
-            logger.debug("Searching FAISS | top_k={}", top_k)
+            logger.debug("Searching FAISS | queries={} top_k={}", len(query_embeddings), top_k)
 
-            # Convert query to numpy array and normalize
-            query_array = np.array([query_embedding]).astype('float32')
+            # Convert queries to a numpy matrix and normalize
+            query_array = np.array(query_embeddings).astype('float32')
             
             # Verify dimension
-            if query_array.shape[1] != self.dimension:
+            if query_array.ndim != 2 or query_array.shape[1] != self.dimension:
                 raise ValueError(
-                    f"Query dimension mismatch: expected {self.dimension}, got {query_array.shape[1]}"
+                    f"Query dimension mismatch: expected {self.dimension}, got {query_array.shape[-1]}"
                 )
             
-            # Normalize query vector
+            # Normalize query vectors
             query_normalized = self._normalize_vectors(query_array)
 
-            # Search (k cannot exceed total number of vectors)
-            k = min(top_k, self.index.ntotal)
-            scores, indices = self.index.search(query_normalized, k)
+            # Search (k cannot exceed the number of live vectors)
+            with self._lock:
+                if self.index is None:
+                    return [[] for _ in query_embeddings]
+                candidates, selector = self._query_selector(metadata_filter)
+                if candidates == 0:
+                    return [[] for _ in query_embeddings]
+                hits = self._search_hits(
+                    query_normalized, min(top_k, candidates), candidates, selector
+                )
+                hit_vids = sorted({vid for row in hits for vid, _ in row})
+                hit_embeddings = (
+                    {vid: self._reconstruct(vid).tolist() for vid in hit_vids}
+                    if include_embeddings
+                    else None
+                )
 
-            # Prepare results
-            structured_results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx != -1 and idx < len(self.documents):
-                    doc = self.documents[idx]
-                    result = {
-                        "id": doc.id,
-                        "document": doc.text,
-                        "metadata": doc.metadata,
-                        "score": float(score),  # Cosine similarity score
-                    }
-                    if include_embeddings and doc.embedding:
-                        result["embedding"] = doc.embedding
-                    
-                    structured_results.append(result)
-
-            logger.debug("Search returned {} results", len(structured_results))
-            return structured_results
+            batch_results = self._assemble_results(hits, hit_vids, hit_embeddings)
+
+            logger.debug(
+                "Search returned {} results for {} queries",
+                sum(len(results) for results in batch_results),
+                len(batch_results),
+            )
+            return batch_results
 
         except Exception:
             logger.exception("FAISS search failed")
             raise
 
+    def _query_selector(
+        self, metadata_filter: Optional[MetadataFilter]
+    ) -> Tuple[int, Optional[Tuple[np.ndarray, faiss.IDSelector]]]:
+        """
+        How many live chunks a search can return, and the selector admitting
+        only those matching the filter (None without one). Caller holds the lock.
+        """
+        if metadata_filter is None or metadata_filter.is_empty():
+            return self.get_document_count(), None
+        candidates, selector = self._filter_selector(metadata_filter)
+        if candidates == 0:
+            logger.debug("No documents match the metadata filter")
+        return candidates, selector
+
+    def _search_hits(
+        self,
+        queries: np.ndarray,
+        k: int,
+        candidates: int,
+        selector: Optional[Tuple[np.ndarray, faiss.IDSelector]],
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k (vid, score) pairs per query. Compressed codes only approximate
+        the scores, so the candidates are over-fetched and re-ranked on their
+        exact vectors. Caller holds the lock.
+        """
+        rerank = (
+            self.rerank_factor > 1
+            and IndexFactory.storage_of(self.index) != VectorStorageType.FLOAT32
+        )
+        fetch = min(k * self.rerank_factor, candidates) if rerank else k
+        scores, labels = self._search_segments(
+            queries, fetch, selector[1] if selector is not None else None
+        )
+        if rerank:
+            scores, labels = self._rerank(queries, scores, labels, k)
+        return [
+            [(int(vid), float(score)) for score, vid in zip(row_scores, row_labels) if vid != -1]
+            for row_scores, row_labels in zip(scores, labels)
+        ]
+
+    def _assemble_results(
+        self,
+        hits: List[List[Tuple[int, float]]],
+        hit_vids: List[int],
+        hit_embeddings: Optional[Dict[int, List[float]]],
+    ) -> List[List[Dict[str, Any]]]:
+        """Result dictionaries per query; only the hits are read from the chunk store."""
+        hit_docs = dict(zip(hit_vids, self._chunks.get(hit_vids)))
+
+        batch_results = []
+        for row in hits:
+            structured_results = []
+            for vid, score in row:
+                doc = hit_docs[vid]
+                if doc is None:
+                    continue
+                result = {
+                    "id": doc.id,
+                    "document": doc.text,
+                    "metadata": doc.metadata,
+                    "score": score,  # Cosine similarity score
+                }
+                if hit_embeddings is not None:
+                    result["embedding"] = hit_embeddings[vid]
+
+                structured_results.append(result)
+            batch_results.append(structured_results)
+        return batch_results
+
+    def search_lexical(
+        self,
+        query: str,
+        top_k: int = 5,
+        metadata_filter: Optional[MetadataFilter] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyword search over chunk texts with BM25.
+
+        Catches exact terms (clause numbers, form ids, acronyms) that
+        embeddings match poorly. Results have the same shape as `search`,
+        with the BM25 score as "score".
+
+        Args:
+            query: Query text
+            top_k: Number of results to return
+            metadata_filter: Only search chunks matching these metadata values
+
+        Returns:
+            List of result dictionaries with document, metadata, and score
+        """
+        if not query.strip():
+            raise ValueError("Query is empty")
+
+        self.refresh()
+
+        with self._lock:
+            allowed = None
+            if metadata_filter is not None and not metadata_filter.is_empty():
+                allowed = self._filter_mask(metadata_filter)
+            scores, vids = self._lexical.search(query, top_k, allowed)
+
+        results = []
+        for score, doc in zip(scores, self._chunks.get(vids)):
+            if doc is None:
+                continue
+            results.append({
+                "id": doc.id,
+                "document": doc.text,
+                "metadata": doc.metadata,
+                "score": float(score),  # BM25 score
+            })
+
+        logger.debug("Keyword search returned {} results", len(results))
+        return results
+
     def search_with_scores(
         self,
         query_embedding: List[float],
@@ -270,70 +1221,98 @@ class FAISSVectorStore:
         """
         Delete documents by ID.
         
-        Note: FAISS doesn't support direct deletion. This rebuilds the index
-        without the deleted documents.
+        Deleted vectors are tombstoned and filtered out of searches, so the
+        cost is proportional to the number of ids. On disk only a delete
+        record is appended to the write-ahead log; the index itself is
+        purged by background compaction.
         """
         if not ids:
             return
 
         try:
-            # Find indices to keep
-            keep_indices = []
-            keep_docs = []
-            
-            for i, doc in enumerate(self.documents):
-                if doc.id not in ids:
-                    keep_indices.append(i)
-                    keep_docs.append(doc)
+            vids = self._chunks.vids_for_chunk_ids(list(set(ids)))
+            self.delete_vids(vids)
 
-            if len(keep_docs) == len(self.documents):
-                logger.info("No documents to delete")
-                return
+        except Exception:
+            logger.exception("Failed to delete documents")
+            raise
 
-            # Rebuild index with remaining documents
-            if keep_docs and keep_docs[0].embedding:
-                embeddings = [doc.embedding for doc in keep_docs if doc.embedding]
-                if embeddings:
-                    embeddings_array = np.array(embeddings).astype('float32')
-                    
-                    # Create new index
-                    self.index = faiss.IndexFlatIP(self.dimension)
-                    normalized_vectors = self._normalize_vectors(embeddings_array)
-                    self.index.add(normalized_vectors)
-                    
-                    self.documents = keep_docs
-                    
-                    # Save updated index
-                    self._save()
-                    
-                    logger.success("Deleted {} documents", len(ids))
-                else:
-                    logger.warning("Cannot rebuild index: missing embeddings")
-            else:
-                # If no documents left, clear everything
-                self.index = None
-                self.documents = []
-                self._save()
-                
-                logger.info("Cleared all documents")
+    def delete_by_document_id(self, document_id: int) -> int:
+        """
+        Delete every chunk of a source document.
+
+        Vector ids come from the chunk store's document_id index, so the cost
+        is proportional to the document's chunk count, not the collection.
+
+        Returns:
+            Number of chunks deleted
+        """
+        try:
+            vids = self.document_vids(document_id)
+            self.delete_vids(vids)
+            return len(vids)
 
         except Exception:
-            logger.exception("Failed to delete documents")
+            logger.exception("Failed to delete chunks of document {}", document_id)
             raise
 
+    def document_vids(self, document_id: int) -> np.ndarray:
+        """
+        Vector ids of a source document's current chunks. Taken before
+        re-indexing the document, they let `delete_vids` drop the old
+        chunks once the new ones are in.
+        """
+        return self._chunks.vids_for_document_id(document_id)
+
+    def delete_vids(self, vids: np.ndarray) -> None:
+        """Log, tombstone and drop the rows of the given vector ids."""
+        if len(vids) == 0:
+            logger.info("No documents to delete")
+            return
+
+        with self._lock, self._manifest.lock():
+            self._catch_up()
+            self._append_wal({"op": "delete", "vids": vids})
+            self._apply_delete(vids)
+            self._chunks.delete(vids)
+
+        if self.get_document_count():
+            logger.success("Deleted {} documents", len(vids))
+        else:
+            logger.info("Cleared all documents")
+
+        self._maybe_compact()
+
     def delete_collection(self) -> None:
         """Delete the entire collection."""
         try:
-            # Remove files
-            if os.path.exists(self.index_path):
-                os.remove(self.index_path)
-            if os.path.exists(self.metadata_path):
-                os.remove(self.metadata_path)
-            
-            # Reset in-memory state
-            self.index = None
-            self.documents = []
-            self.dimension = None
+            self.close()
+
+            with self._lock, self._manifest.lock():
+                # Remove files
+                if os.path.exists(self.index_path):
+                    os.remove(self.index_path)
+                if os.path.exists(self.metadata_path):
+                    os.remove(self.metadata_path)
+                self._wal.clear()
+                self._chunks.clear()
+
+                # Reset in-memory state
+                self._replace_index(None)
+                self._delta = None
+                self._base_readonly = False
+                self._reset_live()
+                self._lexical = BM25Index()
+                self.dimension = None
+
+                # Other processes reload into the empty collection. The
+                # collection version moves on too, so it never repeats and
+                # answers built from the old data are invalidated.
+                snapshot_version, version = self._manifest.read()
+                self._snapshot_version = max(self._snapshot_version, snapshot_version) + 1
+                self._seq = max(self._seq, version) + 1
+                self._manifest.write(self._snapshot_version, self._seq)
+                self._wal_cursor = None
             
             logger.info("Deleted collection {}", self.collection_name)
             
@@ -343,14 +1322,49 @@ class FAISSVectorStore:
 
     def get_document_count(self) -> int:
         """Get number of documents in the store."""
-        return len(self.documents)
+        return self._ntotal() - len(self._tombstones)
+
+    def get_memory_usage(self) -> Dict[str, int]:
+        """
+        Approximate bytes held by the index and the id map. A memory-mapped
+        base lives in the shared page cache rather than in process memory.
+        """
+        ntotal = self._ntotal()
+        index_bytes = IndexFactory.estimate_memory(self.index)
+        return {
+            "index_bytes": 0 if self._base_readonly else index_bytes,
+            "mapped_index_bytes": index_bytes if self._base_readonly else 0,
+            "delta_bytes": IndexFactory.estimate_memory(self._delta),
+            # IndexIDMap2 keeps an int64 id array plus an id → position hash map
+            "id_map_bytes": ntotal * 8 * 3,
+            "live_bitmap_bytes": int(self._live.nbytes),
+        }
+
+    def _format_memory(self) -> str:
+        usage = self.get_memory_usage()
+        return f"index={usage['index_bytes'] / 2**20:.1f}MiB ids={usage['id_map_bytes'] / 2**20:.1f}MiB"
 
     def get_collection_info(self) -> Dict[str, Any]:
         """Get information about the collection."""
+        index_kind = IndexFactory.kind_of(self.index)
+        storage_type = IndexFactory.storage_of(self.index)
         return {
             "name": self.collection_name,
             "document_count": self.get_document_count(),
             "dimension": self.dimension,
             "persist_directory": self.persist_directory,
-            "index_type": type(self.index).__name__ if self.index else None,
+            "index_type": type(IndexFactory.unwrap(self.index)).__name__ if self.index else None,
+            "index_mode": self.index_type.value,
+            "index_kind": index_kind.value if index_kind else None,
+            "storage_mode": self.storage_type.value,
+            "storage_type": storage_type.value if storage_type else None,
+            "rerank_factor": self.rerank_factor if self._keep_exact else 0,
+            "tombstones": len(self._tombstones),
+            "lexical_documents": self._lexical.num_docs,
+            "mmap": self._base_readonly,
+            "snapshot_version": self._snapshot_version,
+            "version": self._seq,
+            "memory": self.get_memory_usage(),
+            # Deleted chunks' text and vectors stay in the chunk files
+            "chunk_store": self._chunks.usage(),
         }
\ No newline at end of file
@@ -0,0 +1,140 @@
+# src/ai_services/write_ahead_log.py
+
+import os
+import pickle
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+# Each record is a little-endian uint32 payload length followed by a pickle
+_HEADER = struct.Struct("<I")
+
+
+class WriteAheadLog:
+    """
+    Append-only record log for vector store mutations.
+
+    Records are appended to `<path>`; compaction rotates the live file to
+    `<path>.compacting` so writers never wait on the snapshot being written.
+    Replay yields the rotated segment first, then the live one.
+
+    Other processes follow the log with `tail`, using an (inode, offset)
+    cursor that survives rotation of the segment it points into.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.rotated_path = f"{path}.compacting"
+        self.fsync = fsync
+
+    def append(self, record: Dict[str, Any]) -> Tuple[int, int]:
+        """
+        Append a record and return the `tail` cursor just past it.
+        """
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self.path, "ab") as f:
+            f.write(_HEADER.pack(len(payload)))
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            return os.fstat(f.fileno()).st_ino, f.tell()
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every record from the rotated and live segments, in order.
+        A truncated trailing record (crash mid-append) is skipped.
+        """
+        for path in (self.rotated_path, self.path):
+            if not os.path.exists(path):
+                continue
+            for record, _ in self._read_segment(path):
+                yield record
+
+    def tail(
+        self,
+        cursor: Optional[Tuple[int, int]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Tuple[int, int]]:
+        """
+        Return the records appended after `cursor` and the cursor past them.
+
+        With no cursor, both segments are read from the start (like replay).
+        A cursor into a segment that has since been rotated continues there
+        and then reads the live segment; a cursor into a discarded segment
+        restarts at the beginning of the live one.
+        """
+        records: List[Dict[str, Any]] = []
+        inode, offset = cursor if cursor is not None else (None, 0)
+
+        rotated_inode = self._inode(self.rotated_path)
+        if rotated_inode is not None and (cursor is None or inode == rotated_inode):
+            start = offset if inode == rotated_inode else 0
+            records.extend(record for record, _ in self._read_segment(self.rotated_path, start))
+            inode = None
+
+        live_inode = self._inode(self.path)
+        if live_inode is None:
+            return records, (0, 0)
+        end = offset if inode == live_inode else 0
+        for record, end in self._read_segment(self.path, end):
+            records.append(record)
+        return records, (live_inode, end)
+
+    def rotate(self) -> bool:
+        """
+        Move the live segment aside for compaction.
+        Returns False when there is nothing to compact.
+        """
+        if os.path.exists(self.rotated_path):
+            # A previous compaction did not finish; its records are still pending
+            return True
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return False
+        os.replace(self.path, self.rotated_path)
+        return True
+
+    def discard_rotated(self) -> None:
+        """
+        Drop the rotated segment once its records are in the base snapshot.
+        """
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def size(self) -> int:
+        total = 0
+        for path in (self.rotated_path, self.path):
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+        return total
+
+    def clear(self) -> None:
+        for path in (self.rotated_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _inode(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _read_segment(path: str, offset: int = 0) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """Yield (record, offset just past it) from `offset` to the last complete record."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                header = f.read(_HEADER.size)
+                if not header:
+                    return
+                if len(header) < _HEADER.size:
+                    logger.warning("Ignoring truncated WAL header in {}", path)
+                    return
+                (length,) = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    logger.warning("Ignoring truncated WAL record in {}", path)
+                    return
+                yield pickle.loads(payload), f.tell()
@@ -16,6 +16,8 @@ from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
+from src.ai_services.http_client import close_shared_http_client
+from src.ai_services.service_registry import RAGServiceRegistry
 from src.configs import DatabaseConfig
 from src.entities import api_router
 from src.utils import user_context_dependency
@@ -63,12 +65,17 @@ async def lifespan(app: FastAPI):
     try:
         logger.info("Starting up the application...")
         await run_migrations()
+        app.state.rag_registry = RAGServiceRegistry()
+        app.state.rag_registry.get(os.getenv("VECTOR_COLLECTION_NAME", "documents"))
         logger.info("Application started successfully...")
         yield
     except Exception as e:
         logger.exception(e)
         raise
     finally:
+        if hasattr(app.state, "rag_registry"):
+            app.state.rag_registry.close()
+        await close_shared_http_client()
         logger.info("Application shutdown complete.")
 
 
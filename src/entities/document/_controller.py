@@ -1,5 +1,6 @@
-from fastapi import Body, UploadFile, File, BackgroundTasks, HTTPException, Request
-from fastapi.responses import Response
+from fastapi import Body, Depends, UploadFile, File, BackgroundTasks, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+import json
 import os
 import shutil
 from loguru import logger
@@ -10,7 +11,14 @@ from ._schema import DocumentSchema, DocumentCreateSchema, DocumentUpdateSchema,
 from ._service import DocumentService
 from src.utils.document_processing_service import DocumentProcessingService
 from src.ai_services.rag_service import RAGService
+from src.ai_services.chunk_store import MetadataFilter
+from src.ai_services.http_client import metrics as http_client_metrics
+from src.ai_services.llm_usage import metrics as llm_usage_metrics
+from src.ai_services.model_factory import ModelFactory
+from src.ai_services import rate_limiter
+from src.utils._rag_ctx import rag_service_dependency
 from datetime import datetime
+from typing import List, Optional
 from  dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
@@ -33,6 +41,36 @@ class DocumentController(BaseController):
             methods=["GET"],
             tags=["Stats"]
         )
+        self.router.add_api_route(
+            "/stats/embedding_cache/",
+            self.get_embedding_cache_stats,
+            methods=["GET"],
+            tags=["Stats"]
+        )
+        self.router.add_api_route(
+            "/stats/answer_cache/",
+            self.get_answer_cache_stats,
+            methods=["GET"],
+            tags=["Stats"]
+        )
+        self.router.add_api_route(
+            "/stats/http_client/",
+            self.get_http_client_stats,
+            methods=["GET"],
+            tags=["Stats"]
+        )
+        self.router.add_api_route(
+            "/stats/llm_usage/",
+            self.get_llm_usage_stats,
+            methods=["GET"],
+            tags=["Stats"]
+        )
+        self.router.add_api_route(
+            "/stats/rate_limiter/",
+            self.get_rate_limiter_stats,
+            methods=["GET"],
+            tags=["Stats"]
+        )
         self.router.add_api_route(
             "/{id}/status",
             self.get_status,
@@ -69,6 +107,18 @@ class DocumentController(BaseController):
             methods=["POST"],
             tags=["Documents", "Query"]
         )
+        self.router.add_api_route(
+            "/query/stream/",
+            self.query_documents_stream,
+            methods=["POST"],
+            tags=["Documents", "Query"]
+        )
+        self.router.add_api_route(
+            "/query/batch/",
+            self.query_documents_batch,
+            methods=["POST"],
+            tags=["Documents", "Query"]
+        )
     
     async def create(self, data: DocumentCreateSchema = Body(...)):
         """Create a new document record."""
@@ -77,11 +127,25 @@ class DocumentController(BaseController):
     async def patch(self, id: int, data: DocumentUpdateSchema = Body(...)):
         """Update document."""
         return await super().patch(id, data.model_dump(exclude_unset=True))
+
+    async def delete(
+        self,
+        id: int,
+        rag_service: RAGService = Depends(rag_service_dependency),
+    ):
+        """Delete a document along with its indexed chunks."""
+        try:
+            rag_service.delete_document(id)
+        except Exception as e:
+            logger.error(f"Failed to remove vectors for document {id}: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to remove document vectors: {str(e)}")
+        return await super().delete(id)
     
     async def upload(
         self, 
         background_tasks: BackgroundTasks,
-        file: UploadFile = File(...)
+        file: UploadFile = File(...),
+        rag_service: RAGService = Depends(rag_service_dependency),
     ):
         """Upload a document file and trigger background processing."""
         # Validate file type
@@ -113,7 +177,8 @@ class DocumentController(BaseController):
             # Add background task to process document
             background_tasks.add_task(
                 self._process_document_background,
-                document_id=document.id
+                document_id=document.id,
+                rag_service=rag_service,
             )
             
             return Response(status_code=201, content=f"Document uploaded successfully. Processing started in background.")
@@ -122,13 +187,9 @@ class DocumentController(BaseController):
             logger.error(f"Upload failed: {e}")
             return Response(status_code=500, content=f"Upload failed: {str(e)}")
     
-    async def _process_document_background(self, document_id: int):
+    async def _process_document_background(self, document_id: int, rag_service: RAGService):
         """Background task to process document."""
         try:
-            # Initialize services
-            rag_service = RAGService(
-                collection_name=os.getenv("VECTOR_COLLECTION_NAME", "documents")
-            )
             processing_service = DocumentProcessingService(rag_service)
             
             # Process document
@@ -142,7 +203,12 @@ class DocumentController(BaseController):
         except Exception as e:
             logger.error(f"Background processing error for document {document_id}: {e}")
     
-    async def trigger_processing(self, id: int, background_tasks: BackgroundTasks):
+    async def trigger_processing(
+        self,
+        id: int,
+        background_tasks: BackgroundTasks,
+        rag_service: RAGService = Depends(rag_service_dependency),
+    ):
         """Manually trigger processing for a document."""
         document = await self.service.get(id)
         
@@ -155,25 +221,48 @@ class DocumentController(BaseController):
         # Add to background tasks
         background_tasks.add_task(
             self._process_document_background,
-            document_id=id
+            document_id=id,
+            rag_service=rag_service,
         )
         return Response(status_code=200, content="Document processing triggered in background")
 
-    async def query_documents(self, question: str = Body(..., embed=True)):
+    async def query_documents(
+        self,
+        question: str = Body(..., embed=True),
+        document_ids: Optional[List[int]] = Body(None),
+        filenames: Optional[List[str]] = Body(None),
+        document_types: Optional[List[str]] = Body(None),
+        mmr: Optional[bool] = Body(None),
+        fetch_k: Optional[int] = Body(None, ge=1),
+        mmr_lambda: Optional[float] = Body(None, ge=0.0, le=1.0),
+        rag_service: RAGService = Depends(rag_service_dependency),
+    ):
         """
         Query the RAG system with a question.
         
         Args:
             question: The question to ask
+            document_ids: Only use chunks of these documents
+            filenames: Only use chunks of files with these names
+            document_types: Only use chunks of these file types (pdf, txt, ...)
+            mmr: Drop near-duplicate chunks with maximal marginal relevance
+            fetch_k: Candidates MMR selects the final chunks from
+            mmr_lambda: MMR relevance vs. diversity weight (1.0 = relevance only)
         """
+        metadata_filter = MetadataFilter(
+            document_ids=document_ids,
+            filenames=filenames,
+            document_types=document_types,
+        )
         try:
-            # Initialize RAG service
-            rag_service = RAGService(
-                collection_name=os.getenv("VECTOR_COLLECTION_NAME", "documents")
-            )
-            
             # Query
-            result = await rag_service.query(question)
+            result = await rag_service.query(
+                question,
+                metadata_filter=metadata_filter,
+                mmr=mmr,
+                fetch_k=fetch_k,
+                mmr_lambda=mmr_lambda,
+            )
 
             return {
                 "status": "success",
@@ -186,6 +275,118 @@ class DocumentController(BaseController):
             logger.error(f"Query failed: {e}")
             return Response(status_code=500, content=f"Query failed: {str(e)}")
 
+    async def query_documents_stream(
+        self,
+        request: Request,
+        question: str = Body(..., embed=True),
+        document_ids: Optional[List[int]] = Body(None),
+        filenames: Optional[List[str]] = Body(None),
+        document_types: Optional[List[str]] = Body(None),
+        mmr: Optional[bool] = Body(None),
+        fetch_k: Optional[int] = Body(None, ge=1),
+        mmr_lambda: Optional[float] = Body(None, ge=0.0, le=1.0),
+        rag_service: RAGService = Depends(rag_service_dependency),
+    ):
+        """
+        Query the RAG system and stream the answer as Server-Sent Events.
+
+        Emits a `retrieval` event with the chunks used, `token` events with
+        answer text as it is generated, then `done` (or `error`). The LLM
+        request is cancelled when the client disconnects.
+
+        Args: same as /query/.
+        """
+        metadata_filter = MetadataFilter(
+            document_ids=document_ids,
+            filenames=filenames,
+            document_types=document_types,
+        )
+        stream = rag_service.query_stream(
+            question,
+            metadata_filter=metadata_filter,
+            mmr=mmr,
+            fetch_k=fetch_k,
+            mmr_lambda=mmr_lambda,
+        )
+
+        async def events():
+            try:
+                async for event in stream:
+                    if await request.is_disconnected():
+                        logger.info("Client disconnected, cancelling streamed query")
+                        break
+                    yield self._sse(event["event"], event["data"])
+            except Exception as e:
+                logger.error(f"Streamed query failed: {e}")
+                yield self._sse("error", {"detail": f"Query failed: {str(e)}"})
+            finally:
+                # Closes the provider stream if we stopped early
+                await stream.aclose()
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @staticmethod
+    def _sse(event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    async def query_documents_batch(
+        self,
+        questions: List[str] = Body(..., embed=True),
+        document_ids: Optional[List[int]] = Body(None),
+        filenames: Optional[List[str]] = Body(None),
+        document_types: Optional[List[str]] = Body(None),
+        mmr: Optional[bool] = Body(None),
+        fetch_k: Optional[int] = Body(None, ge=1),
+        mmr_lambda: Optional[float] = Body(None, ge=0.0, le=1.0),
+        rag_service: RAGService = Depends(rag_service_dependency),
+    ):
+        """
+        Query the RAG system with several questions at once.
+
+        Args:
+            questions: The questions to ask; retrieval for all of them is batched
+            document_ids: Only use chunks of these documents
+            filenames: Only use chunks of files with these names
+            document_types: Only use chunks of these file types (pdf, txt, ...)
+            mmr: Drop near-duplicate chunks with maximal marginal relevance
+            fetch_k: Candidates MMR selects the final chunks from
+            mmr_lambda: MMR relevance vs. diversity weight (1.0 = relevance only)
+        """
+        if not questions:
+            raise HTTPException(status_code=400, detail="At least one question is required")
+
+        metadata_filter = MetadataFilter(
+            document_ids=document_ids,
+            filenames=filenames,
+            document_types=document_types,
+        )
+        try:
+            # Query
+            results = await rag_service.query_batch(
+                questions,
+                metadata_filter=metadata_filter,
+                mmr=mmr,
+                fetch_k=fetch_k,
+                mmr_lambda=mmr_lambda,
+            )
+
+            return {
+                "status": "success",
+                "results": [
+                    {"question": question, "answer": result.answer}
+                    for question, result in zip(questions, results)
+                ],
+                "timestamp": datetime.now().isoformat()
+            }
+
+        except Exception as e:
+            logger.error(f"Batch query failed: {e}")
+            return Response(status_code=500, content=f"Batch query failed: {str(e)}")
+
     async def get_status(self, id: int):
         """Get document processing status."""
         status = await self.service.get_document_status(id)
@@ -198,6 +399,34 @@ class DocumentController(BaseController):
         stats = await self.service.get_document_stats()
         return stats
 
+    async def get_embedding_cache_stats(
+        self,
+        rag_service: RAGService = Depends(rag_service_dependency),
+    ):
+        """Get embedding cache hit/miss counters for this worker."""
+        return rag_service.embedding_service.cache_stats()
+
+    async def get_answer_cache_stats(
+        self,
+        rag_service: RAGService = Depends(rag_service_dependency),
+    ):
+        """Get semantic answer cache counters for this worker."""
+        if rag_service.answer_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **rag_service.answer_cache.stats()}
+
+    async def get_http_client_stats(self):
+        """Get LLM connection reuse counters and the number of cached agents for this worker."""
+        return {**http_client_metrics.stats(), "cached_agents": ModelFactory.cached_agent_count()}
+
+    async def get_llm_usage_stats(self):
+        """Get provider token usage, including prompt-cache hits, for this worker."""
+        return llm_usage_metrics.stats()
+
+    async def get_rate_limiter_stats(self):
+        """Get concurrency limit, queue depth, wait times and throttling per LLM model."""
+        return rate_limiter.stats()
+
     async def get_filter_by_status(self, request: Request):
         """
         Get documents filtered by status using query parameter.
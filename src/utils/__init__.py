@@ -1,3 +1,4 @@
+from ._rag_ctx import *
 from ._safe_sync import *
 from ._user_ctx import *
 from .document_parser import *
@@ -0,0 +1,11 @@
+import os
+
+from fastapi import Request
+
+from src.ai_services.rag_service import RAGService
+
+
+def rag_service_dependency(request: Request) -> RAGService:
+    """Return the warm RAG service for the configured collection."""
+    registry = request.app.state.rag_registry
+    return registry.get(os.getenv("VECTOR_COLLECTION_NAME", "documents"))
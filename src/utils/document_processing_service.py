@@ -75,6 +75,7 @@ class DocumentProcessingService:
                 metadatas.append({
                     "document_id": document_id,
                     "filename": document.filename,
+                    "document_type": document.document_type,
                     "chunk_index": i,
                     "source": document.file_path,
                     **parsed_content.get("metadata", {})
@@ -83,9 +84,11 @@ class DocumentProcessingService:
             #Update document metadata in database
             await self.document_service.update_document_metadata(document_id, metadatas)
             
-            # Index in RAG service
+            # Index in RAG service, replacing chunks from a previous run so
+            # reprocessing doesn't duplicate them
             logger.info(f"Indexing {len(chunks)} chunks in RAG for document: {document.filename}")
-            await self.rag_service.index_documents(
+            await self.rag_service.reindex_document(
+                document_id,
                 documents=chunks,
                 metadatas=metadatas
             )
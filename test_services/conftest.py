@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from src.ai_services.config import AIModelProvider, AISettings
+
+
+@pytest.fixture
+def store_path(tmp_path, monkeypatch):
+    """Point vector stores at a throwaway directory."""
+    monkeypatch.setattr(AISettings, "VECTOR_STORE_PATH", str(tmp_path))
+    monkeypatch.setattr(AISettings, "VECTOR_WAL_FSYNC", False)
+    return tmp_path
+
+
+@pytest.fixture
+def embeddings():
+    """Deterministic random unit-ish vectors: embeddings(n, dimension=8)."""
+    rng = np.random.default_rng(0)
+
+    def make(n, dimension=8):
+        return rng.standard_normal((n, dimension)).astype(np.float32).tolist()
+
+    return make
+
+
+@pytest.fixture
+def fake_provider(store_path, monkeypatch):
+    """Offline stand-in models with no simulated latency or errors."""
+    monkeypatch.setattr(AISettings, "FAKE_EMBEDDING_LATENCY_MS", 0)
+    monkeypatch.setattr(AISettings, "FAKE_LLM_LATENCY_MS", 0)
+    monkeypatch.setattr(AISettings, "FAKE_LLM_TOKENS_PER_SEC", 1e6)
+    monkeypatch.setattr(AISettings, "FAKE_LLM_ERROR_RATE", 0.0)
+    return AIModelProvider.FAKE
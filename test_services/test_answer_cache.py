@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from src.ai_services.answer_cache import SemanticAnswerCache
+from src.ai_services.rag_service import RAGService
+
+
+def test_similar_questions_share_an_answer():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.put([1.0, 0.0], "ctx", 1, "answer")
+
+    assert cache.get([1.0, 0.05], "ctx", 1) == "answer"
+    assert cache.get([1.0, 0.5], "ctx", 1) is None
+    assert cache.get([1.0, 0.0], "other options", 1) is None
+
+
+def test_a_new_collection_version_drops_every_answer():
+    cache = SemanticAnswerCache()
+    cache.put([1.0, 0.0], "ctx", 1, "answer")
+    assert cache.get([1.0, 0.0], "ctx", 2) is None
+    assert cache.stats()["invalidations"] == 1
+
+    # Generated from the collection before the change: not stored
+    cache.put([1.0, 0.0], "ctx", 1, "stale")
+    assert cache.get([1.0, 0.0], "ctx", 2) is None
+
+
+def test_oldest_answers_are_evicted():
+    cache = SemanticAnswerCache(max_size=2)
+    for i, vector in enumerate(([1.0, 0.0], [0.0, 1.0], [-1.0, 0.0])):
+        cache.put(vector, "ctx", 1, i)
+    assert cache.get([1.0, 0.0], "ctx", 1) is None
+    assert cache.get([-1.0, 0.0], "ctx", 1) == 2
+
+
+@pytest.fixture
+def rag(fake_provider):
+    service = RAGService("answers", provider=fake_provider)
+    asyncio.run(service.index_documents(["Annual leave is 25 days.", "Expenses need receipts."]))
+    return service
+
+
+def test_compaction_keeps_cached_answers(rag):
+    first = asyncio.run(rag.query("How many days of annual leave?"))
+    rag.vector_store.compact()
+    assert asyncio.run(rag.query("How many days of annual leave?")) == first
+    assert rag.answer_cache.stats()["hits"] == 1
+
+
+def test_writes_invalidate_cached_answers(rag):
+    asyncio.run(rag.query("How many days of annual leave?"))
+    version = rag.vector_store.version
+
+    rag.vector_store.delete_collection()
+    assert rag.vector_store.version > version
+    asyncio.run(rag.query("How many days of annual leave?"))
+    assert rag.answer_cache.stats()["hits"] == 0
+
+    version = rag.vector_store.version
+    asyncio.run(rag.index_documents(["Annual leave is 30 days.", "Expenses need receipts."]))
+    assert rag.vector_store.version > version
+    asyncio.run(rag.query("How many days of annual leave?"))
+    assert rag.answer_cache.stats()["hits"] == 0
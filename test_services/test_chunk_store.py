@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.ai_services.chunk_store import ChunkStore
+
+
+def test_reads_follow_appends_from_another_instance(tmp_path):
+    writer = ChunkStore(str(tmp_path), "chunks", fsync=False)
+    reader = ChunkStore(str(tmp_path), "chunks", fsync=False)
+    first = writer.append(["a"], ["first"], [{}])
+    assert reader.get(first)[0].text == "first"
+
+    second = writer.append(["b"], ["second"], [{}])
+    assert [doc.text for doc in reader.get(np.concatenate([first, second]))] == ["first", "second"]
+
+
+def test_reads_follow_a_clear_from_another_instance(tmp_path):
+    writer = ChunkStore(str(tmp_path), "chunks", fsync=False)
+    reader = ChunkStore(str(tmp_path), "chunks", fsync=False)
+    vids = writer.append(["a"], ["old text, longer than the new one"], [{}])
+    writer.write_vectors(vids, np.ones((1, 4), dtype=np.float32))
+    assert reader.get(vids)[0].text.startswith("old")
+    assert reader.get_vectors(vids, 4).all()
+
+    # Same vid, recreated (shorter) files
+    writer.clear()
+    vids = writer.append(["b"], ["NEW"], [{}])
+    writer.write_vectors(vids, np.full((1, 4), 2, dtype=np.float32))
+    assert reader.get(vids)[0].text == "NEW"
+    assert (reader.get_vectors(vids, 4) == 2).all()
+
+
+def test_usage_reports_dead_text(tmp_path):
+    store = ChunkStore(str(tmp_path), "chunks", fsync=False)
+    vids = store.append(["a", "b"], ["1234", "56"], [{}, {}])
+    store.delete(vids[:1])
+
+    usage = store.usage()
+    assert usage["text_bytes"] == 6
+    assert usage["dead_text_bytes"] == 4
+    assert usage["dead_chunks"] == 1
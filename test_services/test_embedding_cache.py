@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import numpy as np
+
+from src.ai_services.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from src.ai_services.embedding_factory import EmbeddingFactory
+
+
+def test_cached_vectors_are_keyed_by_provider_model_and_text(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many("fake", "m1", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+
+    hits = cache.get_many("fake", "m1", ["b", "c", "a"])
+    np.testing.assert_array_equal(hits[0], [3.0, 4.0])
+    assert hits[1] is None
+    np.testing.assert_array_equal(hits[2], [1.0, 2.0])
+    assert cache.get_many("fake", "m2", ["a"]) == [None]
+
+    # Shared through the file by every process and collection
+    reopened = EmbeddingCache(str(tmp_path))
+    np.testing.assert_array_equal(reopened.get_many("fake", "m1", ["a"])[0], [1.0, 2.0])
+    assert cache.stats()["hit_rate"] == 2 / 4
+
+
+def test_only_changed_chunks_are_embedded_again(fake_provider, monkeypatch):
+    embedder = EmbeddingFactory(fake_provider)
+    embedded = []
+    embed = embedder._embed
+
+    async def counting(texts, input_type):
+        embedded.extend(texts)
+        return await embed(texts, input_type)
+
+    monkeypatch.setattr(embedder, "_embed", counting)
+    first = asyncio.run(embedder.embed_documents(["one", "two", "one"]))
+    assert sorted(embedded) == ["one", "two"]
+    assert first[0] == first[2]
+
+    embedded.clear()
+    second = asyncio.run(embedder.embed_documents(["one", "three"]))
+    assert embedded == ["three"]
+    np.testing.assert_allclose(second[0], first[0], rtol=1e-6)
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryEmbeddingCache(max_size=2)
+    cache.put(("a",), [1.0])
+    cache.put(("b",), [2.0])
+    assert cache.get(("a",)) == [1.0]
+    cache.put(("c",), [3.0])
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == [1.0]
+    assert cache.get(("c",)) == [3.0]
+
+
+def test_query_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = QueryEmbeddingCache(ttl=60)
+    cache.put(("a",), [1.0])
+    now[0] += 59
+    assert cache.get(("a",)) == [1.0]
+    now[0] += 2
+    assert cache.get(("a",)) is None
+
+
+def test_query_normalization_ignores_case_and_spacing():
+    assert QueryEmbeddingCache.normalize("  What IS\tthe   leave policy? ") == "what is the leave policy?"
+
+
+def test_concurrent_misses_share_one_embed_call():
+    cache = QueryEmbeddingCache()
+    calls = []
+
+    async def embed():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return [1.0, 2.0]
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_embed(("q",), embed) for _ in range(5)))
+
+    assert asyncio.run(run()) == [[1.0, 2.0]] * 5
+    assert len(calls) == 1
+    assert cache.coalesced == 4
+    assert cache.get(("q",)) == [1.0, 2.0]
+
+
+def test_a_failed_embed_is_not_cached():
+    cache = QueryEmbeddingCache()
+
+    async def fail():
+        raise RuntimeError("provider down")
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_embed(("q",), fail) for _ in range(3)), return_exceptions=True
+        )
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+    assert cache.get(("q",)) is None
@@ -0,0 +1,52 @@
+import numpy as np
+
+from src.ai_services.lexical_index import BM25Index
+from src.ai_services.rag_service import RAGService
+
+TEXTS = [
+    "Annual leave is accrued monthly under clause 4.2",
+    "Remote work requires manager approval",
+    "Clause 7.1 covers expense reimbursement for travel",
+    "Travel bookings go through the travel desk",
+]
+
+
+def test_exact_terms_rank_first():
+    index = BM25Index()
+    index.add(range(len(TEXTS)), TEXTS)
+    scores, vids = index.search("clause 7.1 reimbursement", 4)
+    assert vids[0] == 2
+    assert list(scores) == sorted(scores, reverse=True)
+    assert len(index.search("unrelated words", 4)[1]) == 0
+
+
+def test_removed_and_disallowed_chunks_are_skipped():
+    index = BM25Index()
+    index.add(range(len(TEXTS)), TEXTS)
+    index.remove([3])
+    assert set(index.search("travel", 4)[1]) == {2}
+    assert index.num_docs == 3
+
+    allowed = np.zeros(len(TEXTS), dtype=bool)
+    allowed[1] = True
+    assert len(index.search("travel", 4, allowed)[1]) == 0
+
+
+def test_state_round_trip_matches_pending_buffers():
+    index = BM25Index()
+    index.add(range(len(TEXTS)), TEXTS)
+    restored = BM25Index.from_state(index.state())
+    for query in ("clause", "travel desk", "manager approval"):
+        expected, actual = index.search(query, 4), restored.search(query, 4)
+        assert list(expected[1]) == list(actual[1])
+        np.testing.assert_allclose(expected[0], actual[0], rtol=1e-6)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    vector = [{"id": "a", "score": 0.9}, {"id": "b", "score": 0.8}]
+    lexical = [{"id": "b", "score": 7.0}, {"id": "c", "score": 3.0}]
+    fused = RAGService.reciprocal_rank_fusion(vector, lexical, 3, rrf_k=60)
+    assert [result["id"] for result in fused] == ["b", "a", "c"]
+    assert fused[0]["vector_score"] == 0.8
+    assert fused[0]["lexical_score"] == 7.0
+    assert fused[1]["lexical_score"] is None
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from src.ai_services.embedding_factory import EmbeddingFactory
+from src.ai_services.micro_batcher import MicroBatcher
+
+
+def run_concurrently(batcher, items):
+    async def run():
+        return await asyncio.gather(
+            *(batcher.submit(item) for item in items), return_exceptions=True
+        )
+
+    return asyncio.run(run())
+
+
+def test_concurrent_calls_share_a_batch():
+    batches = []
+
+    async def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=32, max_wait=0.01)
+    assert run_concurrently(batcher, range(5)) == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+
+def test_full_batches_are_sent_without_waiting():
+    batches = []
+
+    async def echo(items):
+        batches.append(len(items))
+        return list(items)
+
+    batcher = MicroBatcher(echo, max_batch_size=4, max_wait=60)
+    assert run_concurrently(batcher, range(8)) == list(range(8))
+    assert batches == [4, 4]
+
+
+@pytest.mark.parametrize("handler_result", ["raise", "short"])
+def test_a_failed_batch_fails_every_caller(handler_result):
+    async def broken(items):
+        if handler_result == "raise":
+            raise RuntimeError("provider down")
+        return items[:-1]
+
+    batcher = MicroBatcher(broken, max_batch_size=32, max_wait=0.001)
+    results = run_concurrently(batcher, range(3))
+    assert all(isinstance(result, (RuntimeError, ValueError)) for result in results)
+
+
+def test_a_cancelled_caller_does_not_break_the_batch():
+    async def slow(items):
+        await asyncio.sleep(0.02)
+        return list(items)
+
+    async def run():
+        batcher = MicroBatcher(slow, max_batch_size=32, max_wait=0.001)
+        cancelled = asyncio.ensure_future(batcher.submit("a"))
+        kept = asyncio.ensure_future(batcher.submit("b"))
+        await asyncio.sleep(0.005)
+        cancelled.cancel()
+        return await kept
+
+    assert asyncio.run(run()) == "b"
+
+
+def test_concurrent_query_embeddings_are_batched(fake_provider):
+    embedder = EmbeddingFactory(fake_provider)
+    questions = [f"question {i}" for i in range(6)]
+
+    async def run():
+        return await asyncio.gather(*(embedder.embed_query(question) for question in questions))
+
+    vectors = asyncio.run(run())
+    assert embedder.query_batcher.batches == 1
+    assert vectors[2] == asyncio.run(embedder._embed(["question 2"], "query"))[0]
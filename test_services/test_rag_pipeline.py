@@ -0,0 +1,134 @@
+import asyncio
+from contextlib import aclosing
+
+import numpy as np
+import pytest
+
+from src.ai_services.agent_manager import AgentManager
+from src.ai_services.config import AISettings
+from src.ai_services.rag_service import AnswerOutput, RAGService
+
+
+@pytest.fixture
+def rag(fake_provider):
+    return RAGService("pipeline", provider=fake_provider)
+
+
+def chunk_texts(rag, document_id):
+    docs = rag.vector_store._chunks.get(rag.vector_store.document_vids(document_id))
+    return sorted(doc.text for doc in docs)
+
+
+def test_reindex_replaces_a_documents_chunks(rag):
+    asyncio.run(rag.index_documents(["old one", "old two"], [{"document_id": 1}] * 2))
+    asyncio.run(rag.index_documents(["other"], [{"document_id": 2}]))
+
+    removed = asyncio.run(rag.reindex_document(1, ["new one"], [{"document_id": 1}]))
+    assert removed == 2
+    assert chunk_texts(rag, 1) == ["new one"]
+    assert chunk_texts(rag, 2) == ["other"]
+    assert rag.vector_store.get_document_count() == 2
+
+
+def test_failed_reindex_keeps_the_previous_chunks(rag, monkeypatch):
+    asyncio.run(rag.index_documents(["old one", "old two"], [{"document_id": 1}] * 2))
+
+    async def unavailable(texts):
+        raise RuntimeError("embedding provider down")
+
+    monkeypatch.setattr(rag.embedding_service, "embed_documents", unavailable)
+    with pytest.raises(RuntimeError):
+        asyncio.run(rag.reindex_document(1, ["new one"], [{"document_id": 1}]))
+    assert chunk_texts(rag, 1) == ["old one", "old two"]
+
+
+def test_mmr_skips_near_duplicates():
+    query = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    candidates = np.array(
+        [[0.99, 0.14, 0.0], [0.98, 0.2, 0.0], [0.8, 0.0, 0.6]], dtype=np.float32
+    )
+    candidates /= np.linalg.norm(candidates, axis=1, keepdims=True)
+
+    assert RAGService.maximal_marginal_relevance(query, candidates, 2, lambda_mult=1.0) == [0, 1]
+    assert RAGService.maximal_marginal_relevance(query, candidates, 2, lambda_mult=0.5) == [0, 2]
+    assert RAGService.maximal_marginal_relevance(query, candidates, 5) == [0, 2, 1]
+    assert RAGService.maximal_marginal_relevance(query, candidates[:0], 2) == []
+
+
+def test_mmr_retrieval_diversifies_the_pool(rag, monkeypatch):
+    monkeypatch.setattr(AISettings, "RAG_HYBRID_SEARCH", False)
+    texts = ["leave policy, part one", "leave policy, part one (overlap)", "expense policy"]
+    vectors = np.array([[1.0, 0.1, 0.0], [1.0, 0.12, 0.0], [0.7, 0.0, 0.7]], dtype=np.float32)
+    rag.vector_store.add_documents(texts, vectors.tolist(), [{} for _ in texts])
+    query = [1.0, 0.0, 0.0]
+
+    def retrieve(mmr):
+        results = rag._retrieve("policy", query, 2, None, mmr, 3, 0.5)
+        return [result["document"] for result in results]
+
+    assert retrieve(False) == texts[:2]
+    assert retrieve(True) == [texts[0], texts[2]]
+
+
+def collect(stream, limit=None):
+    async def run():
+        events = []
+        async with aclosing(stream) as events_stream:
+            async for event in events_stream:
+                events.append(event)
+                if limit is not None and len(events) == limit:
+                    break
+        return events
+
+    return asyncio.run(run())
+
+
+def test_streamed_answer_is_cached_once_complete(rag):
+    asyncio.run(rag.index_documents(["Annual leave is 25 days."]))
+    events = collect(rag.query_stream("How many days of annual leave?"))
+
+    assert events[0]["event"] == "retrieval"
+    assert events[-1]["event"] == "done"
+    tokens = "".join(event["data"]["text"] for event in events if event["event"] == "token")
+    answer = events[-1]["data"]["answer"]
+    assert answer and tokens == answer
+
+    cached = collect(rag.query_stream("How many days of annual leave?"))
+    assert cached[0]["data"]["cached"] is True
+    assert cached[-1]["data"]["answer"] == answer
+
+
+def test_an_interrupted_stream_is_not_cached(rag):
+    asyncio.run(rag.index_documents(["Annual leave is 25 days."]))
+    events = collect(rag.query_stream("How many days of annual leave?"), limit=2)
+    assert events[-1]["event"] == "token"
+    assert rag.answer_cache.stats()["size"] == 0
+
+
+def test_done_carries_the_validated_answer(rag, monkeypatch):
+    asyncio.run(rag.index_documents(["Annual leave is 25 days."]))
+
+    async def revised(agent, *args, **kwargs):
+        yield AnswerOutput(answer="25 days of")
+        yield AnswerOutput(answer="25 days.")
+
+    monkeypatch.setattr(AgentManager, "stream_with_backoff", revised)
+    events = collect(rag.query_stream("How many days of annual leave?"))
+    assert events[-1]["data"]["answer"] == "25 days."
+    assert rag.answer_cache.get(
+        asyncio.run(rag.embedding_service.embed_query("How many days of annual leave?")),
+        rag._answer_context(5, None, None, None, None),
+        rag.vector_store.version,
+    ).answer == "25 days."
+
+
+def test_an_empty_answer_is_not_cached(rag, monkeypatch):
+    asyncio.run(rag.index_documents(["Annual leave is 25 days."]))
+
+    async def empty(agent, *args, **kwargs):
+        yield AnswerOutput(answer="")
+
+    monkeypatch.setattr(AgentManager, "stream_with_backoff", empty)
+    events = collect(rag.query_stream("How many days of annual leave?"))
+    assert events[-1]["data"]["answer"] == ""
+    assert rag.answer_cache.stats()["size"] == 0
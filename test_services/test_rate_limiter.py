@@ -0,0 +1,141 @@
+import asyncio
+import email.utils
+import time
+from contextlib import aclosing
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.models.function import FunctionModel
+
+from src.ai_services.agent_manager import AgentManager
+from src.ai_services.rate_limiter import AdaptiveRateLimiter, TokenBucket, retry_after
+
+
+def throttled(headers=None, body=None, status_code=429):
+    return ModelHTTPError(status_code=status_code, model_name="m", body=body, headers=headers)
+
+
+def test_token_bucket_paces_and_refunds():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve(2) == 0
+    assert bucket.reserve(1) == pytest.approx(0.1, abs=0.01)
+    bucket.adjust(-1)
+    assert bucket.level == pytest.approx(0, abs=0.01)
+
+
+@pytest.mark.parametrize(
+    ("headers", "body", "expected"),
+    [
+        ({"retry-after-ms": "1500"}, None, 1.5),
+        ({"retry-after": "7"}, None, 7.0),
+        (None, {"error": {"details": [{"@type": "RetryInfo", "retryDelay": "23s"}]}}, 23.0),
+        ({"retry-after": "soon"}, {"error": {"details": [{"retryDelay": "2s"}]}}, 2.0),
+        ({}, {"error": "overloaded"}, None),
+    ],
+)
+def test_retry_after_hints(headers, body, expected):
+    assert retry_after(throttled(headers, body)) == expected
+
+
+def test_retry_after_http_date():
+    moment = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert retry_after(throttled({"retry-after": moment})) == pytest.approx(30, abs=2)
+
+
+def test_concurrency_is_capped_and_halved_once_per_round():
+    limiter = AdaptiveRateLimiter("test", max_concurrency=4)
+    peak = 0
+
+    async def call(fail):
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.stats()["active"])
+            await asyncio.sleep(0.01)
+            if fail:
+                raise throttled()
+
+    async def run(fail, count):
+        return await asyncio.gather(*(call(fail) for _ in range(count)), return_exceptions=True)
+
+    results = asyncio.run(run(fail=True, count=4))
+    assert peak == 4
+    assert all(isinstance(result, ModelHTTPError) for result in results)
+    # Every request of the round was throttled, but the limit is cut once
+    assert limiter.limit == 2
+    assert limiter.stats()["throttles"] == 4
+
+    asyncio.run(run(fail=False, count=2))
+    assert limiter.limit == pytest.approx(2 + 1 / 2 + 1 / 2.5)
+    assert limiter.stats()["active"] == 0
+
+
+def test_cancelled_waiter_gives_back_its_budget():
+    limiter = AdaptiveRateLimiter("test", requests_per_minute=6, tokens_per_minute=600)
+
+    async def run():
+        async with limiter.slot(tokens=100):
+            pass
+        # Out of request budget: this one is paced for ~10s
+        waiter = asyncio.ensure_future(limiter._acquire(100))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(run())
+    stats = limiter.stats()
+    assert stats["active"] == 0
+    assert stats["requests_available"] == pytest.approx(0, abs=0.01)
+    assert stats["tokens_available"] == pytest.approx(0, abs=1)
+
+
+def streaming_agent(failures):
+    attempts = []
+
+    async def stream(messages, info):
+        attempts.append(1)
+        if len(attempts) <= failures:
+            raise throttled({"retry-after-ms": "1"})
+        for word in ("one", " two", " three"):
+            yield word
+
+    model = FunctionModel(stream_function=stream, model_name=f"stream-{failures}")
+    return Agent(model), attempts
+
+
+def collect(stream, limit=None):
+    async def run():
+        outputs = []
+        async with aclosing(stream) as items:
+            async for output in items:
+                outputs.append(output)
+                if limit is not None and len(outputs) == limit:
+                    break
+        return outputs
+
+    return asyncio.run(run())
+
+
+def test_stream_is_retried_before_the_first_output():
+    agent, attempts = streaming_agent(failures=2)
+    outputs = collect(AgentManager.stream_with_backoff(agent, "question", base_delay=0.001))
+    assert len(attempts) == 3
+    assert outputs[-1] == "one two three"
+
+
+def test_stream_gives_up_after_the_retries():
+    agent, attempts = streaming_agent(failures=5)
+    with pytest.raises(RuntimeError):
+        collect(AgentManager.stream_with_backoff(agent, "question", retries=2, base_delay=0.001))
+    assert len(attempts) == 2
+
+
+def test_closing_a_stream_releases_its_slot():
+    agent, _ = streaming_agent(failures=0)
+    limiter = AgentManager._limiter(agent)
+    limiter.limit = 2.0
+    assert collect(AgentManager.stream_with_backoff(agent, "question"), limit=1)
+    assert limiter.stats()["active"] == 0
+    # A hang-up is not a success
+    assert limiter.limit == 2.0
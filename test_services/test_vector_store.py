@@ -0,0 +1,245 @@
+import os
+import pickle
+
+import faiss
+import numpy as np
+import pytest
+
+from src.ai_services.chunk_store import Document, MetadataFilter
+from src.ai_services.config import AISettings, VectorIndexType, VectorStorageType
+from src.ai_services.vector_store import FAISSVectorStore
+
+
+def add(store, texts, vectors, **metadata):
+    return store.add_documents(texts, vectors, [dict(metadata) for _ in texts])
+
+
+def top_text(store, vector):
+    return store.search(vector, top_k=1)[0]["document"]
+
+
+def test_wal_is_replayed_on_restart(store_path, embeddings):
+    vectors = embeddings(5)
+    store = FAISSVectorStore("wal")
+    add(store, [f"chunk {i}" for i in range(5)], vectors)
+    assert not os.path.exists(store.index_path)
+
+    reopened = FAISSVectorStore("wal")
+    assert reopened.get_document_count() == 5
+    assert top_text(reopened, vectors[3]) == "chunk 3"
+
+
+def test_truncated_wal_record_is_skipped(store_path, embeddings):
+    vectors = embeddings(3)
+    store = FAISSVectorStore("torn")
+    add(store, ["a", "b"], vectors[:2])
+    add(store, ["c"], vectors[2:])
+
+    # Crash in the middle of appending the last record
+    with open(store.wal_path, "r+b") as f:
+        f.truncate(os.path.getsize(store.wal_path) - 10)
+
+    reopened = FAISSVectorStore("torn")
+    assert reopened.get_document_count() == 2
+    assert top_text(reopened, vectors[1]) == "b"
+
+
+def test_compaction_folds_the_wal_into_the_snapshot(store_path, embeddings):
+    vectors = embeddings(4)
+    store = FAISSVectorStore("compact")
+    add(store, ["a", "b", "c"], vectors[:3])
+    store.compact()
+    assert os.path.exists(store.index_path)
+    assert store._wal.size() == 0
+
+    add(store, ["d"], vectors[3:])
+    reopened = FAISSVectorStore("compact")
+    assert reopened.get_document_count() == 4
+    assert top_text(reopened, vectors[0]) == "a"
+    assert top_text(reopened, vectors[3]) == "d"
+
+
+def test_interrupted_snapshot_is_rolled_back(store_path, embeddings):
+    vectors = embeddings(3)
+    store = FAISSVectorStore("rollback")
+    add(store, ["a", "b"], vectors[:2])
+    store.compact()
+    add(store, ["c"], vectors[2:])
+
+    # Crash before the id file was renamed: the old snapshot and the log win
+    for path in (f"{store.index_path}.tmp", f"{store.metadata_path}.tmp"):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+
+    reopened = FAISSVectorStore("rollback")
+    assert reopened.get_document_count() == 3
+    assert top_text(reopened, vectors[2]) == "c"
+    assert not os.path.exists(f"{store.index_path}.tmp")
+    assert not os.path.exists(f"{store.metadata_path}.tmp")
+
+
+def test_interrupted_snapshot_is_completed(store_path, embeddings):
+    vectors = embeddings(3)
+    store = FAISSVectorStore("complete")
+    add(store, ["a", "b", "c"], vectors)
+    store.compact()
+
+    # Crash between the two renames: the id file is already in place
+    os.replace(store.index_path, f"{store.index_path}.tmp")
+
+    reopened = FAISSVectorStore("complete")
+    assert reopened.get_document_count() == 3
+    assert os.path.exists(store.index_path)
+    assert not os.path.exists(f"{store.index_path}.tmp")
+
+
+def test_deleted_chunks_are_tombstoned_then_purged(store_path, embeddings, monkeypatch):
+    # Purge only when asked to
+    monkeypatch.setattr(AISettings, "VECTOR_TOMBSTONE_COMPACT_RATIO", 1.0)
+    vectors = embeddings(4)
+    store = FAISSVectorStore("tombstones")
+    ids = add(store, ["a", "b", "c", "d"], vectors)
+
+    store.delete_documents(ids[:2])
+    assert store.get_document_count() == 2
+    assert store.get_collection_info()["tombstones"] == 2
+    assert {hit["id"] for hit in store.search(vectors[0], top_k=4)} == set(ids[2:])
+
+    store.compact()
+    assert store.get_collection_info()["tombstones"] == 0
+    assert store.index.ntotal == 2
+    assert {hit["id"] for hit in store.search(vectors[0], top_k=4)} == set(ids[2:])
+
+    reopened = FAISSVectorStore("tombstones")
+    assert reopened.get_document_count() == 2
+
+
+def test_tombstones_survive_a_restart(store_path, embeddings):
+    vectors = embeddings(3)
+    store = FAISSVectorStore("restart")
+    ids = add(store, ["a", "b", "c"], vectors)
+    store.compact()
+    store.delete_documents(ids[1:2])
+
+    reopened = FAISSVectorStore("restart")
+    assert reopened.get_document_count() == 2
+    assert ids[1] not in {hit["id"] for hit in reopened.search(vectors[1], top_k=3)}
+
+
+def test_deleting_everything_drops_the_index(store_path, embeddings):
+    store = FAISSVectorStore("empty")
+    ids = add(store, ["a", "b"], embeddings(2))
+    store.delete_documents(ids)
+    assert store.index is None
+    assert store.get_document_count() == 0
+
+
+def test_delete_by_document_id(store_path, embeddings):
+    vectors = embeddings(4)
+    store = FAISSVectorStore("by_document")
+    add(store, ["a", "b"], vectors[:2], document_id=1)
+    kept = add(store, ["c", "d"], vectors[2:], document_id=2)
+
+    assert store.delete_by_document_id(1) == 2
+    assert store.delete_by_document_id(1) == 0
+    assert {hit["id"] for hit in store.search(vectors[0], top_k=4)} == set(kept)
+    assert len(store.document_vids(1)) == 0
+    assert len(store.document_vids(2)) == 2
+
+
+def test_other_instances_see_new_writes(store_path, embeddings):
+    vectors = embeddings(3)
+    writer = FAISSVectorStore("shared")
+    reader = FAISSVectorStore("shared")
+    add(writer, ["a"], vectors[:1])
+    version = reader.version
+
+    add(writer, ["b"], vectors[1:2])
+    assert reader.version != version
+    assert top_text(reader, vectors[1]) == "b"
+
+    # A compaction published elsewhere is reloaded
+    writer.compact()
+    add(writer, ["c"], vectors[2:])
+    assert top_text(reader, vectors[2]) == "c"
+    assert reader.get_document_count() == 3
+
+    writer.delete_documents([reader.search(vectors[0], top_k=1)[0]["id"]])
+    assert top_text(reader, vectors[0]) != "a"
+
+
+def test_other_instances_see_a_recreated_collection(store_path, embeddings):
+    vectors = embeddings(1)
+    a = FAISSVectorStore("recreated")
+    b = FAISSVectorStore("recreated")
+    add(a, ["old zero"], vectors)
+    assert top_text(b, vectors[0]) == "old zero"
+
+    a.delete_collection()
+    add(a, ["NEW zero"], vectors)
+    assert top_text(b, vectors[0]) == "NEW zero"
+    assert b.get_document_count() == 1
+
+
+@pytest.mark.parametrize("storage_type", list(VectorStorageType))
+@pytest.mark.parametrize("index_type", [VectorIndexType.FLAT, VectorIndexType.HNSW])
+def test_compressed_encodings_rerank_exactly(store_path, embeddings, index_type, storage_type):
+    vectors = embeddings(300, dimension=16)
+    store = FAISSVectorStore("encoded", index_type=index_type, storage_type=storage_type)
+    ids = add(store, [f"chunk {i}" for i in range(300)], vectors)
+
+    for row in (0, 150, 299):
+        hit = store.search(vectors[row], top_k=1)[0]
+        assert hit["id"] == ids[row]
+        assert hit["score"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_metadata_filter_returns_only_matching_chunks(store_path, embeddings):
+    vectors = embeddings(6)
+    store = FAISSVectorStore("filtered")
+    add(store, ["a", "b", "c"], vectors[:3], document_id=1, filename="a.pdf", document_type="pdf")
+    add(store, ["d", "e", "f"], vectors[3:], document_id=2, filename="b.md", document_type="md")
+
+    hits = store.search(vectors[0], top_k=6, metadata_filter=MetadataFilter(document_types=["md"]))
+    assert sorted(hit["document"] for hit in hits) == ["d", "e", "f"]
+    assert store.search(vectors[0], top_k=1, metadata_filter=MetadataFilter(document_ids=[3])) == []
+
+
+def test_keyword_index_is_saved_and_rebuilt(store_path, embeddings):
+    store = FAISSVectorStore("lexical")
+    add(store, ["expense clause 7.1", "leave policy"], embeddings(2))
+    store.compact()
+    add(store, ["travel desk"], embeddings(1))
+
+    reopened = FAISSVectorStore("lexical")
+    assert [hit["document"] for hit in reopened.search_lexical("clause 7.1")] == ["expense clause 7.1"]
+    assert [hit["document"] for hit in reopened.search_lexical("travel")] == ["travel desk"]
+
+    # Snapshots written before the keyword index get it rebuilt on load
+    with open(store.metadata_path, "rb") as f:
+        snapshot = pickle.load(f)
+    del snapshot["lexical"]
+    with open(store.metadata_path, "wb") as f:
+        pickle.dump(snapshot, f)
+    rebuilt = FAISSVectorStore("lexical")
+    assert rebuilt.get_collection_info()["lexical_documents"] == 3
+    assert [hit["document"] for hit in rebuilt.search_lexical("leave")] == ["leave policy"]
+
+
+def test_legacy_document_snapshot_is_migrated(store_path, embeddings):
+    vectors = np.asarray(embeddings(3), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    store = FAISSVectorStore("legacy")
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    faiss.write_index(index, store.index_path)
+    with open(store.metadata_path, "wb") as f:
+        pickle.dump([Document(text=f"legacy {i}", metadata={"document_id": i}) for i in range(3)], f)
+
+    migrated = FAISSVectorStore("legacy")
+    assert migrated.get_document_count() == 3
+    assert top_text(migrated, vectors[1].tolist()) == "legacy 1"
+    assert migrated.search_lexical("legacy", top_k=3)
+    assert len(migrated.document_vids(2)) == 1
+    with open(store.metadata_path, "rb") as f:
+        assert isinstance(pickle.load(f), dict)